@@ -0,0 +1,119 @@
+"""
+Moon Miner asset cache
+Images and fonts shared by pages, missions and games are loaded once per
+session. Entries are keyed by their file's content, a CRC32 worked out
+once per path, size and modification time, so missions shipping the same
+background share one Bitmap. acquire() counts a reference and release()
+drops it. Unreferenced entries stay loaded, the most recently released
+KEEP_BYTES of them, for the next game to pick up, until evict().
+"""
+import binascii
+import os
+
+import displayio
+
+import assetpack
+import log
+import pagecodec
+
+KEEP_BYTES = 160*1024 # unreferenced images kept, a page sized background
+HASH_CHUNK = 512 # bytes read at a time to hash a file
+
+def asset_bytes(value):
+    # RAM of a (Bitmap, Palette or ColorConverter) image, 0 for a font
+    if not isinstance(value, tuple):
+        return 0
+    bitmap, shader = value
+    colors = len(shader) if isinstance(shader, displayio.Palette) else 1 << 16
+    bpp = 1
+    while 1 << bpp < colors:
+        bpp *= 2
+    return (bitmap.width*bpp + 31)//32*4*bitmap.height
+
+class AssetCache:
+
+    def __init__(self, keep=KEEP_BYTES):
+        self.keep = keep
+        self.entries = {} # content key: [value, references, bytes]
+        self.keys = {} # (path, size, modification time): content key
+        self.released = [] # unreferenced content keys, oldest first
+        self.buffer = bytearray(HASH_CHUNK)
+
+    def content_key(self, path, pack=None):
+        # packed assets are keyed by their place in the pack, files by a
+        # CRC32 of their bytes and their size
+        if pack is not None and path in pack.entries:
+            return ("pack",) + pack.entries[path][0:2]
+        st = os.stat(path)
+        stamp = (path, st[6], st[8])
+        key = self.keys.get(stamp)
+        if key is None:
+            crc = 0
+            view = memoryview(self.buffer)
+            with open(path, "rb") as fpr:
+                while True:
+                    n = fpr.readinto(self.buffer)
+                    if not n:
+                        break
+                    crc = binascii.crc32(view[0:n], crc)
+            key = (crc, st[6])
+            self.keys[stamp] = key
+        return key
+
+    def acquire(self, path, load, pack=None):
+        # the asset at path, loaded with load(path) unless it is cached
+        key = self.content_key(path, pack)
+        entry = self.entries.get(key)
+        if entry is None:
+            value = load(path)
+            entry = self.entries[key] = [value, 0, asset_bytes(value)]
+            log.debug(log.DISPLAY, f"asset cache: loaded {path}, {entry[2]} bytes")
+        elif entry[1] == 0:
+            self.released.remove(key)
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, path, pack=None):
+        # drop a reference, the asset stays cached while KEEP_BYTES allow
+        key = self.content_key(path, pack)
+        entry = self.entries.get(key)
+        if entry is None or entry[1] == 0:
+            log.warn(log.DISPLAY, f"asset cache: {path} released but not acquired")
+            return
+        entry[1] -= 1
+        if entry[1] == 0:
+            self.released.append(key)
+            kept = 0
+            for k in self.released:
+                kept += self.entries[k][2]
+            while kept > self.keep:
+                kept -= self.entries[self.released[0]][2]
+                del self.entries[self.released.pop(0)]
+
+    def evict(self):
+        # drop every unreferenced asset, returns how many
+        count = len(self.released)
+        for key in self.released:
+            del self.entries[key]
+        self.released.clear()
+        return count
+
+# the session's cache, it outlives each Game
+cache = AssetCache()
+
+def load_image(pack, path):
+    # an image from an .mmp page, the pack or a loose file, uncached
+    if path.endswith(pagecodec.EXTENSION):
+        return pagecodec.load(path)
+    return assetpack.load_image(pack, path)
+
+def image(pack, path):
+    # a shared image, release it with release(pack, path)
+    return cache.acquire(path, lambda p: load_image(pack, p), pack)
+
+def font(pack, path):
+    # a shared font, release it with release(pack, path)
+    return cache.acquire(path, lambda p: assetpack.load_font(pack, p), pack)
+
+def release(pack, path):
+    cache.release(path, pack)
@@ -0,0 +1,155 @@
+"""
+Moon Miner asset pack
+assets/ and fonts/ packed into one file behind a fixed size index of
+names, offsets, sizes and pixel formats, so start up opens and looks up
+one file instead of one per asset. 1, 4 and 8 bit images are stored as
+palette and top down rows and go straight into their Bitmap with
+bitmaptools.readinto. Other files are stored as they are and read
+through a Member, a file like view of their bytes. On desktop the pack
+is memory mapped. Build it with tools/pack_assets.py; without it the
+loose files are loaded as before.
+"""
+import struct
+
+import adafruit_imageload
+import bitmaptools
+import displayio
+from adafruit_bitmap_font import bitmap_font, pcf
+
+import log
+
+packfile = "moonminer.pak"
+
+PACK_MAGIC = b"MMPK"
+PACK_VERSION = 1
+# magic, version, entry count
+PACK_HEADER = "<4sBH"
+# name, offset, size, format, width, height, bits per pixel, palette colors
+PACK_ENTRY = "<32sIIBHHBH"
+
+# entry formats
+FORMAT_FILE = 0 # the file's bytes
+FORMAT_ROWS = 1 # RGB palette, then rows of packed pixels in BMP bit order, top row first
+
+class Member:
+    # a packed file's bytes as a read only file, for loaders that want one
+
+    def __init__(self, file, offset, size):
+        self.file = file
+        self.offset = offset
+        self.size = size
+        self.pos = 0
+
+    def seek(self, pos, whence=0):
+        if whence == 1:
+            pos += self.pos
+        elif whence == 2:
+            pos += self.size
+        self.pos = max(0, min(pos, self.size))
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def read(self, size=-1):
+        if size < 0 or size > self.size - self.pos:
+            size = self.size - self.pos
+        self.file.seek(self.offset + self.pos)
+        self.pos += size
+        return self.file.read(size)
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.size - self.pos)
+        self.file.seek(self.offset + self.pos)
+        if hasattr(self.file, "readinto"):
+            size = self.file.readinto(memoryview(buffer)[0:size])
+        else:
+            # mmap on desktop
+            buffer[0:size] = self.file.read(size)
+        self.pos += size
+        return size
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+class Pack:
+
+    def __init__(self, path=packfile):
+        self.file = open(path, "rb")
+        try:
+            import mmap
+            self.file = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ImportError:
+            pass # CircuitPython reads the open file
+        magic, version, count = struct.unpack(PACK_HEADER, self.file.read(struct.calcsize(PACK_HEADER)))
+        if magic != PACK_MAGIC or version > PACK_VERSION:
+            raise ValueError(f"{path} is not a supported asset pack")
+        self.entries = {}
+        size = struct.calcsize(PACK_ENTRY)
+        index = self.file.read(count*size)
+        for i in range(count):
+            entry = struct.unpack_from(PACK_ENTRY, index, i*size)
+            self.entries[entry[0].rstrip(b"\0").decode()] = entry[1:]
+
+    def open(self, name):
+        offset, size = self.entries[name][0:2]
+        return Member(self.file, offset, size)
+
+    def load_image(self, name):
+        # Bitmap and Palette or ColorConverter, like adafruit_imageload.load
+        offset, size, form, width, height, bpp, colors = self.entries[name]
+        if form != FORMAT_ROWS:
+            return adafruit_imageload.load(self.open(name), bitmap=displayio.Bitmap,
+                palette=displayio.Palette)
+        bitmap = displayio.Bitmap(width, height, 1 << bpp)
+        palette = displayio.Palette(1 << bpp)
+        self.file.seek(offset)
+        rgb = self.file.read(3*colors)
+        for i in range(colors):
+            palette[i] = rgb[3*i] << 16 | rgb[3*i + 1] << 8 | rgb[3*i + 2]
+        # rows are in BMP order, the first pixel of a byte in its high bits
+        bitmaptools.readinto(bitmap, self.file, bpp, reverse_pixels_in_element=bpp < 8)
+        return bitmap, palette
+
+    def load_font(self, name):
+        return pcf.PCF(self.open(name), displayio.Bitmap)
+
+# packs opened this session by path, None for a missing pack
+opened = {}
+
+def open_pack(path=packfile):
+    # the asset pack, opened once a session, None to load loose files
+    if path in opened:
+        return opened[path]
+    try:
+        pack = Pack(path)
+        log.info(log.DISPLAY, f"asset pack: {len(pack.entries)} assets")
+    except (OSError, ValueError) as e:
+        log.info(log.DISPLAY, f"no asset pack, loading files: {e}")
+        pack = None
+    opened[path] = pack
+    return pack
+
+def load_image(pack, path):
+    # an image from the pack, or its file when it is not packed
+    if pack is not None and path in pack.entries:
+        return pack.load_image(path)
+    return adafruit_imageload.load(path, bitmap=displayio.Bitmap, palette=displayio.Palette)
+
+def open_file(pack, path):
+    # a file from the pack, or the file itself when it is not packed
+    if pack is not None and path in pack.entries:
+        return pack.open(path)
+    return open(path, "rb")
+
+def load_font(pack, path):
+    # a PCF font from the pack, or its file when it is not packed
+    if pack is not None and path in pack.entries:
+        return pack.load_font(path)
+    return bitmap_font.load_font(path)
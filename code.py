@@ -22,7 +22,6 @@ import array
 import usb
 import usb.core
 import adafruit_usb_host_descriptors
-import adafruit_imageload
 import audiocore
 import audiomixer
 
@@ -42,7 +41,6 @@ fruit_jam = Peripherals(audio_output="headphone")
 #fruit_jam.dac.configure_clocks(sample_rate=44100, bit_depth=16)
 
 
-from adafruit_bitmap_font import bitmap_font
 import bitmaptools
 from adafruit_display_text.bitmap_label import Label
 from adafruit_display_shapes.rect import Rect
@@ -60,64 +58,102 @@ from terminalio import FONT
 
 import gc
 
+import simulation
+import replay
+import frametimes
+import log
+import assetcache
+import assetpack
+import hud
+import pagecache
+from simulation import (DISPLAY_WIDTH, DISPLAY_HEIGHT, LANDER_WIDTH,
+    LANDER_HEIGHT, TREZ, LAVA_COUNT, FRAME_RATE)
 
-DISPLAY_WIDTH = 640   # Take advantage of higher resolution
-DISPLAY_HEIGHT = 480
 COLOR_DEPTH = 8       # 8-bit color for better memory usage
-LANDER_WIDTH = 32
-LANDER_HEIGHT = 32
-TREZ = 10 # terrain resolution in pixels
-LAVA_COUNT = 16 # should be divisible into 480
-FRAME_RATE = .05
 
 BTN_DPAD_UPDOWN_INDEX = 1
 BTN_DPAD_RIGHTLEFT_INDEX = 0
 BTN_ABXY_INDEX = 5
 BTN_OTHER_INDEX = 6
 
+# controller report values that count as a press, with their log lines
+BUTTON_PRESSES = (
+    (BTN_DPAD_UPDOWN_INDEX, 0x00, "D-Pad UP pressed"),
+    (BTN_DPAD_UPDOWN_INDEX, 0xFF, "D-Pad DOWN pressed"),
+    (BTN_DPAD_RIGHTLEFT_INDEX, 0x00, "D-Pad LEFT pressed"),
+    (BTN_DPAD_RIGHTLEFT_INDEX, 0xFF, "D-Pad RIGHT pressed"),
+    (BTN_ABXY_INDEX, 0x2F, "A pressed"),
+    (BTN_ABXY_INDEX, 0x4F, "B pressed"),
+    (BTN_ABXY_INDEX, 0x1F, "X pressed"),
+    (BTN_ABXY_INDEX, 0x8F, "Y pressed"),
+    (BTN_OTHER_INDEX, 0x01, "L shoulder pressed"),
+    (BTN_OTHER_INDEX, 0x02, "R shoulder pressed"),
+    (BTN_OTHER_INDEX, 0x10, "SELECT pressed"),
+    (BTN_OTHER_INDEX, 0x20, "START pressed"),
+)
+
+# panel hud inks
+HUD_GREEN = 1
+HUD_FUEL = 2
+
+# lander atlas, assets/landersheet.bmp from tools/pack_sprites.py: a frame
+# per rotation for each exhaust, then the hard landing frame, each offset
+# from the lander body by assets/landersheet.json
+LANDER_ROTATIONS = 24
+EXHAUST_NONE = 0
+EXHAUST_THRUST1 = 1 # ignition
+EXHAUST_THRUST2 = 2
+EXHAUST_THRUST3 = 3
+HARD_LANDING_TILE = 4*LANDER_ROTATIONS
+
+# the camera scrolls when the lander comes this close to a screen edge
+CAMERA_MARGIN = DISPLAY_WIDTH//4
+# the page beyond a screen edge is read into the page cache when the
+# camera comes this close to it
+PREFETCH_MARGIN = DISPLAY_WIDTH//2
+
 timesfile = "/saves/moonminer.json"
+# "record" saves each mission attempt's inputs to replay.replayfile,
+# "play" plays that file back when its mission is chosen, None for neither.
+# Recording holds a replay.MAX_FRAMES buffer and writes to /saves, so it
+# is opt in.
+REPLAY_MODE = None
 
 class Game:
 
     def __init__(self):
         #initial settings go here
 
-        self.xvelocity = 0 # initial velocity
-        self.yvelocity = 10 # initial velocity
-        #self.scale = .8 # pixels to meter
-        self.scale = 2.4 # pixels to meter (24 pixels / 10 meters high)
-        self.xdistance = (DISPLAY_WIDTH//2 - LANDER_WIDTH//2)//self.scale
-        self.ydistance = 0
-        self.ydistance = -LANDER_HEIGHT
-        self.gravity = 1.62 # m/s/s
-        self.rotate = 18
-        self.frotate = 270.0
+        # lander, lava and mine state lives in the simulation
+        self.sim = simulation.new_simulation()
+        self.recorder = replay.Recorder() if REPLAY_MODE == "record" else None
+        self.playback = None
+        self.frametimes = frametimes.FrameTimes()
         self.timer = 0
         self.gtimer = 0
         self.fcount = 0
-        self.thruster = False # self.thruster initially turned off
-        self.thrust = 1.5 # self.thrust strength
-        self.fuel = 10000 # fuel capacity
-        self.fuelleak = 0
+        self.camera_x = 0 # world x of the screen's left edge
         #interface index, and endpoint addresses for USB Device instance
         self.kbd_interface_index = None
         self.kbd_endpoint_address = None
         self.keyboard = None
         self.controller = None
-        self.tpage = 0 # terrian display page
-        self.onground = False
-        self.crashed = False
         self.game_over = False
         self.message_label = []
-        self.display_terrain = []
+        self.display_terrain = [] # a group per page, for its cached bitmap
+        self.page_images = [] # terrain BMP path per page
+        self.page_cache = pagecache.PageCache()
+        self.pack = None
+        self.asset_paths = [] # images and fonts held in the asset cache
+        self.mission_assets = [] # images held for the current mission
+        self.display_lava_bit = None
+        self.display_background = None
         self.gem_group = []
         self.volcano_group = []
         self.lander_group = []
         self.sprite1 = []
         self.sprite2 = []
         self.missions = []
-        self.mines = []
-        self.volcanos = []
         self.times = []
         self.id = None
         self.last_input = "" # c for controller, k for keyboard
@@ -150,6 +186,68 @@ class Game:
         #print("testing mixer done")
         #self.mixer.voice[0].stop()
 
+    def load_image(self, path):
+        # a Bitmap and its palette from the asset cache, shared with any
+        # page, mission or game using the same image
+        self.asset_paths.append(path)
+        return assetcache.image(self.pack, path)
+
+    def load_font(self, path):
+        self.asset_paths.append(path)
+        return assetcache.font(self.pack, path)
+
+    def load_mission_image(self, path):
+        # an image from the asset cache held only while its mission is
+        # loaded, released by release_mission_assets()
+        self.mission_assets.append(path)
+        return assetcache.image(self.pack, path)
+
+    def release_mission_assets(self):
+        # hand the last mission's images back to the asset cache, where
+        # they stay while KEEP_BYTES allow for a mission that shares them
+        for path in self.mission_assets:
+            assetcache.release(self.pack, path)
+        self.mission_assets.clear()
+        self.display_lava_bit = None
+        self.display_lava_pal = None
+
+    def unload_mission(self):
+        # take the last mission's background, pages, lava and gems out of
+        # the scene graph, so the next mission loads into the same one,
+        # and hand its images back to the asset cache
+        if self.display_background is not None:
+            self.main_group.remove(self.display_background)
+            self.display_background = None
+        self.release_mission_assets()
+        self.page_cache.clear()
+        for group in self.volcano_group + self.display_terrain + self.gem_group:
+            self.main_group.remove(group)
+        self.volcano_group.clear()
+        self.display_terrain.clear()
+        self.gem_group.clear()
+        self.page_images.clear()
+        self.display_lava = []
+
+    def restart(self):
+        # warm restart after a game: the display, its assets, the mixer and
+        # the input devices stay, only game and mission state is reset
+        for voice in self.mixer.voice:
+            voice.stop()
+        self.unload_mission()
+        self.clear_message()
+        self.pause_label.hidden = True
+        self.wait_label.hidden = True
+        self.playback = None
+        self.timer = 0
+        self.gtimer = 0
+        self.fcount = 0
+        self.camera_x = 0
+        self.game_over = False
+        self.id = None
+        self.update_mission_list()
+        gc.enable()
+        gc.collect()
+
     def init_display(self):
         """Initialize DVI display on Fruit Jam"""
         try:
@@ -168,6 +266,9 @@ class Game:
 
             self.display = framebufferio.FramebufferDisplay(fb)
 
+            # images and the font come from the asset pack when there is one
+            self.pack = assetpack.open_pack()
+
             # Create display groups
             self.title_group = displayio.Group(scale=2)
             self.help_group = displayio.Group()
@@ -175,14 +276,10 @@ class Game:
             self.main_group = displayio.Group()
 
             # Load title screeen
-            title_bit, title_pal = adafruit_imageload.load(
-                "assets/title_screen.bmp",
-                bitmap=displayio.Bitmap,
-                palette=displayio.Palette
-            )
+            title_bit, title_pal = self.load_image("assets/title_screen.bmp")
             self.display_title = displayio.TileGrid(title_bit, x=0, y=0,pixel_shader=title_pal)
             self.title_group.append(self.display_title)
-            font = bitmap_font.load_font("fonts/ter16b.pcf")
+            font = self.load_font("fonts/ter16b.pcf")
             self.bb = font.get_bounding_box()
             version_label = Label(
                 font,
@@ -202,40 +299,40 @@ class Game:
             self.display.root_group = self.title_group
 
             # Load help screen
-            help_bit, help_pal = adafruit_imageload.load(
-                "assets/help_screen.bmp",
-                bitmap=displayio.Bitmap,
-                palette=displayio.Palette
-            )
+            help_bit, help_pal = self.load_image("assets/help_screen.bmp")
             self.display_help = displayio.TileGrid(help_bit, x=0, y=0,pixel_shader=help_pal)
             self.help_group.append(self.display_help)
 
 
             # gemstone sheet
-            self.gems_bit, self.gems_pal = adafruit_imageload.load("assets/gemsheet.bmp",
-                 bitmap=displayio.Bitmap,
-                 palette=displayio.Palette)
+            self.gems_bit, self.gems_pal = self.load_image("assets/gemsheet.bmp")
             self.gems_pal.make_transparent(self.gems_bit[0])
 
             # rocket lander setup
             self.main_group.append(self.lander_group)
-            rocket_bit, rocket_pal = adafruit_imageload.load("assets/rocketsheet.bmp",
-                 bitmap=displayio.Bitmap,
-                 palette=displayio.Palette)
-            rocket_pal.make_transparent(rocket_bit[0])
-
-            self.display_lander = displayio.TileGrid(rocket_bit, pixel_shader=rocket_pal,
+            # the lander and its exhaust, one tile of the atlas
+            lander_bit, lander_pal = self.load_image("assets/landersheet.bmp")
+            lander_pal.make_transparent(0)
+            with assetpack.open_file(self.pack, "assets/landersheet.json") as fpr:
+                sheet = json.load(fpr)
+            # x and y of each frame's cell from the body's top left corner
+            self.lander_offsets = array.array("b", sheet["offsets"])
+            # pixel collision shapes of the rotation tiles, derived once
+            with assetpack.open_file(self.pack, simulation.rocketsheet) as fpr:
+                self.sim.masks = simulation.sheet_masks(simulation.rocketsheet, fpr)
+
+            self.display_lander = displayio.TileGrid(lander_bit, pixel_shader=lander_pal,
                 width=1, height=1,
-                tile_height=LANDER_HEIGHT, tile_width=LANDER_WIDTH,
+                tile_height=sheet["tile_height"], tile_width=sheet["tile_width"],
                 default_tile=0,
-                x=DISPLAY_WIDTH//2 - LANDER_WIDTH//2, y=-LANDER_HEIGHT)
+                x=DISPLAY_WIDTH//2 - LANDER_WIDTH//2 + self.lander_offsets[0],
+                y=-LANDER_HEIGHT + self.lander_offsets[1])
 
             self.lander_group.append(self.display_lander)
+            self.exhaust = EXHAUST_NONE
 
-            # explosion animation
-            explosion_bit, explosion_pal = adafruit_imageload.load("assets/explosionsheet.bmp",
-                 bitmap=displayio.Bitmap,
-                 palette=displayio.Palette)
+            # explosion animation, its 8 bit palette does not fit the atlas
+            explosion_bit, explosion_pal = self.load_image("assets/explosionsheet.bmp")
             explosion_pal.make_transparent(explosion_bit[0])
             self.display_explosion = displayio.TileGrid(explosion_bit,
                 pixel_shader=explosion_pal,
@@ -246,49 +343,6 @@ class Game:
             self.lander_group.append(self.display_explosion)
             self.display_explosion.hidden = True
 
-            # self.display_thrust1 animation
-            self.display_thrust1_bit, self.display_thrust1_pal = adafruit_imageload.load("assets/thrust1sheet.bmp",
-                 bitmap=displayio.Bitmap,
-                 palette=displayio.Palette)
-            self.display_thrust1_pal.make_transparent(self.display_thrust1_bit[0])
-
-            self.display_thrust1 = displayio.TileGrid(self.display_thrust1_bit,
-                pixel_shader=self.display_thrust1_pal,
-                width=1, height=1,
-                tile_height=32, tile_width=32,
-                default_tile=0,
-                x=DISPLAY_WIDTH//2 - LANDER_WIDTH//2, y=-LANDER_HEIGHT)
-            self.lander_group.append(self.display_thrust1)
-            self.display_thrust1.hidden = True
-
-            self.display_thrust2_bit, self.display_thrust2_pal = adafruit_imageload.load("assets/thrust2sheet.bmp",
-                 bitmap=displayio.Bitmap,
-                 palette=displayio.Palette)
-            self.display_thrust2_pal.make_transparent(self.display_thrust2_bit[0])
-
-            self.display_thrust2 = displayio.TileGrid(self.display_thrust2_bit,
-                pixel_shader=self.display_thrust2_pal,
-                width=1, height=1,
-                tile_height=48, tile_width=48,
-                default_tile=0,
-                x=DISPLAY_WIDTH//2 - LANDER_WIDTH//2, y=-LANDER_HEIGHT)
-            self.lander_group.append(self.display_thrust2)
-            self.display_thrust2.hidden = True
-
-            self.display_thrust3_bit, self.display_thrust3_pal = adafruit_imageload.load("assets/thrust3sheet.bmp",
-                 bitmap=displayio.Bitmap,
-                 palette=displayio.Palette)
-            self.display_thrust3_pal.make_transparent(self.display_thrust3_bit[0])
-
-            self.display_thrust3 = displayio.TileGrid(self.display_thrust3_bit,
-                pixel_shader=self.display_thrust3_pal,
-                width=1, height=1,
-                tile_height=48, tile_width=48,
-                default_tile=0,
-                x=DISPLAY_WIDTH//2 - LANDER_WIDTH//2, y=-LANDER_HEIGHT)
-            self.lander_group.append(self.display_thrust3)
-            self.display_thrust3.hidden = True
-
             self.display_thruster = False
 
             # panel labels
@@ -303,13 +357,6 @@ class Game:
                 x = self.bb[0], y= self.bb[1]
             )
             self.panel_group.append(self.score_label)
-            self.score_text = Label(
-                font,
-                color=0x00ff00,
-                x=self.bb[0]*9, y= self.bb[1]
-            )
-            self.panel_group.append(self.score_text)
-            self.score_text.text = ""
 
             self.time_label = Label(
                 font,
@@ -318,13 +365,6 @@ class Game:
                 x = self.bb[0], y= self.bb[1]*3
             )
             self.panel_group.append(self.time_label)
-            self.time_text = Label(
-                font,
-                color=0x00ff00,
-                x=self.bb[0]*9, y= self.bb[1]*3
-            )
-            self.panel_group.append(self.time_text)
-            self.time_text.text = "00:00"
 
             self.time_to_beat_label = Label(
                 font,
@@ -350,13 +390,6 @@ class Game:
                 x = self.bb[0], y= self.bb[1]*2
             )
             self.panel_group.append(self.fuel_label)
-            self.fuel_text = Label(
-                font,
-                color=0x00ff00,
-                x=self.bb[0]*8, y= self.bb[1]*2
-            )
-            self.panel_group.append(self.fuel_text)
-            self.fuel_text.text = "000000"
 
 
             self.velocityx_label = Label(
@@ -367,13 +400,6 @@ class Game:
             )
             self.panel_group.append(self.velocityx_label)
 
-            self.velocityx_text = Label(
-                font,
-                color=0x00ff00,
-                x=DISPLAY_WIDTH - self.bb[0]*6, y= self.bb[1]
-            )
-            self.panel_group.append(self.velocityx_text)
-            self.velocityx_text.text = "000.0"
 
             self.velocityy_label = Label(
                 font,
@@ -383,13 +409,6 @@ class Game:
             )
             self.panel_group.append(self.velocityy_label)
 
-            self.velocityy_text = Label(
-                font,
-                color=0x00ff00,
-                x=DISPLAY_WIDTH - self.bb[0]*6, y= self.bb[1]*2
-            )
-            self.panel_group.append(self.velocityy_text)
-            self.velocityy_text.text = "000.0"
 
             self.rotation_label = Label(
                 font,
@@ -399,13 +418,6 @@ class Game:
             )
             self.panel_group.append(self.rotation_label)
 
-            self.rotation_text = Label(
-                font,
-                color=0x00ff00,
-                x=DISPLAY_WIDTH - self.bb[0]*6, y= self.bb[1]*3
-            )
-            self.panel_group.append(self.rotation_text)
-            self.rotation_text.text = "000.0"
 
             self.altitude_label = Label(
                 font,
@@ -415,18 +427,31 @@ class Game:
             )
             self.panel_group.append(self.altitude_label)
 
-            self.altitude_text = Label(
-                font,
-                color=0x00ff00,
-                x=DISPLAY_WIDTH - self.bb[0]*6, y= self.bb[1]*4
-            )
-            self.panel_group.append(self.altitude_text)
-            self.altitude_text.text = "000.0"
+
+            # panel values, drawn into one bitmap by the hud so updates
+            # allocate nothing, rows line up with the labels
+            top = self.bb[1] - (self.bb[1] + self.bb[3])//2
+            left = self.bb[0]*8
+            right = DISPLAY_WIDTH - self.bb[0]*6 - left
+            self.hud = hud.Hud(font, left, top, DISPLAY_WIDTH - left, self.bb[1]*4,
+                (0x00ff00, 0x00ff00))
+            self.panel_group.append(self.hud.tilegrid)
+            self.score_field = self.hud.field(self.bb[0], 0, 5)
+            self.fuel_field = self.hud.field(0, self.bb[1], 6, HUD_FUEL)
+            self.time_field = self.hud.field(self.bb[0], self.bb[1]*2, 5)
+            self.velocityx_field = self.hud.field(right, 0, 5)
+            self.velocityy_field = self.hud.field(right, self.bb[1], 5)
+            self.rotation_field = self.hud.field(right, self.bb[1]*2, 5)
+            self.altitude_field = self.hud.field(right, self.bb[1]*3, 5)
+            self.hud.set_clock(self.time_field, 0)
+            self.hud.set_number(self.fuel_field, 0)
+            self.hud.set_number(self.velocityx_field, 0)
+            self.hud.set_number(self.velocityy_field, 0)
+            self.hud.set_number(self.rotation_field, 0)
+            self.hud.set_number(self.altitude_field, 0)
 
             # arrows
-            arrows_bit, arrows_pal = adafruit_imageload.load("assets/arrows.bmp",
-                 bitmap=displayio.Bitmap,
-                 palette=displayio.Palette)
+            arrows_bit, arrows_pal = self.load_image("assets/arrows.bmp")
             arrows_pal.make_transparent(arrows_bit[0])
 
             self.arrowh = displayio.TileGrid(arrows_bit, pixel_shader=arrows_pal,
@@ -478,7 +503,6 @@ class Game:
             # message text labels
             self.message_group = displayio.Group()
             self.message_group.hidden = True
-            font = bitmap_font.load_font("fonts/ter16b.pcf")
             bb = font.get_bounding_box()
 
             for i in range(6):
@@ -555,34 +579,31 @@ class Game:
             self.load_time_list()
             i = 1
             for m in self.missions:
-                print("mission:",m["mission"])
-                time = "--:--"
-                for t in self.times:
-                    if t["id"] == m["id"]:
-                        time = f"{int(t["time"])//60:02d}:{int(t["time"])%60:02d}"
+                log.debug(log.DISPLAY, "mission:",m["mission"])
                 mission_label.append(Label(
                     font,
                     scale=1,
                     color=0x00ff00,
                     outline_color = 0x004400,
-                    text= f"{m["mission"].upper():<30} " + time,
+                    text= self.mission_text(m),
                     x = self.bb[0]*2,
                     y= self.bb[1]*i+self.bb[1]*2
                     ))
                 mission_label[i].hidden = False
                 self.mission_group.append(mission_label[i])
                 i += 1
+            self.mission_labels = mission_label[1:]
 
-            print("Fruit Jam DVI display initialized successfully")
+            log.info(log.DISPLAY, "Fruit Jam DVI display initialized successfully")
             return True
 
         except Exception as e:
-            print(f"Failed to initialize DVI display: {e}")
+            log.error(log.DISPLAY, f"Failed to initialize DVI display: {e}")
             return False
 
     def display_message(self,message):
-        print(f"display_message")
-        self.fuel_text.hidden = False
+        debug = log.level[log.DISPLAY] >= log.DEBUG
+        self.hud.show_ink(HUD_FUEL, True)
         self.clear_message() # clear previous message, if any
         lines = []
         tlines = message.split("\n")
@@ -590,10 +611,10 @@ class Game:
 
             t2 = wrap_text_to_lines(t, 38)
             for t3 in t2:
-                print(t3)
                 lines.append(t3)
         #lines = wrap_text_to_lines(message, 30)
-        print(lines)
+        if debug:
+            log.write(log.DISPLAY, f"message: {lines}")
         for i in range(6):
             #self.message_label[i].hidden = False
             if len(lines) > i:
@@ -625,18 +646,8 @@ class Game:
         gc.disable()
 
     def update_score(self):
-        minetotal = 0
-        minecount = 0
-        for p in range(len(self.pages)):
-            for m in self.mines[p]:
-                #print(f"{self.mines[p]}")
-                if m["type"] == "m":
-                    minetotal += 1
-                    if m["count"] == 0:
-                        minecount += 1
-                #minetotal += len(self.mines[p])
-            #print(f"minetotal: {minetotal}")
-        self.score_text.text = f"{minecount:02d}/{minetotal:02d}"
+        minecount, minetotal = self.sim.mine_progress()
+        self.hud.set_text(self.score_field, f"{minecount:02d}/{minetotal:02d}")
 
     def reports_equal(self, report_a, report_b, check_length=None):
         """
@@ -672,10 +683,10 @@ class Game:
             #)
             if d.product[:11] == "USB gamepad":
                 device = d
-                print("found gamepad")
+                log.info(log.INPUT, "found gamepad")
                 break
         if device is None:
-            print("no gamepad found")
+            log.info(log.INPUT, "no gamepad found")
             return False # controller not found
         # set configuration so we can read data from it
         self.controller = device
@@ -712,122 +723,8 @@ class Game:
         return True
 
     def print_keyboard_report(self,report_data):
-        # Dictionary for modifier keys (first byte)
-        modifier_dict = {
-            0x01: "LEFT_CTRL",
-            0x02: "LEFT_SHIFT",
-            0x04: "LEFT_ALT",
-            0x08: "LEFT_GUI",
-            0x10: "RIGHT_CTRL",
-            0x20: "RIGHT_SHIFT",
-            0x40: "RIGHT_ALT",
-            0x80: "RIGHT_GUI",
-        }
-
-        # Dictionary for key codes (main keys)
-        key_dict = {
-            0x04: "A",
-            0x05: "B",
-            0x06: "C",
-            0x07: "D",
-            0x08: "E",
-            0x09: "F",
-            0x0A: "G",
-            0x0B: "H",
-            0x0C: "I",
-            0x0D: "J",
-            0x0E: "K",
-            0x0F: "L",
-            0x10: "M",
-            0x11: "N",
-            0x12: "O",
-            0x13: "P",
-            0x14: "Q",
-            0x15: "R",
-            0x16: "S",
-            0x17: "T",
-            0x18: "U",
-            0x19: "V",
-            0x1A: "W",
-            0x1B: "X",
-            0x1C: "Y",
-            0x1D: "Z",
-            0x1E: "1",
-            0x1F: "2",
-            0x20: "3",
-            0x21: "4",
-            0x22: "5",
-            0x23: "6",
-            0x24: "7",
-            0x25: "8",
-            0x26: "9",
-            0x27: "0",
-            0x28: "ENTER",
-            0x29: "ESC",
-            0x2A: "BACKSPACE",
-            0x2B: "TAB",
-            0x2C: "SPACE",
-            0x2D: "MINUS",
-            0x2E: "EQUAL",
-            0x2F: "LBRACKET",
-            0x30: "RBRACKET",
-            0x31: "BACKSLASH",
-            0x33: "SEMICOLON",
-            0x34: "QUOTE",
-            0x35: "GRAVE",
-            0x36: "COMMA",
-            0x37: "PERIOD",
-            0x38: "SLASH",
-            0x39: "CAPS_LOCK",
-            0x4F: "RIGHT_ARROW",
-            0x50: "LEFT_ARROW",
-            0x51: "DOWN_ARROW",
-            0x52: "UP_ARROW",
-        }
-
-        # Add F1-F12 keys to the dictionary
-        for i in range(12):
-            key_dict[0x3A + i] = f"F{i + 1}"
-
-        # First byte contains modifier keys
-        modifiers = report_data[0]
-
-        # Print modifier keys if pressed
-        if modifiers > 0:
-            print("Modifiers:", end=" ")
-
-            # Check each bit for modifiers and print if pressed
-            for bit, name in modifier_dict.items():
-                if modifiers & bit:
-                    print(name, end=" ")
-
-            print()
-
-        # Bytes 2-7 contain up to 6 key codes (byte 1 is reserved)
-        keys_pressed = False
-
-        for i in range(2, 8):
-            key = report_data[i]
-
-            # Skip if no key or error rollover
-            if key in {0, 1}:
-                continue
-
-            if not keys_pressed:
-                print("Keys:", end=" ")
-                keys_pressed = True
-
-            # Print key name based on dictionary lookup
-            if key in key_dict:
-                print(key_dict[key], end=" ")
-            else:
-                # For keys not in the dictionary, print the HID code
-                print(f"0x{key:02X}", end=" ")
-
-        if keys_pressed:
-            print()
-        elif modifiers == 0:
-            print("No keys pressed")
+        # key names come from tables built once in log.py
+        log.write(log.INPUT, log.keyboard_report(report_data))
 
     def get_button(self):
         press = False
@@ -851,45 +748,12 @@ class Game:
 
             if not self.reports_equal(buf, self.prev_state, 8) and not self.reports_equal(buf, self.idle_state, 8):
                 press = False
-                if buf[BTN_DPAD_UPDOWN_INDEX] == 0x0:
-                    print("D-Pad UP pressed")
-                    press = True
-                elif buf[BTN_DPAD_UPDOWN_INDEX] == 0xFF:
-                    print("D-Pad DOWN pressed")
-                    press = True
-
-                if buf[BTN_DPAD_RIGHTLEFT_INDEX] == 0:
-                    print("D-Pad LEFT pressed")
-                    press = True
-                elif buf[BTN_DPAD_RIGHTLEFT_INDEX] == 0xFF:
-                    print("D-Pad RIGHT pressed")
-                    press = True
-
-                if buf[BTN_ABXY_INDEX] == 0x2F:
-                    print("A pressed")
-                    press = True
-                elif buf[BTN_ABXY_INDEX] == 0x4F:
-                    print("B pressed")
-                    press = True
-                elif buf[BTN_ABXY_INDEX] == 0x1F:
-                    print("X pressed")
-                    press = True
-                elif buf[BTN_ABXY_INDEX] == 0x8F:
-                    print("Y pressed")
-                    press = True
-
-                if buf[BTN_OTHER_INDEX] == 0x01:
-                    print("L shoulder pressed")
-                    press = True
-                elif buf[BTN_OTHER_INDEX] == 0x02:
-                    print("R shoulder pressed")
-                    press = True
-                elif buf[BTN_OTHER_INDEX] == 0x10:
-                    print("SELECT pressed")
-                    press = True
-                elif buf[BTN_OTHER_INDEX] == 0x20:
-                    print("START pressed")
-                    press = True
+                debug = log.level[log.INPUT] >= log.DEBUG
+                for index, value, message in BUTTON_PRESSES:
+                    if buf[index] == value:
+                        press = True
+                        if debug:
+                            log.write(log.INPUT, message)
                 self.prev_state = buf[:]
             else:
                 self.idle_state = buf[:]
@@ -912,14 +776,15 @@ class Game:
                 # Nothing to do if there is no data for this keyboard
                 return None
             except usb.core.USBError as e:
-                print(f"usb.core.USBError error: {e}")
+                log.error(log.INPUT, f"usb.core.USBError error: {e}")
                 # reset keyboard if we get this error
                 if not self.init_keyboard():
-                    print("Failed to initialize keyboard or no keyboard attached")
+                    log.error(log.INPUT, "Failed to initialize keyboard or no keyboard attached")
                 #sys.exit()
                 # unknown error, ignore
                 return None
-            self.print_keyboard_report(buff)
+            if log.level[log.INPUT] >= log.DEBUG:
+                self.print_keyboard_report(buff)
 
             # convert from byte to int array so "in" operator will work
             format_string = 'b' * len(buff)
@@ -940,10 +805,8 @@ class Game:
         self.mixer.voice[1].stop()
         #animation here
         self.lockout = True
+        self.place_explosion()
         self.display_explosion.hidden = False
-        self.display_thrust1.hidden = True
-        self.display_thrust2.hidden = True
-        self.display_thrust3.hidden = True
         for i in range(4,24):
             t = time.monotonic()
             self.display_explosion[0] = i
@@ -964,231 +827,231 @@ class Game:
 
     def collision_detected(self):
         # check for crash other than ground (lava for now)
-        #if len(self.volcanos) > 0 and len(self.volcanos[self.tpage]) > 0:
-        if len(self.volcanos) > self.tpage:
-            p1 = (self.display_lander.x+4) // TREZ
-            p2 = (self.display_lander.x+LANDER_WIDTH -4)//TREZ
-            p = []
-            for i in range(p1,p2+1):
-                p.append(i)
-            c = 0
-            for v in self.volcanos[self.tpage]:
-                #print("volcanos:",v, p)
-                if v["pos"] in p:
-                    #print("debug: near volcano",v,c,p)
-                    for i in range(LAVA_COUNT):
-                        if self.display_lava[self.tpage][c][i].hidden == False:
-                            if (
-                                self.display_lander.y <= self.display_lava[self.tpage][c][i].y and
-                                self.display_lava[self.tpage][c][i].y + self.display_lava[self.tpage][c][i].tile_height
-                                <= self.display_lander.y) or (
-                                self.display_lava[self.tpage][c][i].y <= self.display_lander.y and
-                                self.display_lava[self.tpage][c][i].y + self.display_lava[self.tpage][c][i].tile_height
-                                >= self.display_lander.y) or (
-                                self.display_lava[self.tpage][c][i].y <= self.display_lander.y + LANDER_HEIGHT and
-                                self.display_lava[self.tpage][c][i].y + self.display_lava[self.tpage][c][i].tile_height
-                                >= self.display_lander.y + LANDER_HEIGHT):
-                                self.crashed = True
-                                self.game_over = True
-                                print("crashed! (lava)")
-                                reason = "You were hit by lava."
-                c += 1
-
-        if self.crashed:
+        if self.sim.lava_hit():
+            log.info(log.GAME, "crashed! (lava)")
+            reason = "You were hit by lava."
             self.game_over = True
-            self.display_thrust1.hidden = True
-            self.display_thrust2.hidden = True
-            self.display_thrust3.hidden = True
+            self.set_exhaust(EXHAUST_NONE)
             self.crash_animation()
-            #self.xvelocity = 0
-            #self.yvelocity = 0
-            #self.rotate = 0
-            self.thruster = False
+            self.sim.thruster = False
 
             message = f"CRASH!\n{reason}\nDo you want to repeat the mission?\nY or N"
             self.display_message(message.upper())
             gc.collect()
-        return self.crashed
-
-    def ground_detected(self):
-        pos = []
-        #self.crashed = False
-        reason = ""
-        x1 = self.display_lander.x + 4
-        x2 = self.display_lander.x + LANDER_WIDTH - 4
-        p1 = (x1)//TREZ
-        p2 = (x2)//TREZ
-        factor1 = (x1%TREZ) / TREZ
-        factor2 = (x2%TREZ) / TREZ
-        if p1 >= 0 and p2+2 <= len(self.pages[self.tpage]["terrain"]):
-            for i in range(p1,p2+2):
-                pos.append(i)
-            #print(f"lander:({self.display_lander.x},{self.display_lander.y})")
-            #print(f"x1:{x1}, x2:{x2}, pos:{pos}")
-            #print(f"x1:{x1},x2:{x2},p1:{p1},f1:{factor1},p2:{p2},f2:{factor2}")
-            y1 = ((self.pages[self.tpage]["terrain"][pos[1]]
-                - self.pages[self.tpage]["terrain"][pos[0]])*factor1
-                + self.pages[self.tpage]["terrain"][pos[0]])
-
-            y2 = ((self.pages[self.tpage]["terrain"][pos[-1]]
-                - self.pages[self.tpage]["terrain"][pos[-2]])*factor2
-                + self.pages[self.tpage]["terrain"][pos[-2]])
-
-            lander_alt = DISPLAY_HEIGHT - LANDER_HEIGHT - self.display_lander.y + 4
-            if (pos[0] > 0 and (
-                y1 >= lander_alt
-                or y2 >= lander_alt)):
-                if not self.onground:
-                    self.onground = True
-                    print(f"lander:({self.display_lander.x},{self.display_lander.y}) alt:{lander_alt} pos: {pos}")
-                    print(f"factors: {factor1, factor2},({x1},{y1}), ({x2},{y2})")
-                    velocity = math.sqrt(self.xvelocity*self.xvelocity + self.yvelocity*self.yvelocity)
-                    if self.pages[self.tpage]["terrain"][p1] != self.pages[self.tpage]["terrain"][p2]:
-                        self.crashed = True
-                        self.game_over = True
-                        print("crashed! (not on level ground)")
-                        reason = "You were not on level ground."
-                        self.xvelocity = -self.xvelocity*.6
-                        self.yvelocity = self.yvelocity*.6
-                        self.onground = False
-                        self.crash_animation()
-                        self.onground = True
-                    elif self.yvelocity > 10:
-                        self.crashed = True
-                        self.game_over = True
-                        print("crashed! (too fast)")
-                        reason = "You were going too fast."
-                        self.crash_animation()
-                    elif self.yvelocity > 5:
-                        self.crashed = True
-                        self.game_over = True
-                        print("crashed! (hard landing)")
-                        reason = "You had a hard landing and damaged rocket."
-                        self.display_lander[0] = 24 # show hard landing sprite
-                    elif self.rotate != 0:
-                        self.crashed = True
-                        self.game_over = True
-                        print("crashed! (not vertical)")
-                        reason = "You were not vertical and you tipped over."
-                        #animation here
-                        while self.rotate > 16:
-                            self.rotate -= 1
-                            self.display_lander[0] = self.rotate
-                            self.display_lander.x -= 3
-                            time.sleep(.10)
-                        self.display_lander.y += 2
-
-                        while self.rotate < 8:
-                            self.rotate += 1
-                            self.display_lander[0] = self.rotate
-                            self.display_lander.x += 3
-                            time.sleep(.10)
-                        self.display_lander.y += 2
-
-                    elif abs(self.xvelocity) > 3:
-                        self.crashed = True
-                        self.game_over = True
-                        print("crashed! (too fast horizontally)")
-                        reason = "You tipped over from sliding."
-                        #animation here
-                        if self.xvelocity < 0:
-                            self.rotate = 24
-                            while self.rotate > 16:
-                                self.rotate -= 1
-                                self.display_lander[0] = self.rotate
-
-                                self.display_lander.x -= 3
-                                time.sleep(.10)
-                            self.display_lander.y += 4
-                        else:
-                            self.rotate = 0
-                            while self.rotate < 8:
-                                self.rotate += 1
-                                self.display_lander[0] = self.rotate
-                                self.display_lander.x += 3
-                                time.sleep(.10)
-                            self.display_lander.y += 4
-                    elif self.fuel <= 0:
-                        print("stranded!")
-                        reason = "You are out of fuel and stranded."
-                        self.crashed = True
-                        self.game_over = True
-                    print("landing velocity:", velocity)
-                if self.crashed:
-                    self.display_thrust1.hidden = True
-                    self.display_thrust2.hidden = True
-                    self.display_thrust3.hidden = True
-                    self.mixer.voice[0].stop()
-                    self.mixer.voice[1].stop()
-                    self.mixer.voice[2].stop()
-
-                    self.thruster = False
-                    message = f"CRASH!\n{reason}\nDo you want to repeat the mission?\nY or N"
-                    self.display_message(message.upper())
-                else: # landed safely
-                    self.yvelocity = 0
-                    self.xvelocity = 0
-                    self.rotate = 0
-                    gc.collect()
-                return True
-            self.onground = False
+            return True
         return False
 
-    def set_page(self, pagenum, show_lander = True):
-            timer = time.monotonic()
-            self.display.auto_refresh = False
-            self.tpage = pagenum
-            print("pages:",len(self.display_terrain))
-            for p in range(len(self.display_terrain)):
-                if self.tpage == p:
-                    self.display_terrain[p].x = 0
-                    self.gem_group[p].x = 0
-                    #if len(self.volcano_group) >= p+1:
-                    self.volcano_group[p].x = 0
-                    if show_lander:
-                        if self.display_lander.x < 20:
-                            self.display_lander.x = 0 - LANDER_WIDTH//2
-                            self.display_thrust1.x = self.display_lander.x
-                            self.display_thrust2.x = self.display_thrust1.x - 8
-                            self.display_thrust3.x = self.display_thrust1.x - 8
-                    else:
-                            self.display_lander.x = DISPLAY_WIDTH - LANDER_WIDTH//2 - 2
-                            self.display_thrust1.x = self.display_lander.x
-                            self.display_thrust2.x  = self.display_thrust1.x - 8
-                            self.display_thrust3.x  = self.display_thrust1.x - 8
+    def ground_detected(self):
+        sim = self.sim
+        result = sim.ground_check()
+        if result == simulation.NO_CONTACT:
+            return False
+        if sim.touchdown:
+            reason = ""
+            velocity = math.sqrt(sim.xvelocity*sim.xvelocity + sim.yvelocity*sim.yvelocity)
+            log.info(log.GAME, f"lander:({self.display_lander.x},{self.display_lander.y}) result: {result}")
+            if result == simulation.CRASH_NOT_LEVEL:
+                self.game_over = True
+                log.info(log.GAME, "crashed! (not on level ground)")
+                reason = "You were not on level ground."
+                # bounce off the slope while exploding
+                sim.onground = False
+                self.crash_animation()
+                sim.onground = True
+            elif result == simulation.CRASH_TOO_FAST:
+                self.game_over = True
+                log.info(log.GAME, "crashed! (too fast)")
+                reason = "You were going too fast."
+                self.crash_animation()
+            elif result == simulation.CRASH_HARD_LANDING:
+                self.game_over = True
+                log.info(log.GAME, "crashed! (hard landing)")
+                reason = "You had a hard landing and damaged rocket."
+                self.set_exhaust(EXHAUST_NONE)
+                self.set_lander_tile(HARD_LANDING_TILE) # show hard landing sprite
+            elif result == simulation.CRASH_NOT_VERTICAL:
+                self.game_over = True
+                log.info(log.GAME, "crashed! (not vertical)")
+                reason = "You were not vertical and you tipped over."
+                #animation here
+                while sim.rotate > 16:
+                    sim.rotate -= 1
+                    self.set_lander_tile(sim.rotate)
+                    self.display_lander.x -= 3
+                    time.sleep(.10)
+                self.display_lander.y += 2
+
+                while sim.rotate < 8:
+                    sim.rotate += 1
+                    self.set_lander_tile(sim.rotate)
+                    self.display_lander.x += 3
+                    time.sleep(.10)
+                self.display_lander.y += 2
+
+            elif result == simulation.CRASH_SLIDING:
+                self.game_over = True
+                log.info(log.GAME, "crashed! (too fast horizontally)")
+                reason = "You tipped over from sliding."
+                #animation here
+                if sim.xvelocity < 0:
+                    sim.rotate = 24
+                    while sim.rotate > 16:
+                        sim.rotate -= 1
+                        self.set_lander_tile(sim.rotate)
+
+                        self.display_lander.x -= 3
+                        time.sleep(.10)
+                    self.display_lander.y += 4
                 else:
-                    self.display_terrain[p].x = -DISPLAY_WIDTH
-                    self.gem_group[p].x = -DISPLAY_WIDTH
-                    #if len(self.volcano_group) >= p+1:
-                    self.volcano_group[p].x = -DISPLAY_WIDTH
+                    sim.rotate = 0
+                    while sim.rotate < 8:
+                        sim.rotate += 1
+                        self.set_lander_tile(sim.rotate)
+                        self.display_lander.x += 3
+                        time.sleep(.10)
+                    self.display_lander.y += 4
+            elif result == simulation.STRANDED:
+                log.info(log.GAME, "stranded!")
+                reason = "You are out of fuel and stranded."
+                self.game_over = True
+            log.info(log.GAME, "landing velocity:", velocity)
+            if sim.crashed:
+                self.set_exhaust(EXHAUST_NONE)
+                self.mixer.voice[0].stop()
+                self.mixer.voice[1].stop()
+                self.mixer.voice[2].stop()
+
+                sim.thruster = False
+                message = f"CRASH!\n{reason}\nDo you want to repeat the mission?\nY or N"
+                self.display_message(message.upper())
+            else: # landed safely
+                gc.collect()
+        return True
 
+    def set_page(self, pagenum, snap=False):
+        # the lander is on page pagenum, snap puts the camera back on it
+        # instead of scrolling there
+        self.sim.tpage = pagenum
+        if snap:
+            self.camera_x = pagenum*DISPLAY_WIDTH
+            # every page, the camera may have been anywhere
+            for p in range(len(self.display_terrain)):
+                self.display_terrain[p].hidden = True
+                self.gem_group[p].hidden = True
+                self.volcano_group[p].hidden = True
+            self.place_pages()
+            self.place_lander()
+        return True
 
-            self.display.refresh()
-            self.display.auto_refresh = True
-            print(f"switch time: {time.monotonic() - timer}")
-            return True
+    def update_camera(self, lander_x):
+        # keep the lander, at world x lander_x, CAMERA_MARGIN from the
+        # screen edges, within the mission's pages. Returns the camera x.
+        camera = self.camera_x
+        if lander_x - camera < CAMERA_MARGIN:
+            camera = lander_x - CAMERA_MARGIN
+        elif lander_x + LANDER_WIDTH - camera > DISPLAY_WIDTH - CAMERA_MARGIN:
+            camera = lander_x + LANDER_WIDTH + CAMERA_MARGIN - DISPLAY_WIDTH
+        camera = max(0, min(camera, (len(self.display_terrain) - 1)*DISPLAY_WIDTH))
+        if camera != self.camera_x:
+            self.camera_x = camera
+            self.place_pages()
+        return camera
+
+    def place_pages(self):
+        # move the page strips under the camera, hide the ones out of view.
+        # Only the pages around the camera are visited, so the cost does
+        # not grow with the mission's page count.
+        first = max(self.camera_x//DISPLAY_WIDTH - 1, 0)
+        last = min((self.camera_x + DISPLAY_WIDTH - 1)//DISPLAY_WIDTH + 1, len(self.display_terrain) - 1)
+        for p in range(first, last + 1):
+            x = p*DISPLAY_WIDTH - self.camera_x
+            shown = -DISPLAY_WIDTH < x < DISPLAY_WIDTH
+            if shown:
+                self.display_terrain[p].x = x
+                self.gem_group[p].x = x
+                self.volcano_group[p].x = x
+                # most recently used, so a prefetch never evicts it
+                self.page_cache.get(p, self.page_images[p], self.display_terrain[p])
+            if shown == self.display_terrain[p].hidden:
+                if shown:
+                    self.update_lava(p) # lava of a page coming into view
+                self.display_terrain[p].hidden = not shown
+                self.gem_group[p].hidden = not shown
+                self.volcano_group[p].hidden = not shown
+        self.prefetch_pages(first, last)
+
+    def prefetch_pages(self, first, last):
+        # read the page next to the view into the page cache while the
+        # camera is within PREFETCH_MARGIN of it, so scrolling it into view
+        # only swaps the cached bitmap into its group. first and last are
+        # the pages around the camera, shown or not.
+        shown = (self.camera_x + DISPLAY_WIDTH - 1)//DISPLAY_WIDTH - self.camera_x//DISPLAY_WIDTH + 1
+        if len(self.page_cache.slots) <= shown:
+            return # no slot to spare without evicting a page in view
+        left = self.camera_x//DISPLAY_WIDTH - 1
+        if left >= first and self.camera_x - (left + 1)*DISPLAY_WIDTH < PREFETCH_MARGIN:
+            self.page_cache.prefetch(left, self.page_images[left])
+        right = (self.camera_x + DISPLAY_WIDTH - 1)//DISPLAY_WIDTH + 1
+        if right <= last and right*DISPLAY_WIDTH - self.camera_x - DISPLAY_WIDTH < PREFETCH_MARGIN:
+            self.page_cache.prefetch(right, self.page_images[right])
+
+    def place_lander(self):
+        # lander sprites at the simulation's position, through the camera
+        sim = self.sim
+        x = self.update_camera(sim.render_x() + sim.tpage*DISPLAY_WIDTH)
+        tile = self.display_lander[0]
+        self.display_lander.x = sim.render_x() + sim.tpage*DISPLAY_WIDTH - x + self.lander_offsets[2*tile]
+        self.display_lander.y = sim.render_y() + self.lander_offsets[2*tile + 1]
+        if not self.display_explosion.hidden:
+            self.place_explosion()
+
+    def place_explosion(self):
+        # the explosion's 48 pixel cell centred on the lander body
+        tile = self.display_lander[0]
+        self.display_explosion.x = self.display_lander.x - self.lander_offsets[2*tile] - 4
+        self.display_explosion.y = self.display_lander.y - self.lander_offsets[2*tile + 1] - 4
+
+    def set_lander_tile(self, tile):
+        # show an atlas frame, its cell moved so the body stays put
+        offsets = self.lander_offsets
+        old = self.display_lander[0]
+        self.display_lander[0] = tile
+        self.display_lander.x += offsets[2*tile] - offsets[2*old]
+        self.display_lander.y += offsets[2*tile + 1] - offsets[2*old + 1]
+
+    def set_exhaust(self, exhaust):
+        # show an exhaust with the lander, one tile write when it changes.
+        # The exhaust drew above the explosion and the body beneath it as
+        # separate sheets; in one frame it stays off while the explosion
+        # shows, so the explosion only ever covers the body.
+        if not self.display_explosion.hidden:
+            exhaust = EXHAUST_NONE
+        if exhaust != self.exhaust:
+            self.exhaust = exhaust
+            self.set_lander_tile(exhaust*LANDER_ROTATIONS + self.sim.rotate % LANDER_ROTATIONS)
 
     def switch_page(self):
         switch = False
-        if self.tpage == 0 and self.display_lander.y > 0 and self.display_lander.x > DISPLAY_WIDTH - LANDER_WIDTH//2:
+        page = self.sim.page_switch()
+        if page > self.sim.tpage:
             switch = self.next_page()
 
-        elif self.tpage == 1  and self.display_lander.y > 0 and self.display_lander.x < 0 - LANDER_WIDTH//2:
+        elif page < self.sim.tpage:
             switch = self.prev_page()
 
         return switch
 
     def next_page(self):
-        next_page = min(self.tpage + 1,len(self.display_terrain)-1)
+        next_page = min(self.sim.tpage + 1,len(self.display_terrain)-1)
         switch = False
-        if next_page != self.tpage:
+        if next_page != self.sim.tpage:
             switch = self.set_page(next_page)
         return switch
 
     def prev_page(self):
-        prev_page = max(self.tpage - 1,0)
+        prev_page = max(self.sim.tpage - 1,0)
         switch = False
-        if prev_page != self.tpage:
+        if prev_page != self.sim.tpage:
             switch = self.set_page(prev_page)
         return switch
 
@@ -1202,16 +1065,31 @@ class Game:
                     fpr.close()
                     self.missions.append({"dir":dir, "mission":data["mission"], "id": data["id"]})
             except OSError as e:
-                print(f"An OS error occurred: {e}")
+                log.error(log.GAME, f"An OS error occurred: {e}")
             except Exception as e:
-                print(f"An unexpected error occurred: {e}")
+                log.error(log.GAME, f"An unexpected error occurred: {e}")
+
+    def mission_text(self, m):
+        # a mission menu line, its name and best time
+        best = "--:--"
+        for t in self.times:
+            if t["id"] == m["id"]:
+                best = f"{int(t["time"])//60:02d}:{int(t["time"])%60:02d}"
+        return f"{m["mission"].upper():<30} " + best
+
+    def update_mission_list(self):
+        # best times set by the last game onto the mission menu
+        for m, label in zip(self.missions, self.mission_labels):
+            text = self.mission_text(m)
+            if label.text != text:
+                label.text = text
 
     def load_time_list(self):
-        print("load_time_list")
+        log.debug(log.GAME, "load_time_list")
         try:
             with open(timesfile, mode="r") as fpr:
                 self.times = json.load(fpr)
-                print(self.times)
+                log.debug(log.GAME, self.times)
                 fpr.close()
         except Exception as e:
                 pass # ignore if file does not exist
@@ -1248,7 +1126,7 @@ class Game:
             buff = self.get_key()
             #buff = None
             if buff != None:
-                print(buff)
+                log.debug(log.INPUT, buff)
                 if 4 in buff or 80 in buff or 82 in buff:
                     # move up
                     choice -= 1
@@ -1263,86 +1141,73 @@ class Game:
                     done = True
 
         #self.display.root_group = self.main_group
-        print(choice)
-        print(self.missions[choice])
+        self.mission_group.remove(rect)
+        log.info(log.GAME, "mission:", self.missions[choice])
         return self.missions[choice]["dir"]
 
     def load_mission(self,mission, repeat):
 
         # load mission data
-        print("load_mission()")
+        log.debug(log.GAME, "load_mission()")
         with open(f"missions/{mission}/data.json", mode="r") as fpr:
             data = json.load(fpr)
             fpr.close()
 
         if data['version'] > JSON_VERSION:
-            print("The mission is not supported with this version of Moon Miner, please upgrade to a newer version.")
+            log.error(log.GAME, "The mission is not supported with this version of Moon Miner, please upgrade to a newer version.")
             sys.exit()
-        self.gravity = data['gravity']
+        self.sim.load(data)
         self.diameter = data['diameter']
-        self.rotate = data['rotate']
-        self.frotate = (self.rotate*15+360)%360
-        self.stabilizer = data['stabilizer']
-        self.rotaterpm = data['rotaterpm']
         self.ticktimer = time.monotonic()
-        self.scale = data['scale']
-        print("rotate:",self.rotate)
-        self.xvelocity = data['xvelocity']
-        self.yvelocity = data['yvelocity']
-        self.xdistance = data['xdistance']
-        self.ydistance = data['ydistance']
-        self.thrust = data['thrust']
-        self.fuel = data['fuel']
-        self.fuelleak = data['fuelleak']
-        self.fuelfactor = data['fuelfactor']
-        self.startfuel = self.fuel
+        log.debug(log.GAME, "rotate:", self.sim.rotate)
         self.mission = data['mission']
         self.objective = data['objective']
         self.startpage = data['startpage']
         self.id = data['id']
-        self.mines = []
-        self.display_lander.x = int(self.xdistance*self.scale +.5)
-        self.display_lander.y = int(self.ydistance*self.scale +.5)
-        print(f"load_mission lander:({self.display_lander.x},{self.display_lander.y})")
+        tile = self.display_lander[0]
+        self.display_lander.x = self.sim.lander_x() + self.lander_offsets[2*tile]
+        self.display_lander.y = self.sim.lander_y() + self.lander_offsets[2*tile + 1]
+        log.debug(log.GAME, "load_mission lander:", self.display_lander.x, self.display_lander.y)
         self.fcount = 0
         self.game_over = False
 
         if not repeat:
-            self.pages = data["pages"]
-            max_volcanos = 4
-            self.display_lava = [[[0 for _ in range(LAVA_COUNT)] for _ in range(max_volcanos)] for _ in range(len(self.pages)+1)]
+            # the images of the mission loaded before
+            self.release_mission_assets()
+            # lava sprites per page, per volcano on the page
+            self.display_lava = []
             #print(self.display_lava)
             #sys.exit()
             #print(f"display_lava: {self.display_lava}")
-            #print(f"array size: {len(self.pages)}x{max_volcanos}x{LAVA_COUNT}")
+            #print(f"array size: {len(self.sim.pages)}x{max_volcanos}x{LAVA_COUNT}")
             # load background
-            background_bit, background_pal = adafruit_imageload.load(
-                f"missions/{mission}/" + data["background"],
-                #palette=displayio.Palette,
-                bitmap=displayio.Bitmap
-                )
+            background_bit, background_pal = self.load_mission_image(f"missions/{mission}/" + data["background"])
             self.display_background = displayio.TileGrid(background_bit, x=0, y=0,pixel_shader=background_pal)
             self.main_group.insert(0,self.display_background)
 
             # load terrain pages
 
             self.display_terrain.clear()
+            self.page_images.clear()
+            self.page_cache.clear()
             pagecount = 0
+            for page in data["pages"]:
+                if "volcanos" in page and self.display_lava_bit is None:
+                    # one lava sheet for every volcano of the mission
+                    self.display_lava_bit, self.display_lava_pal = self.load_mission_image("assets/lavasheet.bmp")
+                    self.display_lava_pal.make_transparent(self.display_lava_bit[0])
             for page in data["pages"]:
                 # define lava sprites
                 self.volcano_group.append(displayio.Group())
                 self.volcano_group[pagecount].x = -DISPLAY_WIDTH
                 self.main_group.append(self.volcano_group[-1])
+                self.display_lava.append([])
                 if "volcanos" in page:
-                    self.volcanos.append(page["volcanos"])
-                    print("volcanos:",self.volcanos)
+                    log.debug(log.DISPLAY, "volcanos:", page["volcanos"])
                     #volcano lava
-                    self.display_lava_bit, self.display_lava_pal = adafruit_imageload.load("assets/lavasheet.bmp",
-                         bitmap=displayio.Bitmap,
-                         palette=displayio.Palette)
-                    self.display_lava_pal.make_transparent(self.display_lava_bit[0])
                     vcount = 0
                     for volcano in page["volcanos"]:
+                        self.display_lava[pagecount].append([None]*LAVA_COUNT)
                         for i in range(LAVA_COUNT):
                             self.display_lava[pagecount][vcount][i] = displayio.TileGrid(self.display_lava_bit,
                                 pixel_shader = self.display_lava_pal,
@@ -1357,18 +1222,16 @@ class Game:
                         vcount += 1
                 #print(f"volcanos page {pagecount}: {self.display_lava[pagecount][vcount]}")
 
-                terrain_bit, terrain_pal = adafruit_imageload.load(
-                    f"missions/{mission}/{page['image']}",
-                    #palette=displayio.Palette,
-                    bitmap=displayio.Bitmap
-                    )
-                terrain_pal.make_transparent(terrain_bit[5])
-                self.display_terrain.append(displayio.TileGrid(terrain_bit, x=0, y=0,pixel_shader=terrain_pal))
+                # the terrain bitmap is loaded into this group by the page
+                # cache when the page scrolls into view
+                self.page_images.append(f"missions/{mission}/{page['image']}")
+                self.display_terrain.append(displayio.Group())
                 self.display_terrain[-1].x = 0-DISPLAY_WIDTH
                 #self.display_terrain[-1].hidden = True
                 self.main_group.append(self.display_terrain[-1])
-                #self.mines.append(page['mines'])
+                #self.sim.mines.append(page['mines'])
                 pagecount += 1
+            self.page_cache.reserve(self.page_images[data['startpage']], len(self.page_images))
 
 
         # for both new and repeat missions:
@@ -1380,44 +1243,19 @@ class Game:
         self.update_time_to_beat()
 
         # enable lava sprites
-        pagecount = 0
-        for page in data["pages"]:
+        for p in range(len(self.sim.volcanos)):
             vcount = 0
-            if "volcanos" in page:
-                for volcano in page["volcanos"]:
-                #for v in range(len(page["volcanos"])):
-                    y = 0
-                    #print("debug: lava 2:",self.display_lava[pagecount][vcount])
-                    #volcano["pcount"] = 0
-                    self.volcanos[pagecount][vcount]["pcount"] = 0
-                    for i in range(LAVA_COUNT):
-                        self.display_lava[pagecount][vcount][i].x = volcano["pos"]*TREZ
-                        self.display_lava[pagecount][vcount][i].y = DISPLAY_HEIGHT//LAVA_COUNT*(i+volcano["ppos"])
-                        #print(f"load_mission1: volcanos: {self.volcanos[pagecount][vcount]}")
-                        if self.volcanos[pagecount][vcount]["pattern"][self.volcanos[pagecount][vcount]["pcount"]] == 1:
-                            #lava randomizer here
-                            if "random" in self.volcanos[pagecount][vcount]:
-                                if random.randint(0,100) > self.volcanos[pagecount][vcount]["random"]:
-                                    self.display_lava[pagecount][vcount][i].hidden = False
-                                else:
-                                    self.display_lava[pagecount][vcount][i].hidden = True
-                            else:
-                                self.display_lava[pagecount][vcount][i].hidden = False
-                        else:
-                            self.display_lava[pagecount][vcount][i].hidden = True
-                        #print(f"start lava:{i}:{self.display_lava[pagecount][vcount][i].y}:{self.display_lava[pagecount][vcount][i].hidden}")
-                        self.display_lava[pagecount][vcount][i][0] = volcano["color"]*8 + i%8
-                        self.volcanos[pagecount][vcount]["pcount"] = (self.volcanos[pagecount][vcount]["pcount"]+1)%len(
-                            self.volcanos[pagecount][vcount]["pattern"])
-                    vcount += 1
-            pagecount += 1
+            for volcano in self.sim.volcanos[p]:
+                for i in range(LAVA_COUNT):
+                    self.display_lava[p][vcount][i].x = volcano["pos"]*TREZ
+                vcount += 1
+            self.update_lava(p)
 
         for i in range(len(self.gem_group)):
             self.main_group.remove(self.gem_group[i])
         self.gem_group.clear()
 
-        for page in data["pages"]:
-            self.mines.append(page['mines'])
+        for page in self.sim.pages:
             # load gems
             self.gem_group.append(displayio.Group())
             for m in page["mines"]:
@@ -1455,7 +1293,7 @@ class Game:
             self.gem_group[-1].hidden = False
             self.main_group.append(self.gem_group[-1])
 
-        print(f"load_mission lander:({self.display_lander.x},{self.display_lander.y})")
+        log.debug(log.GAME, "load_mission lander:", self.display_lander.x, self.display_lander.y)
         # workaround for appending top layers after volcano groups
         try:
             self.main_group.remove(self.lander_group)
@@ -1486,91 +1324,101 @@ class Game:
             self.time_to_beat_text.hidden = True
 
     def new_game(self, repeat):
-        print("new_game()")
+        log.debug(log.GAME, "new_game()")
+        # seed the lava randomizer, from the recording when playing one back
+        self.playback = None
+        seed = random.getrandbits(16)
+        if REPLAY_MODE == "play":
+            recording = replay.load()
+            if recording is not None and recording.mission == self.currentmission:
+                if recording.matches(self.sim):
+                    log.info(log.GAME, f"replaying {len(recording.frames)} frames")
+                    self.playback = recording
+                    seed = recording.seed
+                else:
+                    log.warn(log.GAME, f"replay not played: recorded with flags {recording.flags}, the game runs {replay.sim_flags(self.sim)}")
+        self.sim.seed = seed
         self.load_mission(self.currentmission, repeat)
+        if self.recorder is not None:
+            self.recorder.start(self.currentmission, seed, replay.sim_flags(self.sim))
+        self.frametimes.reset()
 
-        self.set_page(self.startpage, False)
+        self.set_page(self.startpage, True)
         self.display_lander.hidden = True
         #print("new game:",self.startpage, self.gem_group[0].hidden, self.gem_group[1].hidden)
-        self.display_lander[0] = self.display_thrust1[0] = self.display_thrust2[0] = self.display_thrust3[0]= self.rotate % 24
+        self.exhaust = EXHAUST_NONE
+        self.set_lander_tile(self.sim.rotate % LANDER_ROTATIONS)
 
         self.landed = False
-        self.onground = False
+        self.sim.onground = False
         self.timer = 0
         self.engine_shutoff()
         self.display_lander.hidden = False
         self.score = 0
-        self.rotating = 0
-        self.lockout = False
-        self.crashed = False
+        self.sim.rotating = 0
+        self.lockout = self.playback is not None # no player input while replaying
+        self.sim.crashed = False
         #fruit_jam.audio.stop()
         self.update_score()
-        print(f"new game lander:({self.display_lander.x},{self.display_lander.y})")
+        log.debug(log.GAME, "new game lander:", self.display_lander.x, self.display_lander.y)
 
         if not self.init_keyboard():
-            print("Failed to initialize keyboard or no keyboard attached")
+            log.warn(log.INPUT, "Failed to initialize keyboard or no keyboard attached")
             return
 
     def engine_shutoff(self):
-        if self.thruster:
-            print("engine shutoff")
+        if self.sim.thruster and log.level[log.GAME] >= log.DEBUG:
+            log.write(log.GAME, "engine shutoff")
         #fruit_jam.audio.stop()
         self.mixer.voice[0].stop()
-        self.display_thrust1.hidden = True
-        self.display_thrust2.hidden = True
-        self.display_thrust3.hidden = True
-        self.thruster = False
+        self.set_exhaust(EXHAUST_NONE)
+        self.sim.thruster = False
         self.display_thruster = False
 
     def update_panel(self, force):
         if self.fcount%4 == 1 or force: #update 5 frames per second
             # update panel
-            self.velocityx_text.text = f"{abs(self.xvelocity):05.1f}"
-            self.velocityy_text.text = f"{abs(self.yvelocity):05.1f}"
-            if self.xvelocity > 0:
+            self.hud.set_number(self.velocityx_field, self.sim.xvelocity)
+            self.hud.set_number(self.velocityy_field, self.sim.yvelocity)
+            if self.sim.xvelocity > 0:
                 self.arrowh[0] = 4
-            elif self.xvelocity < 0:
+            elif self.sim.xvelocity < 0:
                 self.arrowh[0] = 3
             else:
                 self.arrowh[0] = 0
-            if self.yvelocity > 0:
+            if self.sim.yvelocity > 0:
                 self.arrowv[0] = 2
-            elif self.yvelocity < 0:
+            elif self.sim.yvelocity < 0:
                 self.arrowv[0] = 1
             else:
                 self.arrowv[0] = 0
-            if self.stabilizer != 1:
-                self.rotation_text.text = f"{int(abs(self.rotaterpm)):05.1f}"
-                if self.rotaterpm > 0:
+            if self.sim.stabilizer != 1:
+                self.hud.set_number(self.rotation_field, int(self.sim.rotaterpm))
+                if self.sim.rotaterpm > 0:
                     self.arrowr[0] = 5
-                elif self.rotaterpm < 0:
+                elif self.sim.rotaterpm < 0:
                     self.arrowr[0] = 6
                 else:
                     self.arrowr[0] = 0
-            terrainpos = max(0,self.display_lander.x//TREZ)
-            #if not self.crashed:
-            self.altitude_text.text = f"{(DISPLAY_HEIGHT - LANDER_HEIGHT - self.display_lander.y - self.pages[self.tpage]["terrain"][terrainpos]+ 4)/self.scale:05.1f}"
-            self.fuel_text.text = f"{self.fuel:06.1f}"
-            if self.fuel < 500:
+            self.hud.set_number(self.altitude_field, self.sim.altitude(), signed=True)
+            self.hud.set_number(self.fuel_field, self.sim.fuel, signed=True)
+            if self.sim.fuel < 500:
                 if not self.mixer.voice[1].playing and not self.game_over:
                     self.mixer.voice[1].play(self.beep_wave,loop=True)
-                self.fuel_text.color = 0xff0000
-                if self.fcount%20 > 10:
-                    self.fuel_text.hidden = True
-                else:
-                    self.fuel_text.hidden = False
-            elif self.fuel < 1000:
+                self.hud.set_ink(HUD_FUEL, 0xff0000)
+                self.hud.show_ink(HUD_FUEL, self.fcount%20 <= 10)
+            elif self.sim.fuel < 1000:
                 if self.mixer.voice[1].playing:
                     self.mixer.voice[1].stop()
-                self.fuel_text.color = 0xffff00
+                self.hud.set_ink(HUD_FUEL, 0xffff00)
             else:
                 if self.mixer.voice[1].playing:
                     self.mixer.voice[1].stop()
-                self.fuel_text.color = 0x00ff00
+                self.hud.set_ink(HUD_FUEL, 0x00ff00)
 
             if (time.monotonic() - self.gtimer + 1) >= self.timer:
                 self.timer += 1
-            self.time_text.text = f"{self.timer//60:02d}:{self.timer%60:02d}"
+            self.hud.set_clock(self.time_field, self.timer)
 
     def yes(self):
         # get yes or no feedback
@@ -1594,144 +1442,103 @@ class Game:
 
     def tick(self):
         # update non-crash graphics (WIP)
-        self.oldticktimer = self.ticktimer
-        self.ticktimer = time.monotonic()
-
+        sim = self.sim
         self.fcount += 1
-        if self.fuelleak > 0:
-            self.fuel -= self.fuelleak / 20
-        if self.fuel <= 0:
-            self.btimer = 0
-            self.engine_shutoff()
 
-        if self.fuel > 0 and self.thruster:
+        if sim.fuel > 0 and sim.thruster:
             if self.btimer > 0 and time.monotonic() - self.btimer < .1:
-                self.display_thrust1.hidden = False
+                self.set_exhaust(EXHAUST_THRUST1)
             if self.btimer > 0 and time.monotonic() - self.btimer > .1:
-                self.display_thrust1.hidden = True
                 if self.fcount%20 < 5:
-                    self.display_thrust2.hidden = False
-                    self.display_thrust3.hidden = True
+                    self.set_exhaust(EXHAUST_THRUST2)
                 else:
-                    self.display_thrust2.hidden = True
-                    self.display_thrust3.hidden = False
+                    self.set_exhaust(EXHAUST_THRUST3)
 
         newtime = time.monotonic() -self.dtime
         self.dtime = time.monotonic()
+        if self.playback is not None:
+            self.replay_frame()
+        elif self.recorder is not None:
+            bits = replay.input_bits(sim)
+            self.recorder.frame(bits, sim.advance(newtime))
+        else:
+            sim.advance(newtime)
+        if sim.impact >= 0 and log.level[log.GAME] >= log.DEBUG:
+            log.write(log.GAME, f"contact {sim.impact:.2f}s into a {newtime:.2f}s frame")
 
-        if not self.onground:
-            #if self.crashed:
-                #self.yvelocity = 0
-                #self.xvelocity = 0
-            #    pass
-            #else:
-            self.yvelocity = (self.gravity * newtime) + self.yvelocity
-            if self.thruster:
-                self.yvelocity -= self.thrust*math.cos(math.radians(self.rotate*15))
-                self.xvelocity += self.thrust*math.sin(math.radians(self.rotate*15))
-                self.fuel -= self.fuelfactor
-                if self.fuel <= 0:
-                    self.fuel = 0
-                    self.btimer = 0
-                    self.engine_shutoff()
-                    #self.display_thrust1.hidden = True
-                    #self.display_thrust2.hidden = True
-                    #self.display_thrust3.hidden = True
-                    #self.thruster = False
-            #distance = (self.yvelocity * newtime)*scale
-            if self.stabilizer != 1 and self.rotaterpm != 0: # stabilizer is off
-                self.frotate += self.rotaterpm / (self.ticktimer - self.oldticktimer) / 60
-                self.frotate = self.frotate%360
-                print(f"time:{self.ticktimer - self.oldticktimer}, rpm:{self.rotaterpm}, frotate:{self.frotate}")
-                rotate = int(self.frotate)%360//15 # nearest 15 degree
-                print(f"rotate:{rotate}")
-                self.rotate = rotate
-                self.display_lander[0] = self.display_thrust1[0] = self.display_thrust2[0] = self.display_thrust3[0] = self.rotate % 24
-
-            self.xdistance += self.xvelocity * newtime
-            self.ydistance += self.yvelocity * newtime
-
-            self.display_lander.x = self.display_explosion.x = int(self.xdistance*self.scale +.5) - self.tpage*DISPLAY_WIDTH
-            self.display_lander.y = self.display_explosion.y = int(self.ydistance*self.scale +.5)
-            #print(f"debug y: {self.display_lander.y}")
-            self.display_explosion.x = self.display_lander.x - 4
-            self.display_explosion.y = self.display_lander.y - 4
-            self.display_thrust1.x = self.display_lander.x
-            self.display_thrust1.y = self.display_lander.y
-            self.display_thrust2.x = self.display_thrust1.x - 8
-            self.display_thrust2.y = self.display_thrust1.y - 8
-            self.display_thrust3.x = self.display_thrust1.x - 8
-            self.display_thrust3.y = self.display_thrust1.y - 8
-            if not self.rotatingnow and self.fcount%2 == 0:
-                self.rotating = 0
-            else:
-                if self.rotating < 0 and self.fcount%2 == 0: # "a" rotate left
-                    self.rotate = (self.rotate-1)%24
-                    self.rotaterpm -= 10
-                    self.display_lander[0] = self.display_thrust1[0] = self.display_thrust2[0] = self.display_thrust3[0] = self.rotate % 24
-                elif self.rotating > 0 and self.fcount%2 == 0: # "d" rotate right
-                    self.rotate = (self.rotate+1)%24
-                    self.rotaterpm += 10
-                    self.display_lander[0] = self.display_thrust1[0] = self.display_thrust2[0] = self.display_thrust3[0] = self.rotate % 24
-
-        #if self.tpage > 0:
-        #    print("volcanos:",self.volcanos)
-        #if len(self.volcanos) > 0 and len(self.volcanos[self.tpage]) > 0:
-        if len(self.volcanos) > self.tpage:
-            # lava animation here
-            for v in range(len(self.volcanos[self.tpage])):
-                lava_color = self.volcanos[self.tpage][v]["color"]
-                for i in range(LAVA_COUNT):
-                    #print(f"{i} of {LAVA_COUNT}")
-                    #print(f"volcano:{self.volcanos[v]}, item:{i}")
-                    #self.display_lava[v][i].y -= self.volcanos[v][0]["speed"]
-                    self.display_lava[self.tpage][v][i].y -= int(self.volcanos[self.tpage][v]["speed"]*newtime*self.scale+.5)
-
-                    #rotate lava rock
-                    if self.fcount%5 == 0:
-                        self.display_lava[self.tpage][v][i][0] = lava_color*8 + (self.display_lava[self.tpage][v][i][0]+1)%8
-                    # reuse lava sprite
-                    if self.display_lava[self.tpage][v][i].y <= 0 - DISPLAY_HEIGHT//LAVA_COUNT:
-                        self.display_lava[self.tpage][v][i].y += DISPLAY_HEIGHT
-                        print(f'tick:{i}:{self.volcanos[self.tpage][v]["pcount"]}:{self.display_lava[self.tpage][v][i].y}:{
-                            self.volcanos[self.tpage][v]["pattern"][self.volcanos[self.tpage][v]["pcount"]]}')
-
-                        #lava randomizer here
-                        if self.volcanos[self.tpage][v]["pattern"][self.volcanos[self.tpage][v]["pcount"]] == 1:
-                            if "random" in self.volcanos[self.tpage][v]:
-                                if random.randint(0,100) > self.volcanos[self.tpage][v]["random"]:
-                                    self.display_lava[self.tpage][v][i].hidden = False
-                                else:
-                                    self.display_lava[self.tpage][v][i].hidden = True
-                            else:
-                                self.display_lava[self.tpage][v][i].hidden = False
-                        else:
-                            self.display_lava[self.tpage][v][i].hidden = True
-
+        # project the simulation state onto the sprites
+        if sim.engine_out:
+            sim.engine_out = False
+            self.btimer = 0
+            self.engine_shutoff()
 
-                        self.volcanos[self.tpage][v]["pcount"] = (self.volcanos[self.tpage][v]["pcount"]+1)%len(
-                            self.volcanos[self.tpage][v]["pattern"])
+        if sim.rotate_changed:
+            sim.rotate_changed = False
+            self.set_lander_tile(self.exhaust*LANDER_ROTATIONS + sim.rotate % LANDER_ROTATIONS)
 
-                        #self.volcanos[self.tpage][v]["pcount"] = (self.volcanos[self.tpage][v]["pcount"]+1)%len(self.volcanos[self.tpage][v]["pattern"])
-                        #print(f"tick: volcanos: {self.volcanos[self.tpage][v]["pcount"]}")
+        if not sim.onground:
+            self.place_lander()
 
+        # lava animation on every page on screen, the lander's page and
+        # the neighbour scrolled in beside it
+        for p in range(max(sim.tpage - 1, 0), min(sim.tpage + 2, len(self.volcano_group))):
+            if not self.volcano_group[p].hidden:
+                self.update_lava(p)
 
         self.update_panel(False)
 
+    def replay_frame(self):
+        # next recorded frame in place of player input and wall time
+        sim = self.sim
+        if not self.playback.more():
+            log.info(log.GAME, "replay finished")
+            self.playback = None
+            self.lockout = False
+            return
+        thruster = sim.thruster
+        replay.run_frame(sim, self.playback.next())
+        if sim.thruster and not thruster:
+            self.btimer = time.monotonic()
+            self.set_exhaust(EXHAUST_THRUST1)
+            self.mixer.voice[0].play(self.thrust_wave,loop=True)
+        elif thruster and not sim.thruster:
+            self.btimer = 0
+            self.engine_shutoff()
+
+    def update_lava(self, page):
+        # place a page's lava sprites from the simulation's lava model
+        sim = self.sim
+        phase = sim.lava_phase()
+        v = 0
+        for volcano in sim.volcanos[page]:
+            lava_color = volcano["color"]
+            lava = self.display_lava[page][v]
+            rise = sim.lava_rise(page, v)
+            for i in range(LAVA_COUNT):
+                lava[i].y = sim.lava_slot_y(page, v, i, rise)
+                lava[i].hidden = not sim.lava_shown(page, v, i, rise)
+                #rotate lava rock
+                lava[i][0] = lava_color*8 + (i + phase)%8
+            v += 1
+
     def paused(self):
         #paused
-        print("paused")
+        log.info(log.GAME, "paused")
         gc.enable()
         save_time = time.monotonic() - self.gtimer
         self.pause_label.hidden = False
-        self.fuel_text.hidden = False
+        self.hud.show_ink(HUD_FUEL, True)
         # stop sound while paused
         self.mixer.voice[0].stop()
         self.mixer.voice[1].stop()
         self.mixer.voice[2].stop()
+        if self.recorder is not None:
+            self.recorder.pause()
+        self.frametimes.dump()
+        self.frametimes.skip_frame()
         # debug stuff here
-        lander_alt = DISPLAY_HEIGHT - LANDER_HEIGHT - self.display_lander.y + 4
-        print(f"lander:({self.display_lander.x},{self.display_lander.y}), alt: {lander_alt}")
+        lander_alt = DISPLAY_HEIGHT - LANDER_HEIGHT - self.display_lander.y + self.lander_offsets[2*self.display_lander[0] + 1] + 4
+        log.info(log.GAME, f"lander:({self.display_lander.x},{self.display_lander.y}), alt: {lander_alt}")
 
         while True:
             time.sleep(.001)
@@ -1750,26 +1557,32 @@ class Game:
                 self.pause_label.hidden = True
                 break # unpaused
 
+    def save_logs(self):
+        # end of a mission attempt, write out its recording and frame times
+        if self.recorder is not None and self.playback is None:
+            self.recorder.save()
+        self.frametimes.save()
+
     def play_game(self):
-        print("play_game()")
+        log.debug(log.GAME, "play_game()")
         self.currentmission = self.choose_mission()
         self.display.root_group = self.getready_group
         self.new_game(False)
         gc.collect()
         gc.disable()
-        self.display_message(f"Mission:{self.mission}\n{self.objective}\nGravity:{self.gravity} M/s/s({self.gravity/9.8*100:.2f}% Earth)\nDiameter:{self.diameter} km".upper())
+        self.display_message(f"Mission:{self.mission}\n{self.objective}\nGravity:{self.sim.gravity} M/s/s({self.sim.gravity/9.8*100:.2f}% Earth)\nDiameter:{self.diameter} km".upper())
         #self.display_message(f"Mission:{self.mission}\n{self.objective}".upper())
         self.wait_for_key()
         #time.sleep(5)
-        self.rotatingnow = False
+        self.sim.rotatingnow = False
         #self.display.refresh()
         self.clear_message()
-        if self.fuelleak > 0:
+        if self.sim.fuelleak > 0:
             self.display_message(f"Alert: Fuel leak detected, monitor fuel level.".upper())
             self.wait_for_key()
             self.clear_message()
         fillup = False
-        if self.stabilizer != 1:
+        if self.sim.stabilizer != 1:
             self.display_message("Alert: Stabilizer out of order, use manual override.".upper())
             self.wait_for_key()
             self.clear_message()
@@ -1781,7 +1594,9 @@ class Game:
         self.btimer = 0 # burn timer
         self.fcount = 0
         while True:
+            t = frametimes.ticks_ms()
             buff = self.get_button()
+            self.frametimes.add(frametimes.INPUT, frametimes.elapsed(t))
             #buff = None
             if self.last_input == "c" and buff != None:
                 #print(f"buff:{buff}")
@@ -1790,107 +1605,115 @@ class Game:
                 if not self.lockout:
                     if buff[BTN_ABXY_INDEX] == 0x2F:
                         #print("A pressed")
-                        if self.fuel > 0:
-                            if not self.thruster:
+                        if self.sim.fuel > 0:
+                            if not self.sim.thruster:
                                 self.btimer = time.monotonic()
-                            self.display_thrust1.hidden = False
-                            self.display_thrust2.hidden = True
-                            self.display_thrust3.hidden = True
-                            self.thruster = True
+                            self.set_exhaust(EXHAUST_THRUST1)
+                            self.sim.thruster = True
                             self.landed = False
                             #fruit_jam.audio.play(self.thrust_wave, loop=True)
                             self.mixer.voice[0].play(self.thrust_wave,loop=True)
                     else:
                         self.btimer = 0
                         self.engine_shutoff()
-                        print("c:after engine_shutoff():",buff)
+                        if log.level[log.INPUT] >= log.DEBUG:
+                            log.write(log.INPUT, "c:after engine_shutoff():", buff)
 
                     if buff[BTN_DPAD_RIGHTLEFT_INDEX] == 0x00 or buff[BTN_DPAD_RIGHTLEFT_INDEX] == 0xFF:
                         if buff[BTN_DPAD_RIGHTLEFT_INDEX] == 0x00: # rotate left
-                            self.rotating = -1
-                            self.rotatingnow = True
+                            self.sim.rotating = -1
+                            self.sim.rotatingnow = True
                         elif buff[BTN_DPAD_RIGHTLEFT_INDEX] == 0xFF: # "d" rotate right
-                            self.rotating = 1
-                            self.rotatingnow = True
+                            self.sim.rotating = 1
+                            self.sim.rotatingnow = True
                     else:
-                        self.rotatingnow = False
+                        self.sim.rotatingnow = False
                 if buff[BTN_OTHER_INDEX] == 0x10:
                     save_time = time.monotonic() - self.gtimer
                     message = f"Do you want to quit the game? Y or N"
                     self.display_message(message.upper())
                     if self.yes():
+                        self.save_logs()
                         return
                     else:
                         self.dtime = time.monotonic()
                         self.gtimer =  time.monotonic() - save_time # adjust timer for paused game
+                        self.frametimes.skip_frame()
                     self.clear_message()
             elif self.last_input == "c" and not self.lockout:
-                self.rotatingnow = False
-                self.rotating = 0
+                self.sim.rotatingnow = False
+                self.sim.rotating = 0
                 self.btimer = 0
                 self.engine_shutoff()
-                print("c2:after engine_shutoff():",buff)
+                if log.level[log.INPUT] >= log.DEBUG:
+                    log.write(log.INPUT, "c2:after engine_shutoff():", buff)
+            t = frametimes.ticks_ms()
             buff = self.get_key()
+            self.frametimes.add(frametimes.INPUT, frametimes.elapsed(t))
             if self.last_input == "k" and buff != None:
-                print(f"buff:",buff)
+                if log.level[log.INPUT] >= log.DEBUG:
+                    log.write(log.INPUT, "buff:", buff)
                 space_key = 44
                 if 44 in buff:
                     self.paused()
                 if not self.lockout:
                     if 22 in buff: # "s" thrust
                         #self.last_input = "k"
-                        if self.fuel > 0:
+                        if self.sim.fuel > 0:
                             self.btimer = time.monotonic()
-                            self.display_thrust1.hidden = False
-                            self.display_thrust2.hidden = True
-                            self.display_thrust3.hidden = True
-                            self.thruster = True
+                            self.set_exhaust(EXHAUST_THRUST1)
+                            self.sim.thruster = True
                             self.landed = False
-                            self.onground = False
-                            self.yvelocity -= .5
+                            self.sim.onground = False
+                            self.sim.yvelocity -= replay.KICK
+                            if self.recorder is not None:
+                                self.recorder.kick()
                             #fruit_jam.audio.play(self.thrust_wave, loop=True)
                             self.mixer.voice[0].play(self.thrust_wave,loop=True)
                     else:
                         self.btimer = 0
                         self.engine_shutoff()
-                        print("k:after engine_shutoff():",buff)
+                        if log.level[log.INPUT] >= log.DEBUG:
+                            log.write(log.INPUT, "k:after engine_shutoff():", buff)
                     if 4 in buff or 7 in buff:
                         #self.last_input = "k"
                         if 4 in buff: # "a" rotate left
-                            self.rotating = -1
-                            self.rotatingnow = True
+                            self.sim.rotating = -1
+                            self.sim.rotatingnow = True
                         elif 7 in buff: # "d" rotate right
-                            self.rotating = 1
-                            self.rotatingnow = True
+                            self.sim.rotating = 1
+                            self.sim.rotatingnow = True
                     else:
-                        self.rotatingnow = False
+                        self.sim.rotatingnow = False
                 if 20 in buff: # q for quit
                     save_time = time.monotonic() - self.gtimer
                     message = f"Do you want to quit the game? Y or N"
                     self.display_message(message.upper())
                     if self.yes():
+                        self.save_logs()
                         return
                     else:
                         self.dtime = time.monotonic()
                         self.gtimer =  time.monotonic() - save_time # adjust timer for paused game
+                        self.frametimes.skip_frame()
                     self.clear_message()
 
             if time.monotonic() - ftimer > FRAME_RATE:
-                oldftimer = ftimer
                 ftimer = time.monotonic()
-                f1 = time.monotonic()
+                t = self.frametimes.frame_start()
                 self.tick()
-                f2 = time.monotonic()
-                if self.fcount%20 == 0: # print every second
-                    print(f"frame {self.fcount} time: {time.monotonic() - oldftimer}, tick time: {f2 - f1}")
-                if time.monotonic() - oldftimer  > .5:
-                    print(f"delay found at frame {self.fcount}: {time.monotonic() - ftimer}")
-                    print(f"tick() time: {f2 - f1}")
+                self.frametimes.add(frametimes.TICK, frametimes.elapsed(t))
                 time.sleep(0.001)  # Small delay to prevent blocking
 
-                if self.collision_detected():
+                t = frametimes.ticks_ms()
+                lava = self.collision_detected()
+                ground = not lava and self.ground_detected()
+                self.frametimes.add(frametimes.COLLISION, frametimes.elapsed(t))
+                self.frametimes.frame_end()
+                if lava:
                     self.update_panel(True) # update panel after crashing
-                    print("lava crash detected")
+                    log.info(log.GAME, "lava crash detected")
+                    self.save_logs()
                     self.btimer = 0
                     gc.enable()
                     if self.yes():
@@ -1901,9 +1724,9 @@ class Game:
                     gc.collect()
                     gc.disable()
                     if repeat:
-                        #print(f"repeat1: volcanos: {self.volcanos[self.tpage][0]["pcount"]}")
+                        #print(f"repeat1: volcanos: {self.sim.volcanos[self.sim.tpage][0]["pcount"]}")
                         self.new_game(True)
-                        #print(f"repeat2: volcanos: {self.volcanos[self.tpage][0]["pcount"]}")
+                        #print(f"repeat2: volcanos: {self.sim.volcanos[self.sim.tpage][0]["pcount"]}")
                         self.btimer = 0
                         #self.display.refresh()
 
@@ -1915,141 +1738,127 @@ class Game:
                     else:
                         return
 
-                elif self.ground_detected():
+                elif ground:
                     self.update_panel(True) # update panel after landing
                     self.landed = True
-                    if not self.crashed:
+                    if not self.sim.crashed:
                         #good landing
                         self.engine_shutoff()
                         # did we land at a base with goodies?
-                        lpos = (self.display_lander.x + 4)// TREZ
-                        #print(self.tpage, self.display_lander.x, lpos)
-                        #print("tpage:",self.tpage)
-                        #print("mines:",self.mines)
-
-                        for m in self.mines[self.tpage]:
-                            #print("m:",m)
-                            x = m["pos"]
-                            l = m["len"]
-                            if x <= lpos and lpos <= x + l:
-                                if m["type"] == "m" and m["count"] > 0:
-                                    print(f"score! {m}")
-                                    # animation here
-                                    save_time = time.monotonic() - self.gtimer
-
-                                    gemtype = min(9,6 + m["color"])
-
-                                    animate_gem = displayio.TileGrid(self.gems_bit, pixel_shader=self.gems_pal,
-                                        width=1, height=1,
-                                        tile_height=16, tile_width=16,
-                                        default_tile=gemtype,
-                                        x=m["sprite1"].x, y=m["sprite1"].y)
-                                    #self.gem_group[-1].append(animate_gem)
-                                    ascale=2
-                                    animate_group = displayio.Group(scale=ascale)
-                                    self.main_group.append(animate_group)
-                                    animate_group.append(animate_gem)
-                                    x1 = m["sprite1"].x//ascale
-                                    y1 = m["sprite1"].y//ascale
-                                    x2 = 60//ascale
-                                    y2 = -32//ascale
-                                    for i in range(m["count"]):
-                                        if m["sprite2"][0] >= 1:
-                                            m["sprite2"][0] -= 1
-                                        elif m["sprite2"] != None:
-                                            m["sprite2"].hidden = True
-                                        if i >= m["count"] - 1:
-                                            m["sprite1"].hidden = True
-                                        #fruit_jam.audio.play(self.reward_wave, loop=False)
-                                        self.mixer.voice[2].play(self.reward_wave,loop=False)
-                                        for j in range(40):
-                                            animate_gem.x = x1 + (x2-x1)*j//40
-                                            animate_gem.y = y1 + (y2-y1)*j//40
-                                            time.sleep(.02)
-                                        #self.score += m["amount"]
-                                    #print("debug1:",self.gem_group[self.tpage])
-                                    #self.gem_group[self.tpage].remove(m["sprite1"])
-                                    #print("debug2")
-                                    m["count"] = 0
-                                    animate_gem.hidden = True
-                                    self.update_score()
-                                    #if m["sprite2"] != None:
-                                    #    m["sprite2"].hidden = True
-                                    self.gtimer =  time.monotonic() - save_time # adjust timer for paused game
-                                    break
-                                elif fillup == False and m["type"] == "f" and m["count"] > 0:
-                                    print(f"added fuel")
-                                    self.fuel_text.hidden = False
-                                    # animation here
-                                    save_time = time.monotonic() - self.gtimer
-                                    ascale=2
-
-                                    animate_fuel = displayio.TileGrid(self.gems_bit, pixel_shader=self.gems_pal,
-                                        width=1, height=1,
-                                        tile_height=16, tile_width=16,
-                                        default_tile=5,
-                                        x=m["sprite1"].x, y=m["sprite1"].y)
-
-                                    animate_group = displayio.Group(scale=ascale)
-                                    self.main_group.append(animate_group)
-                                    animate_group.append(animate_fuel)
-
-                                    x1 = m["sprite1"].x//ascale
-                                    y1 = m["sprite1"].y//ascale
-                                    x2 = 60//ascale
-                                    y2 = 32//ascale
+                        m = self.sim.landing_pad(fillup)
+                        if m is not None:
+                            if m["type"] == "m" and m["count"] > 0:
+                                log.info(log.GAME, f"score! {m}")
+                                # animation here
+                                save_time = time.monotonic() - self.gtimer
+
+                                gemtype = min(9,6 + m["color"])
+                                # the pad on screen, its page group is scrolled
+                                padx = self.gem_group[self.sim.tpage].x + m["sprite1"].x
+
+                                animate_gem = displayio.TileGrid(self.gems_bit, pixel_shader=self.gems_pal,
+                                    width=1, height=1,
+                                    tile_height=16, tile_width=16,
+                                    default_tile=gemtype,
+                                    x=padx, y=m["sprite1"].y)
+                                #self.gem_group[-1].append(animate_gem)
+                                ascale=2
+                                animate_group = displayio.Group(scale=ascale)
+                                self.main_group.append(animate_group)
+                                animate_group.append(animate_gem)
+                                x1 = padx//ascale
+                                y1 = m["sprite1"].y//ascale
+                                x2 = 60//ascale
+                                y2 = -32//ascale
+                                for i in range(m["count"]):
                                     if m["sprite2"][0] >= 1:
                                         m["sprite2"][0] -= 1
                                     elif m["sprite2"] != None:
                                         m["sprite2"].hidden = True
-                                    m["count"] -= 1
-                                    if m["count"] < 1:
+                                    if i >= m["count"] - 1:
                                         m["sprite1"].hidden = True
+                                    #fruit_jam.audio.play(self.reward_wave, loop=False)
                                     self.mixer.voice[2].play(self.reward_wave,loop=False)
                                     for j in range(40):
-                                        animate_fuel.x = x1 + (x2-x1)*j//40
-                                        animate_fuel.y = y1 + (y2-y1)*j//40
+                                        animate_gem.x = x1 + (x2-x1)*j//40
+                                        animate_gem.y = y1 + (y2-y1)*j//40
                                         time.sleep(.02)
-                                    self.fuel += m["amount"]
-                                    # don't overfill the tank!
-                                    self.fuel = min(self.fuel,self.startfuel)
-                                    #if m["sprite2"][0] >= 1:
-                                    #    m["sprite2"][0] -= 1
-                                    animate_fuel.hidden = True
-                                    #if m["sprite2"] != None:
-                                    #    m["sprite2"].hidden = True
-                                    self.gtimer =  time.monotonic() - save_time # adjust timer for paused game
-                                    fillup = True
-                                    break
-                        minecount = 0
-                        minerals = 0
-                        for p in range(len(self.display_terrain)):
-                            for m in self.mines[p]:
-                                if m["type"] == "m":
-                                    minecount += 1
-                                    if m["count"] == 0:
-                                        minerals += 1
+                                    #self.score += m["amount"]
+                                #print("debug1:",self.gem_group[self.sim.tpage])
+                                #self.gem_group[self.sim.tpage].remove(m["sprite1"])
+                                #print("debug2")
+                                self.sim.collect_mine(m)
+                                animate_gem.hidden = True
+                                self.update_score()
+                                #if m["sprite2"] != None:
+                                #    m["sprite2"].hidden = True
+                                self.gtimer =  time.monotonic() - save_time # adjust timer for paused game
+                            elif fillup == False and m["type"] == "f" and m["count"] > 0:
+                                log.info(log.GAME, f"added fuel")
+                                self.hud.show_ink(HUD_FUEL, True)
+                                # animation here
+                                save_time = time.monotonic() - self.gtimer
+                                ascale=2
+                                # the pad on screen, its page group is scrolled
+                                padx = self.gem_group[self.sim.tpage].x + m["sprite1"].x
+
+                                animate_fuel = displayio.TileGrid(self.gems_bit, pixel_shader=self.gems_pal,
+                                    width=1, height=1,
+                                    tile_height=16, tile_width=16,
+                                    default_tile=5,
+                                    x=padx, y=m["sprite1"].y)
+
+                                animate_group = displayio.Group(scale=ascale)
+                                self.main_group.append(animate_group)
+                                animate_group.append(animate_fuel)
+
+                                x1 = padx//ascale
+                                y1 = m["sprite1"].y//ascale
+                                x2 = 60//ascale
+                                y2 = 32//ascale
+                                if m["sprite2"][0] >= 1:
+                                    m["sprite2"][0] -= 1
+                                elif m["sprite2"] != None:
+                                    m["sprite2"].hidden = True
+                                m["count"] -= 1
+                                if m["count"] < 1:
+                                    m["sprite1"].hidden = True
+                                self.mixer.voice[2].play(self.reward_wave,loop=False)
+                                for j in range(40):
+                                    animate_fuel.x = x1 + (x2-x1)*j//40
+                                    animate_fuel.y = y1 + (y2-y1)*j//40
+                                    time.sleep(.02)
+                                self.sim.fuel += m["amount"]
+                                # don't overfill the tank!
+                                self.sim.fuel = min(self.sim.fuel,self.sim.startfuel)
+                                #if m["sprite2"][0] >= 1:
+                                #    m["sprite2"][0] -= 1
+                                animate_fuel.hidden = True
+                                #if m["sprite2"] != None:
+                                #    m["sprite2"].hidden = True
+                                self.gtimer =  time.monotonic() - save_time # adjust timer for paused game
+                                fillup = True
+                        minerals, minecount = self.sim.mine_progress()
                         if minerals == minecount:
                             # return to base
                             message = f"Returning to base."
                             self.display_message(message.upper())
                             self.lockout = True
-                            self.rotate=0
-                            if self.fuel > 0:
+                            self.sim.rotate=0
+                            if self.sim.fuel > 0:
                                 self.btimer = time.monotonic()
-                                self.display_thrust1.hidden = False
-                                self.display_thrust2.hidden = True
-                                self.display_thrust3.hidden = True
-                                self.thruster = True
+                                self.set_exhaust(EXHAUST_THRUST1)
+                                self.sim.thruster = True
                                 self.landed = False
-                                self.onground = False
+                                self.sim.onground = False
                                 #fruit_jam.audio.play(self.thrust_wave, loop=True)
                                 self.mixer.voice[0].play(self.thrust_wave,loop=True)
                             self.dtime = time.monotonic()
 
                     else:
-                        print("crash landing!")
+                        log.info(log.GAME, "crash landing!")
                         self.game_over = True
+                        self.save_logs()
                         gc.enable()
                         while True:
                             if self.yes():
@@ -2076,30 +1885,22 @@ class Game:
                             return
                 else:
                     fillup = False #fuel refill available now
-                if (self.display_lander.y + LANDER_HEIGHT + 8 < 0) or (
-                    # out bounds in game, assume end of game
-                    self.display_lander.x < 0 - LANDER_WIDTH - 8 or self.display_lander.x > DISPLAY_WIDTH + 8):
+                if self.sim.out_of_bounds():
                     # returned to base, game over
                     self.game_over = True
+                    self.save_logs()
                     self.mixer.voice[0].stop()
                     self.mixer.voice[1].stop()
                     self.mixer.voice[2].stop()
                     reason = "Returned to base."
-                    minecount = 0
-                    minerals = 0
-                    for p in range(len(self.display_terrain)):
-                        for m in self.mines[p]:
-                            if m["type"] == "m":
-                                minecount += 1
-                                if m["count"] == 0:
-                                    minerals += 1
+                    minerals, minecount = self.sim.mine_progress()
                     collected = f"You visited {minerals} out of {minecount} mines."
                     if minecount == minerals:
                         # check time
                         endtime = self.timer
 
                         collected = f" Great job! You visited all {minecount} mines."
-                        print(f"old time:{self.prevtime}, new time:{endtime}")
+                        log.info(log.GAME, f"old time:{self.prevtime}, new time:{endtime}")
                         if self.prevtime == endtime:
                             collected = " You tied your best time!"
                         elif self.prevtime == 0 or self.prevtime > 0 and self.prevtime > endtime:
@@ -2115,9 +1916,10 @@ class Game:
                                     self.times.append({"id": self.id, "time": endtime})
                             else:
                                 self.times.append({"id": self.id, "time": endtime})
-                            with open(timesfile, mode="wb") as fpr:
-                                json.dump(self.times, fpr)
-                                fpr.close()
+                            if self.playback is None: # replayed runs don't count
+                                with open(timesfile, mode="wb") as fpr:
+                                    json.dump(self.times, fpr)
+                                    fpr.close()
                     message = f"{reason}{collected}\nDo you want to repeat the mission?\nY or N"
                     self.display_message(message.upper())
                     gc.enable()
@@ -2142,12 +1944,7 @@ class Game:
                     else:
                         return
 
-                save_time = time.monotonic()
-                if self.switch_page():
-                    #pass
-                    self.dtime = time.monotonic()
-                    self.gtimer += time.monotonic()-save_time # adjust timer for switching page
-                    #print(f"time: {stime}, {time.monotonic() - stime}, {time.monotonic()}")
+                self.switch_page()
 
 def main():
 
@@ -2164,21 +1961,21 @@ def main():
     """Main entry point"""
     print("Moon Miner Game for Fruit Jam...")
     print("By Dan Cogliano - https://DanTheGeek.com")
-    while True:
-        g = Game()
-        # Initialize display
-        if not g.init_display():
-            print("Failed to initialize display")
-            return
-        g.init_soundfx()
-        #fruit_jam.audio.stop()
-
-        tk = g.init_keyboard()
-        tc = g.init_controller()
-        if not tk and not tc:
-            print("This game requries a keyboard or controller")
-            return
+    g = Game()
+    # Initialize display
+    if not g.init_display():
+        print("Failed to initialize display")
+        return
+    g.init_soundfx()
+    #fruit_jam.audio.stop()
+
+    tk = g.init_keyboard()
+    tc = g.init_controller()
+    if not tk and not tc:
+        print("This game requries a keyboard or controller")
+        return
 
+    while True:
         #time.sleep(5)
         g.display.root_group = g.help_group
         print("starting new game")
@@ -2194,11 +1991,14 @@ def main():
             buff = g.get_key()
             #buff = None
             if buff != None:
-                print(buff)
+                log.debug(log.INPUT, buff)
                 if 22 in buff:
                     done = True
 
         g.play_game()
+        # the next game reuses this one's display, assets, mixer and input
+        # devices
+        g.restart()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,141 @@
+"""
+Moon Miner frame timing
+Keeps the last RING_SIZE frames of frame, tick, input poll and collision
+durations in arrays allocated once, plus a histogram per channel over the
+whole mission. Recording a frame is a few small int stores, no prints and
+no allocations, so it does not change the timing it measures. Dump it
+while paused, save it to /saves at the end of a mission.
+"""
+import json
+from array import array
+
+import log
+
+try:
+    from supervisor import ticks_ms
+except ImportError:
+    # desktop
+    import time
+    def ticks_ms():
+        return time.monotonic_ns()//1000000 & TICKS_MASK
+
+TICKS_MASK = (1 << 29) - 1 # supervisor.ticks_ms wraps at 2**29
+framesfile = "/saves/frametimes.json"
+RING_SIZE = 256 # frames of history
+
+# channels
+FRAME = 0 # tick start to tick start
+TICK = 1 # Game.tick
+INPUT = 2 # controller and keyboard polls during the frame
+COLLISION = 3 # lava and ground checks
+CHANNELS = ("frame", "tick", "input", "collision")
+
+# histogram bucket upper bounds in ms, the last bucket is everything above
+BUCKETS = (1, 2, 5, 10, 20, 40, 50, 60, 80, 100, 200, 500)
+
+def elapsed(start):
+    # ms since a ticks_ms() value, wrap safe
+    return (ticks_ms() - start) & TICKS_MASK
+
+class FrameTimes:
+
+    def __init__(self, size=RING_SIZE):
+        self.size = size
+        self.ring = array('H', [0]*(size*len(CHANNELS)))
+        self.hist = array('L', [0]*((len(BUCKETS) + 1)*len(CHANNELS)))
+        self.total = array('L', [0]*len(CHANNELS))
+        self.max = array('H', [0]*len(CHANNELS))
+        self.reset()
+
+    def reset(self):
+        # start of a mission attempt
+        for i in range(len(self.ring)):
+            self.ring[i] = 0
+        for i in range(len(self.hist)):
+            self.hist[i] = 0
+        for c in range(len(CHANNELS)):
+            self.total[c] = 0
+            self.max[c] = 0
+        self.pos = 0 # slot of the frame being timed
+        self.frames = 0 # completed frames
+        self.last_frame = -1 # ticks_ms of the last frame start
+
+    def add(self, channel, ms):
+        # add time to a channel of the current frame, repeated polls add up
+        i = self.pos*len(CHANNELS) + channel
+        self.ring[i] = min(self.ring[i] + ms, 0xFFFF)
+
+    def frame_start(self):
+        # call as a frame starts, times the frame before it
+        now = ticks_ms()
+        if self.last_frame >= 0:
+            self.add(FRAME, (now - self.last_frame) & TICKS_MASK)
+        self.last_frame = now
+        return now
+
+    def frame_end(self):
+        # frame done, count it and move to the next slot
+        base = self.pos*len(CHANNELS)
+        for c in range(len(CHANNELS)):
+            ms = self.ring[base + c]
+            b = 0
+            while b < len(BUCKETS) and ms > BUCKETS[b]:
+                b += 1
+            self.hist[c*(len(BUCKETS) + 1) + b] += 1
+            self.total[c] += ms
+            if ms > self.max[c]:
+                self.max[c] = ms
+        self.frames += 1
+        self.pos = (self.pos + 1) % self.size
+        base = self.pos*len(CHANNELS)
+        for c in range(len(CHANNELS)):
+            self.ring[base + c] = 0
+
+    def skip_frame(self):
+        # the next frame time spans a pause or a message, don't count it
+        self.last_frame = -1
+
+    def recent(self, channel):
+        # ring values of a channel, oldest first
+        count = min(self.frames, self.size)
+        start = (self.pos - count) % self.size
+        return [self.ring[((start + i) % self.size)*len(CHANNELS) + channel] for i in range(count)]
+
+    def percentile(self, channel, p):
+        # upper bucket bound holding the p-th percentile, None above the last
+        target = self.frames*p//100
+        seen = 0
+        for b in range(len(BUCKETS) + 1):
+            seen += self.hist[channel*(len(BUCKETS) + 1) + b]
+            if seen > target:
+                return BUCKETS[b] if b < len(BUCKETS) else None
+        return None
+
+    def summary(self):
+        result = {"frames": self.frames, "buckets_ms": list(BUCKETS)}
+        for c, name in enumerate(CHANNELS):
+            result[name] = {
+                "mean_ms": self.total[c]/self.frames if self.frames else 0,
+                "p50_ms": self.percentile(c, 50),
+                "p99_ms": self.percentile(c, 99),
+                "max_ms": self.max[c],
+                "histogram": list(self.hist[c*(len(BUCKETS) + 1):(c + 1)*(len(BUCKETS) + 1)]),
+                "recent_ms": self.recent(c),
+            }
+        return result
+
+    def dump(self):
+        # print the histograms, for the console while paused
+        print(f"frame times over {self.frames} frames, ms buckets: {BUCKETS} and over")
+        for c, name in enumerate(CHANNELS):
+            mean = self.total[c]/self.frames if self.frames else 0
+            print(f"{name:>9}: mean {mean:.1f} max {self.max[c]} p99 <= {self.percentile(c, 99)}",
+                list(self.hist[c*(len(BUCKETS) + 1):(c + 1)*(len(BUCKETS) + 1)]))
+
+    def save(self, path=framesfile):
+        try:
+            with open(path, mode="w") as fpw:
+                json.dump(self.summary(), fpw)
+        except OSError as e:
+            # read only filesystem, no /saves
+            log.error(log.GAME, f"frame times not saved: {e}")
@@ -0,0 +1,138 @@
+"""
+Moon Miner heads up display
+The panel's changing values live in one Bitmap allocated at start up.
+Glyphs of the panel font are drawn once into a strip, a cell per
+character and ink, and a field blits only the cells whose character
+changed. Numbers are formatted digit by digit into the field, so a panel
+update allocates nothing.
+"""
+import bitmaptools
+import displayio
+from array import array
+
+CHARS = " 0123456789.:/-" # characters a field can show, space first
+
+# character code to its cell in the glyph strip, unknown codes are blank
+GLYPH_CELLS = bytearray(128)
+for i in range(len(CHARS)):
+    GLYPH_CELLS[ord(CHARS[i])] = i
+
+POWERS = (1, 10, 100, 1000, 10000, 100000, 1000000, 10000000, 100000000)
+
+class Hud:
+
+    def __init__(self, font, x, y, width, height, inks):
+        # x, y, width, height: screen area in pixels
+        # inks: field colors, ink 1 is inks[0], 0 is transparent
+        bb = font.get_bounding_box()
+        self.cell_width = bb[0]
+        self.cell_height = bb[1]
+        self.palette = displayio.Palette(len(inks) + 1)
+        self.palette.make_transparent(0)
+        self.colors = array('L', [0]*(len(inks) + 1))
+        self.shown = bytearray([1]*(len(inks) + 1))
+        for i in range(len(inks)):
+            self.palette[i + 1] = inks[i]
+            self.colors[i + 1] = inks[i]
+        self.bitmap = displayio.Bitmap(width, height, len(inks) + 1)
+        self.tilegrid = displayio.TileGrid(self.bitmap, pixel_shader=self.palette, x=x, y=y)
+        self.glyphs = self.glyph_strip(font, bb, len(inks))
+        # fields, the characters shown are kept in text
+        self.field_x = array('h')
+        self.field_y = array('h')
+        self.field_ink = bytearray()
+        self.field_start = array('H')
+        self.field_length = bytearray()
+        self.text = bytearray()
+
+    def glyph_strip(self, font, bb, inks):
+        # CHARS in every ink, one row of cells per ink, drawn from the
+        # font's glyphs on the font's baseline
+        font.load_glyphs(CHARS)
+        strip = displayio.Bitmap(bb[0]*len(CHARS), bb[1]*inks, inks + 1)
+        baseline = bb[1] + bb[3]
+        for c in range(len(CHARS)):
+            glyph = font.get_glyph(ord(CHARS[c]))
+            if glyph is None:
+                continue
+            left = glyph.tile_index*glyph.width
+            for gy in range(glyph.height):
+                y = baseline - glyph.height - glyph.dy + gy
+                for gx in range(glyph.width):
+                    x = glyph.dx + gx
+                    if glyph.bitmap[left + gx, gy] and 0 <= x < bb[0] and 0 <= y < bb[1]:
+                        for ink in range(inks):
+                            strip[c*bb[0] + x, ink*bb[1] + y] = ink + 1
+        return strip
+
+    def field(self, x, y, length, ink=1):
+        # a length character field at x, y in the hud area, returns its index
+        self.field_x.append(x)
+        self.field_y.append(y)
+        self.field_ink.append(ink)
+        self.field_start.append(len(self.text))
+        self.field_length.append(length)
+        self.text.extend(bytes(length)) # nothing drawn yet
+        return len(self.field_x) - 1
+
+    def put(self, field, pos, code):
+        # character code at pos of a field, blitted only if it changed
+        i = self.field_start[field] + pos
+        if self.text[i] == code:
+            return
+        self.text[i] = code
+        cell = GLYPH_CELLS[code] if code < 128 else 0
+        row = self.field_ink[field] - 1
+        bitmaptools.blit(self.bitmap, self.glyphs,
+            self.field_x[field] + pos*self.cell_width, self.field_y[field],
+            x1=cell*self.cell_width, y1=row*self.cell_height,
+            x2=(cell + 1)*self.cell_width, y2=(row + 1)*self.cell_height)
+
+    def set_text(self, field, text):
+        # a string, cut or padded with spaces to the field length
+        for pos in range(self.field_length[field]):
+            self.put(field, pos, ord(text[pos]) if pos < len(text) else 32)
+
+    def set_number(self, field, value, decimals=1, signed=False):
+        # abs(value) zero padded to the field length with decimals places,
+        # like f"{abs(value):0{length}.{decimals}f}", all 9s if too big.
+        # signed: like f"{value:0{length}.{decimals}f}", a negative value
+        # gives its first cell to the "-"
+        length = self.field_length[field]
+        start = 0
+        if signed and value < 0:
+            self.put(field, 0, 45) # "-"
+            start = 1
+        digits = length - start - 1 - decimals if decimals else length - start
+        n = min(int(abs(value)*POWERS[decimals] + .5), POWERS[digits + decimals] - 1)
+        for pos in range(length - 1, start - 1, -1):
+            if decimals and pos == length - 1 - decimals:
+                self.put(field, pos, 46) # "."
+            else:
+                self.put(field, pos, 48 + n%10)
+                n //= 10
+
+    def set_clock(self, field, seconds):
+        # seconds as mm:ss in a 5 character field, 99:59 at most
+        minutes = min(seconds//60, 99)
+        seconds = seconds%60 if minutes < 99 else min(seconds - 99*60, 59)
+        self.put(field, 0, 48 + minutes//10)
+        self.put(field, 1, 48 + minutes%10)
+        self.put(field, 2, 58) # ":"
+        self.put(field, 3, 48 + seconds//10)
+        self.put(field, 4, 48 + seconds%10)
+
+    def set_ink(self, ink, color):
+        # recolor every field drawn in an ink
+        if self.colors[ink] != color:
+            self.colors[ink] = color
+            self.palette[ink] = color
+
+    def show_ink(self, ink, shown):
+        # show or hide every field drawn in an ink
+        if self.shown[ink] != shown:
+            self.shown[ink] = shown
+            if shown:
+                self.palette.make_opaque(ink)
+            else:
+                self.palette.make_transparent(ink)
@@ -0,0 +1,109 @@
+"""
+Moon Miner debug logging
+Messages go to a channel, each channel has its own level. In the frame
+loop, test the level before building the message, so a disabled line
+costs one bytearray lookup and no formatting or serial output:
+
+    if log.level[log.INPUT] >= log.DEBUG:
+        log.write(log.INPUT, f"buff: {buff}")
+
+Outside the frame loop log.info(log.GAME, ...) and friends test the
+level themselves.
+"""
+
+# levels
+OFF = 0
+ERROR = 1
+WARN = 2
+INFO = 3
+DEBUG = 4
+
+# channels
+GAME = 0 # mission flow, landings and crashes
+INPUT = 1 # controller and keyboard reports
+DISPLAY = 2 # pages, messages and asset loading
+CHANNEL_NAMES = ("game:", "input:", "display:")
+
+# current level per channel, change at run time with set_level()
+level = bytearray((INFO, WARN, INFO))
+
+def set_level(channel, new_level):
+    level[channel] = new_level
+
+def write(channel, *args):
+    # unconditional, callers test the level
+    print(CHANNEL_NAMES[channel], *args)
+
+def error(channel, *args):
+    if level[channel] >= ERROR:
+        print(CHANNEL_NAMES[channel], *args)
+
+def warn(channel, *args):
+    if level[channel] >= WARN:
+        print(CHANNEL_NAMES[channel], *args)
+
+def info(channel, *args):
+    if level[channel] >= INFO:
+        print(CHANNEL_NAMES[channel], *args)
+
+def debug(channel, *args):
+    if level[channel] >= DEBUG:
+        print(CHANNEL_NAMES[channel], *args)
+
+# boot keyboard report names, built once
+
+MODIFIER_NAMES = (
+    (0x01, "LEFT_CTRL"),
+    (0x02, "LEFT_SHIFT"),
+    (0x04, "LEFT_ALT"),
+    (0x08, "LEFT_GUI"),
+    (0x10, "RIGHT_CTRL"),
+    (0x20, "RIGHT_SHIFT"),
+    (0x40, "RIGHT_ALT"),
+    (0x80, "RIGHT_GUI"),
+)
+
+KEY_NAMES = {
+    0x28: "ENTER",
+    0x29: "ESC",
+    0x2A: "BACKSPACE",
+    0x2B: "TAB",
+    0x2C: "SPACE",
+    0x2D: "MINUS",
+    0x2E: "EQUAL",
+    0x2F: "LBRACKET",
+    0x30: "RBRACKET",
+    0x31: "BACKSLASH",
+    0x33: "SEMICOLON",
+    0x34: "QUOTE",
+    0x35: "GRAVE",
+    0x36: "COMMA",
+    0x37: "PERIOD",
+    0x38: "SLASH",
+    0x39: "CAPS_LOCK",
+    0x4F: "RIGHT_ARROW",
+    0x50: "LEFT_ARROW",
+    0x51: "DOWN_ARROW",
+    0x52: "UP_ARROW",
+}
+for i in range(26): # A-Z
+    KEY_NAMES[0x04 + i] = chr(ord("A") + i)
+for i in range(9): # 1-9, then 0
+    KEY_NAMES[0x1E + i] = str(i + 1)
+KEY_NAMES[0x27] = "0"
+for i in range(12):
+    KEY_NAMES[0x3A + i] = f"F{i + 1}"
+
+def keyboard_report(report):
+    # modifier and key names of a boot keyboard report, as one string
+    names = []
+    modifiers = report[0]
+    for bit, name in MODIFIER_NAMES:
+        if modifiers & bit:
+            names.append(name)
+    # bytes 2-7 hold up to 6 key codes, 0 and 1 are no key and rollover
+    for i in range(2, 8):
+        key = report[i] & 0xFF
+        if key > 1:
+            names.append(KEY_NAMES.get(key) or f"0x{key:02X}")
+    return " ".join(names) if names else "No keys pressed"
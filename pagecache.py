@@ -0,0 +1,227 @@
+"""
+Moon Miner page cache
+Terrain pages are loaded when they scroll into view, into slots holding a
+Bitmap, its Palette and the TileGrid showing them. Slots are allocated up
+to a byte budget when a mission loads. After that a page that is not
+cached is read over the least recently used page's slot, so the buffers
+are reused and never reallocated. The mission's page count is not limited
+by memory, and its start does not wait for every page to load. Pages are
+BMPs, compressed .mmp pages or tiled .mmt pages, see pagecodec.py. A
+tiled page's slot holds its tile strip, so many more of them fit.
+"""
+import struct
+
+import bitmaptools
+import displayio
+
+import log
+import pagecodec
+
+PAGE_BUDGET = 3*640*480//2 # bytes, three 4 bit 640x480 pages
+MIN_SLOTS = 2 # the camera shows up to two pages at once
+TRANSPARENT_PIXEL = 5 # the color of this pixel is see-through
+
+def bitmap_bytes(width, height, bpp):
+    # RAM of a displayio.Bitmap, rows are packed into 32 bit words
+    return (width*bpp + 31)//32*4*height
+
+def slot_bytes(shape):
+    # RAM of a slot's bitmap and tile map
+    width, height, bpp, tile_width, tile_height, tiles = shape
+    if tiles:
+        return bitmap_bytes(tile_width, tile_height*tiles, bpp) + 2*(width//tile_width)*(height//tile_height)
+    return bitmap_bytes(width, height, bpp)
+
+def read_header(fpr, path):
+    # width, height, bits per pixel, palette offset, colors and pixel
+    # offset of an uncompressed BMP whose rows need no padding, which
+    # bitmaptools.readinto can read straight into a bitmap
+    header = fpr.read(54)
+    if header[0:2] != b"BM":
+        raise ValueError(f"{path}: not a BMP")
+    offset = struct.unpack_from("<I", header, 10)[0]
+    size, width, height, planes, bpp, compression = struct.unpack_from("<IiiHHI", header, 14)
+    colors = struct.unpack_from("<I", header, 46)[0] or 1 << bpp
+    if bpp not in (1, 2, 4, 8) or compression != 0 or width*bpp % 32:
+        raise ValueError(f"{path}: {bpp} bit, compressed or padded BMP")
+    return width, height, bpp, 14 + size, colors, offset
+
+def read_shape(fpr, path):
+    # the slot shape of a page: width, height, bits per pixel, then tile
+    # width, tile height and tile capacity, all 0 unless it is tiled
+    if path.endswith(pagecodec.TILE_EXTENSION):
+        return pagecodec.read_tile_header(fpr, path)[0:6]
+    if path.endswith(pagecodec.EXTENSION):
+        return pagecodec.read_header(fpr, path)[0:3] + (0, 0, 0)
+    width, height, bpp = read_header(fpr, path)[0:3]
+    return width, abs(height), bpp, 0, 0, 0
+
+class Slot:
+    # the buffers of one cached page, a whole page Bitmap or a tile strip
+
+    def __init__(self, width, height, bpp, tile_width, tile_height, tiles):
+        self.shape = (width, height, bpp, tile_width, tile_height, tiles)
+        self.palette = displayio.Palette(1 << bpp)
+        if tiles:
+            self.bitmap = displayio.Bitmap(tile_width, tile_height*tiles, 1 << bpp)
+            self.tilegrid = displayio.TileGrid(self.bitmap, pixel_shader=self.palette,
+                width=width//tile_width, height=height//tile_height,
+                tile_width=tile_width, tile_height=tile_height)
+        else:
+            self.bitmap = displayio.Bitmap(width, height, 1 << bpp)
+            self.tilegrid = displayio.TileGrid(self.bitmap, pixel_shader=self.palette)
+        self.size = slot_bytes(self.shape)
+        self.key = None # page held, None when free
+        self.used = 0 # cache clock of the last get, 0 when free
+        self.group = None # group showing the tilegrid
+        self.transparent = -1 # palette index made transparent
+
+class PageCache:
+
+    def __init__(self, budget=PAGE_BUDGET):
+        self.budget = budget
+        self.slots = []
+        self.size = 0 # bytes allocated in slots
+        self.clock = 0
+        self.table = bytearray(4*256) # BMP palette, read without allocating
+        self.decoder = pagecodec.Decoder()
+        self.hits = 0
+        self.misses = 0
+
+    def reserve(self, path, pages):
+        # allocate slots for pages shaped like the page at path, as many as
+        # the budget holds up to the mission's page count, while loading
+        # the mission rather than in flight
+        with open(path, "rb") as fpr:
+            shape = read_shape(fpr, path)
+        for slot in self.slots[:]:
+            # slots kept from a mission with pages of another shape
+            if slot.shape != shape:
+                self.release(slot)
+                self.slots.remove(slot)
+                self.size -= slot.size
+        while len(self.slots) < MIN_SLOTS or (len(self.slots) < pages
+                and self.size + slot_bytes(shape) <= self.budget):
+            self.add_slot(shape)
+        log.info(log.DISPLAY, f"page cache: {len(self.slots)} slots, {self.size} bytes")
+
+    def add_slot(self, shape):
+        slot = Slot(*shape)
+        self.slots.append(slot)
+        self.size += slot.size
+        return slot
+
+    def get(self, key, path, group):
+        # show page key in group, read from the BMP at path unless cached.
+        # Returns the page's slot.
+        slot = self.load(key, path)
+        self.attach(slot, group)
+        return slot
+
+    def prefetch(self, key, path):
+        # read page key ahead of need, so showing it is only a group append
+        if self.cached(key) is None:
+            self.load(key, path)
+
+    def cached(self, key):
+        # the slot holding page key, None if not cached
+        for slot in self.slots:
+            if slot.key == key:
+                return slot
+        return None
+
+    def load(self, key, path):
+        # the slot holding page key, most recently used now
+        self.clock += 1
+        slot = self.cached(key)
+        if slot is not None:
+            self.hits += 1
+            slot.used = self.clock
+            return slot
+        self.misses += 1
+        with open(path, "rb") as fpr:
+            if path.endswith(pagecodec.TILE_EXTENSION):
+                width, height, bpp, tile_width, tile_height, tiles, count, colors = pagecodec.read_tile_header(fpr, path)
+                slot = self.free_slot((width, height, bpp, tile_width, tile_height, tiles))
+                self.decoder.read_palette(fpr, slot.palette, colors)
+                self.decoder.read_map(fpr, slot.tilegrid)
+                self.decoder.decode(fpr, slot.bitmap, tile_width*tile_height*count)
+                # the pixel's tile in the strip
+                transparent = slot.bitmap[TRANSPARENT_PIXEL, slot.tilegrid[0]*tile_height]
+            elif path.endswith(pagecodec.EXTENSION):
+                width, height, bpp, colors = pagecodec.read_header(fpr, path)
+                slot = self.free_slot((width, height, bpp, 0, 0, 0))
+                self.decoder.read_palette(fpr, slot.palette, colors)
+                self.decoder.decode(fpr, slot.bitmap)
+                transparent = slot.bitmap[TRANSPARENT_PIXEL]
+            else:
+                slot = self.read_bmp(fpr, path)
+                transparent = slot.bitmap[TRANSPARENT_PIXEL]
+        if slot.transparent >= 0:
+            slot.palette.make_opaque(slot.transparent)
+        slot.transparent = transparent
+        slot.palette.make_transparent(slot.transparent)
+        slot.key = key
+        slot.used = self.clock
+        if log.level[log.DISPLAY] >= log.DEBUG:
+            log.write(log.DISPLAY, f"page cache: loaded {path}, {self.hits} hits {self.misses} misses")
+        return slot
+
+    def read_bmp(self, fpr, path):
+        # a BMP page into a free slot, returns the slot
+        width, height, bpp, table, colors, offset = read_header(fpr, path)
+        slot = self.free_slot((width, abs(height), bpp, 0, 0, 0))
+        fpr.seek(table)
+        fpr.readinto(memoryview(self.table)[0:4*min(colors, len(slot.palette))])
+        t = self.table
+        for i in range(len(slot.palette)):
+            # BMP palette entries are blue, green, red, unused
+            if i < colors:
+                slot.palette[i] = t[4*i + 2] << 16 | t[4*i + 1] << 8 | t[4*i]
+            else:
+                slot.palette[i] = 0
+        fpr.seek(offset)
+        # BMP rows hold the first pixel of a byte in its high bits
+        bitmaptools.readinto(slot.bitmap, fpr, bpp, reverse_pixels_in_element=bpp < 8,
+            reverse_rows=height > 0)
+        return slot
+
+    def free_slot(self, shape):
+        # a slot for a page of this shape: a free one, a new one within the
+        # budget or the least recently used one. A least recently used slot
+        # of another shape is freed to make room.
+        while True:
+            for slot in self.slots:
+                if slot.key is None and slot.shape == shape:
+                    return slot
+            if len(self.slots) < MIN_SLOTS or self.size + slot_bytes(shape) <= self.budget:
+                return self.add_slot(shape)
+            lru = self.slots[0]
+            for slot in self.slots:
+                if slot.used < lru.used:
+                    lru = slot
+            self.release(lru)
+            if lru.shape != shape:
+                self.slots.remove(lru)
+                self.size -= lru.size
+
+    def attach(self, slot, group):
+        # move the slot's tilegrid into group
+        if slot.group is not group:
+            if slot.group is not None:
+                slot.group.remove(slot.tilegrid)
+            group.append(slot.tilegrid)
+            slot.group = group
+
+    def release(self, slot):
+        # forget a slot's page, its buffers stay allocated
+        if slot.group is not None:
+            slot.group.remove(slot.tilegrid)
+            slot.group = None
+        slot.key = None
+        slot.used = 0
+
+    def clear(self):
+        # a new mission, every page is stale
+        for slot in self.slots:
+            self.release(slot)
@@ -0,0 +1,155 @@
+"""
+Moon Miner page codec
+Terrain and background pages are mostly long runs of one color. A .mmp
+page stores them as runs and short literal strips of palette indexes,
+and the decoder streams it from flash through one small chunk buffer
+straight into a preallocated displayio.Bitmap: a run is a fill_region
+per rectangle it covers, a literal strip one arrayblit. Convert mission
+BMPs with tools/convert_pages.py.
+
+After the header and the palette, three bytes of red, green and blue per
+color, pixels follow in packets, left to right and top to bottom. A
+packet starts with a varint, 7 bits a byte, low bits first, of count
+shifted left one with the low bit set for a run:
+
+    run:     count*2 + 1, index         count pixels of one index
+    literal: count*2, index, index, ... count pixels, one byte each,
+                                        never past the end of a row
+
+A .mmt page is a terrain page cut into tiles, each distinct tile stored
+once. After the header and the palette come the tile index of every tile
+of the page, a byte each, left to right and top to bottom, then the
+tiles as packets of a tile wide strip, tile 0 on top. The page shows as
+a TileGrid of the strip, a fraction of a whole page Bitmap's RAM. Every
+page of a mission is written with the same tile capacity, so they fit
+the same buffers.
+"""
+import struct
+
+import bitmaptools
+import displayio
+
+EXTENSION = ".mmp"
+MMP_MAGIC = b"MMPG"
+MMP_VERSION = 1
+# magic, version, bits per pixel, width, height, palette colors
+MMP_HEADER = "<4sBBHHH"
+CHUNK_SIZE = 1024 # bytes read from flash at a time
+PACKET_MAX = 6 # varint of a run and its index
+
+TILE_EXTENSION = ".mmt"
+MMT_MAGIC = b"MMTL"
+MMT_VERSION = 1
+# magic, version, bits per pixel, width, height, tile width, tile height,
+# tile capacity, tiles used, palette colors
+MMT_HEADER = "<4sBBHHBBHHH"
+
+def read_header(fpr, path):
+    # width, height, bits per pixel and palette colors of a page
+    magic, version, bpp, width, height, colors = struct.unpack(MMP_HEADER,
+        fpr.read(struct.calcsize(MMP_HEADER)))
+    if magic != MMP_MAGIC or version > MMP_VERSION:
+        raise ValueError(f"{path} is not a supported page")
+    return width, height, bpp, colors
+
+def read_tile_header(fpr, path):
+    # width, height, bits per pixel, tile width, tile height, tile capacity,
+    # tiles used and palette colors of a tiled page
+    magic, version, bpp, width, height, tile_width, tile_height, capacity, count, colors = struct.unpack(
+        MMT_HEADER, fpr.read(struct.calcsize(MMT_HEADER)))
+    if magic != MMT_MAGIC or version > MMT_VERSION:
+        raise ValueError(f"{path} is not a supported tiled page")
+    return width, height, bpp, tile_width, tile_height, capacity, count, colors
+
+def fill_run(bitmap, x, y, count, value):
+    # count pixels of value from x, y on, as at most three rectangles
+    width = bitmap.width
+    if x:
+        n = min(count, width - x)
+        bitmaptools.fill_region(bitmap, x, y, x + n, y + 1, value)
+        count -= n
+        y += 1
+    if count >= width:
+        rows = count//width
+        bitmaptools.fill_region(bitmap, 0, y, width, y + rows, value)
+        count -= rows*width
+        y += rows
+    if count:
+        bitmaptools.fill_region(bitmap, 0, y, count, y + 1, value)
+
+class Decoder:
+    # the chunk buffer is allocated once and reused for every page
+
+    def __init__(self, size=CHUNK_SIZE):
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+
+    def read_palette(self, fpr, palette, colors):
+        # the page's colors into palette, entries past them black
+        fpr.readinto(self.view[0:3*colors])
+        b = self.buffer
+        for i in range(len(palette)):
+            palette[i] = b[3*i] << 16 | b[3*i + 1] << 8 | b[3*i + 2] if i < colors else 0
+
+    def read_map(self, fpr, tilegrid):
+        # a tiled page's tile indexes into tilegrid, a buffer full at a time
+        total = tilegrid.width*tilegrid.height
+        i = 0
+        while i < total:
+            n = fpr.readinto(self.view[0:min(total - i, len(self.buffer))])
+            if not n:
+                raise ValueError("page data ends early")
+            for k in range(n):
+                tilegrid[i + k] = self.buffer[k]
+            i += n
+
+    def decode(self, fpr, bitmap, total=None):
+        # the pixel packets after the palette or tile map into bitmap, the
+        # first total pixels of it, all of them by default
+        width = bitmap.width
+        if total is None:
+            total = width*bitmap.height
+        if len(self.buffer) < width + PACKET_MAX:
+            raise ValueError(f"{width} pixel rows need a bigger chunk buffer")
+        b = self.buffer
+        view = self.view
+        pos = end = 0
+        i = 0
+        while i < total:
+            if end - pos < width + PACKET_MAX:
+                # keep the unread bytes, top up the buffer
+                view[0:end - pos] = view[pos:end]
+                end -= pos
+                pos = 0
+                end += fpr.readinto(view[end:]) or 0
+                if end == 0:
+                    raise ValueError("page data ends early")
+            v = 0
+            shift = 0
+            while True:
+                c = b[pos]
+                pos += 1
+                v |= (c & 0x7F) << shift
+                shift += 7
+                if c < 0x80:
+                    break
+            count = v >> 1
+            if v & 1:
+                fill_run(bitmap, i%width, i//width, count, b[pos])
+                pos += 1
+            else:
+                x = i%width
+                bitmaptools.arrayblit(bitmap, view[pos:pos + count], x, i//width, x + count, i//width + 1)
+                pos += count
+            i += count
+
+def load(path, decoder=None):
+    # a page as a new Bitmap and Palette, like adafruit_imageload.load
+    decoder = decoder or Decoder()
+    with open(path, "rb") as fpr:
+        width, height, bpp, colors = read_header(fpr, path)
+        bitmap = displayio.Bitmap(width, height, 1 << bpp)
+        palette = displayio.Palette(1 << bpp)
+        decoder.read_palette(fpr, palette, colors)
+        decoder.decode(fpr, bitmap)
+    return bitmap, palette
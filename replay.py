@@ -0,0 +1,278 @@
+"""
+Moon Miner input replay
+Records the inputs of a mission attempt, one 16 bit word per frame, into
+a buffer allocated once, and writes it to /saves only at pause or at the
+end of the mission. A recording plays back in the game, or headless on
+desktop against the simulation:
+
+    python replay.py moonminer.rpl
+"""
+import struct
+from array import array
+
+import log
+import simulation
+from simulation import TREZ, PHYSICS_STEP
+
+replayfile = "/saves/moonminer.rpl"
+
+REPLAY_MAGIC = b"MMRP"
+# version 2: the lava of pages beside the lander's page runs too, so
+# version 1 recordings no longer play back the same
+# version 3: FLAG_FIXED_STEP
+REPLAY_VERSION = 3
+# magic, version, flags, seed, frame count, mission name length
+REPLAY_HEADER = "<4sBBIIB"
+MAX_FRAMES = 36000 # 30 minutes at 20 frames per second
+
+# header flags
+FLAG_FIXED_POINT = 0x01
+FLAG_SPRITE_MASKS = 0x02 # collisions used the rocket sheet, not the box
+FLAG_FIXED_STEP = 0x04 # physics ran PHYSICS_STEP steps, the only kind run_frame replays
+SIM_FLAGS = FLAG_FIXED_POINT | FLAG_SPRITE_MASKS | FLAG_FIXED_STEP
+
+# frame word, input state as the frame's physics steps saw it
+THRUST = 0x01
+ROTATE_LEFT = 0x02
+ROTATE_RIGHT = 0x04
+ROTATING_NOW = 0x08
+PAUSED = 0x10 # game was paused before this frame
+STEPS_SHIFT = 5 # physics steps run in this frame, 0 to MAX_SUBSTEPS, at most 7
+STEPS_MASK = 0x07
+KICKS_SHIFT = 8 # keyboard thrust kicks since the last frame, up to 255
+KICK = .5 # m/s, upward nudge of a keyboard thrust press
+
+def input_bits(sim):
+    # frame word input bits for the simulation's current input state
+    bits = 0
+    if sim.thruster:
+        bits |= THRUST
+    if sim.rotating < 0:
+        bits |= ROTATE_LEFT
+    elif sim.rotating > 0:
+        bits |= ROTATE_RIGHT
+    if sim.rotatingnow:
+        bits |= ROTATING_NOW
+    return bits
+
+def sim_flags(sim):
+    # header flags of the physics and collisions sim runs
+    flags = FLAG_FIXED_POINT if isinstance(sim, simulation.FixedPointSimulation) else 0
+    if sim.masks.path is not None:
+        flags |= FLAG_SPRITE_MASKS
+    if sim.fixed_step:
+        flags |= FLAG_FIXED_STEP
+    return flags
+
+def run_frame(sim, frame):
+    # apply a recorded frame to the simulation, returns its step count
+    kicks = frame >> KICKS_SHIFT
+    if kicks:
+        sim.onground = False
+        sim.yvelocity -= KICK*kicks
+    sim.thruster = frame & THRUST != 0
+    if frame & ROTATE_LEFT:
+        sim.rotating = -1
+    elif frame & ROTATE_RIGHT:
+        sim.rotating = 1
+    else:
+        sim.rotating = 0
+    sim.rotatingnow = frame & ROTATING_NOW != 0
+    steps = (frame >> STEPS_SHIFT) & STEPS_MASK
+    for i in range(steps):
+        sim.step(PHYSICS_STEP)
+    return steps
+
+class Recorder:
+    # Frame words go into an array allocated up front, so recording
+    # allocates nothing while gc is disabled. Frames past MAX_FRAMES are
+    # dropped.
+
+    def __init__(self, size=MAX_FRAMES):
+        self.frames = array('H', [0]*size)
+        self.count = 0
+        self.active = False
+        self.mission = ""
+        self.seed = 0
+        self.flags = 0
+        self.kicks = 0
+        self.paused = False
+
+    def start(self, mission, seed, flags=0):
+        # begin a new recording, the previous one is discarded
+        self.count = 0
+        self.kicks = 0
+        self.paused = False
+        self.mission = mission
+        self.seed = seed
+        self.flags = flags
+        self.active = True
+
+    def kick(self):
+        # keyboard thrust press, applied to the simulation between frames
+        if self.kicks < 255:
+            self.kicks += 1
+
+    def pause(self):
+        # game paused, mark the next frame and save what we have
+        self.paused = True
+        self.save()
+
+    def frame(self, bits, steps):
+        # record a frame, bits from input_bits() taken before the steps ran
+        if not self.active or self.count >= len(self.frames):
+            return
+        # variable steps can run more than the field holds, those
+        # recordings are refused at load anyway
+        bits |= min(steps, STEPS_MASK) << STEPS_SHIFT | self.kicks << KICKS_SHIFT
+        if self.paused:
+            bits |= PAUSED
+        self.frames[self.count] = bits
+        self.count += 1
+        self.kicks = 0
+        self.paused = False
+
+    def save(self, path=replayfile):
+        if not self.active:
+            return
+        name = self.mission.encode()
+        try:
+            with open(path, mode="wb") as fpw:
+                fpw.write(struct.pack(REPLAY_HEADER, REPLAY_MAGIC, REPLAY_VERSION,
+                    self.flags, self.seed, self.count, len(name)))
+                fpw.write(name)
+                fpw.write(memoryview(self.frames)[0:self.count])
+        except OSError as e:
+            # read only filesystem, no /saves
+            log.error(log.GAME, f"replay not saved: {e}")
+
+class Replay:
+    # a recording read back from a file, frames are taken in order
+
+    def __init__(self, mission, seed, flags, frames):
+        self.mission = mission
+        self.seed = seed
+        self.flags = flags
+        self.frames = frames
+        self.pos = 0
+
+    def more(self):
+        return self.pos < len(self.frames)
+
+    def next(self):
+        frame = self.frames[self.pos]
+        self.pos += 1
+        return frame
+
+    def matches(self, sim):
+        # True if sim runs the physics and collisions of the recording, so
+        # it plays back as recorded instead of drifting
+        return sim_flags(sim) == self.flags & SIM_FLAGS
+
+    def new_simulation(self, masks=None):
+        # simulation matching the recording, mission still to be loaded.
+        # masks: the sprite masks when the caller has them, say read from
+        # the asset pack, otherwise they are read from the rocket sheet
+        if self.flags & FLAG_FIXED_POINT:
+            sim = simulation.FixedPointSimulation()
+        else:
+            sim = simulation.Simulation()
+        if self.flags & FLAG_SPRITE_MASKS:
+            sim.masks = masks or simulation.sheet_masks(simulation.rocketsheet)
+        sim.fixed_step = True
+        sim.seed = self.seed
+        return sim
+
+def load(path=replayfile):
+    # read a recording, None if there is none or it is not a replay file
+    try:
+        with open(path, mode="rb") as fpr:
+            header = fpr.read(struct.calcsize(REPLAY_HEADER))
+            magic, version, flags, seed, count, namelen = struct.unpack(REPLAY_HEADER, header)
+            if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+                log.error(log.GAME, f"{path} is not a supported replay")
+                return None
+            if not flags & FLAG_FIXED_STEP:
+                log.error(log.GAME, f"{path} was recorded with variable steps, it cannot be played back")
+                return None
+            mission = fpr.read(namelen).decode()
+            frames = array('H', [0]*count)
+            fpr.readinto(frames)
+    except (OSError, ValueError) as e:
+        log.error(log.GAME, f"replay not loaded: {e}")
+        return None
+    return Replay(mission, seed, flags, frames)
+
+def visit_pad(sim, fillup):
+    # what the game does while landed safely: collect a mine or refuel,
+    # then head home once every mine is done. Returns fillup.
+    m = sim.landing_pad(fillup)
+    if m is not None:
+        if m["type"] == "m" and m["count"] > 0:
+            sim.collect_mine(m)
+        elif not fillup and m["type"] == "f" and m["count"] > 0:
+            m["count"] -= 1
+            sim.fuel = min(sim.fuel + m["amount"], sim.startfuel)
+            fillup = True
+    minerals, minecount = sim.mine_progress()
+    if minerals == minecount:
+        sim.rotate = 0
+        if sim.fuel > 0:
+            sim.thruster = True
+            sim.onground = False
+    return fillup
+
+def play(replay, data, verbose=False, masks=None):
+    # run a recording headless, frame by frame as Game.play_game does,
+    # until the mission ends or the frames run out. Returns a summary.
+    sim = replay.new_simulation(masks)
+    sim.load(data)
+    fillup = False
+    frames = 0
+    pauses = 0
+    ending = "frames ran out"
+    while replay.more():
+        frame = replay.next()
+        frames += 1
+        if frame & PAUSED:
+            pauses += 1
+        run_frame(sim, frame)
+        if sim.lava_hit():
+            ending = "hit by lava"
+            break
+        result = sim.ground_check()
+        if result == simulation.NO_CONTACT:
+            fillup = False
+        elif sim.crashed:
+            ending = f"crashed, result {result}"
+            break
+        else:
+            if sim.touchdown and verbose:
+                print(f"frame {frames}: landed on page {sim.tpage} at {(sim.lander_x() + 4)//TREZ}")
+            fillup = visit_pad(sim, fillup)
+        if sim.out_of_bounds():
+            ending = "returned to base"
+            break
+        sim.tpage = sim.page_switch()
+    minerals, minecount = sim.mine_progress()
+    return {
+        "mission": replay.mission,
+        "frames": frames,
+        "recorded": len(replay.frames),
+        "steps": sim.scount,
+        "pauses": pauses,
+        "ending": ending,
+        "mines": f"{minerals}/{minecount}",
+        "fuel": sim.fuel,
+        "position": (sim.tpage, sim.lander_x(), sim.lander_y()),
+    }
+
+if __name__ == "__main__":
+    # replay a recording copied off the device, from the repo directory
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else "moonminer.rpl"
+    replay = load(path)
+    if replay is not None:
+        summary = play(replay, simulation.load_data(replay.mission), verbose=True)
+        for key, value in summary.items():
+            print(f"{key}: {value}")
@@ -0,0 +1,879 @@
+"""
+Moon Miner simulation core
+Lander, lava and mine state kept in plain numbers, no display needed.
+Game projects this state onto its sprites, and the same code runs
+headless on desktop CPython for profiling and batch testing.
+"""
+import math
+import struct
+import sys
+from array import array
+
+DISPLAY_WIDTH = 640
+DISPLAY_HEIGHT = 480
+LANDER_WIDTH = 32
+LANDER_HEIGHT = 32
+TREZ = 10 # terrain resolution in pixels
+LAVA_COUNT = 16 # should be divisible into 480
+LAVA_SIZE = 20 # lava sprite tile size in pixels
+LAVA_SPACING = DISPLAY_HEIGHT//LAVA_COUNT # pixels between particles of a volcano
+FRAME_RATE = .05
+FIXED_STEP = True # fixed timestep physics, independent of frame rate
+PHYSICS_STEP = FRAME_RATE # seconds per physics step
+MAX_SUBSTEPS = 4 # most physics steps run in one frame, extra time is dropped
+STEPS_PER_SECOND = 20 # 1/PHYSICS_STEP
+
+# fixed point physics, see FixedPointSimulation
+FP_SHIFT = 10 # velocity and fuel are scaled by 1024
+FP_ONE = 1 << FP_SHIFT
+PX_SHIFT = 16 # extra precision for the velocity to pixel factor
+STEP_MS = 1000 // STEPS_PER_SECOND
+FIXED_POINT = False # use FixedPointSimulation for the game
+# typecode of float tables: CircuitPython floats are single precision
+# anyway, desktop keeps doubles so its runs match plain float math
+FLOAT_CODE = 'f' if sys.implementation.name == "circuitpython" else 'd'
+
+# ground_check() results
+NO_CONTACT = 0
+LANDED = 1
+CRASH_NOT_LEVEL = 2
+CRASH_TOO_FAST = 3
+CRASH_HARD_LANDING = 4
+CRASH_NOT_VERTICAL = 5
+CRASH_SLIDING = 6
+STRANDED = 7
+
+rocketsheet = "assets/rocketsheet.bmp"
+
+def terrain_map(terrain):
+    # Per pixel columns of a page's terrain, built once at load so ground
+    # and altitude checks are single lookups. Nodes are TREZ pixels apart.
+    #   heights: surface height scaled by TREZ, interpolated between nodes
+    #   steps: height of the node at or left of the column, the level
+    #          ground test compares these like the node heights
+    # There is one extra column at the end for the last node.
+    width = (len(terrain) - 1)*TREZ
+    heights = array('h', [0]*(width + 1))
+    steps = array('h', [0]*(width + 1))
+    for x in range(width):
+        p = x//TREZ
+        heights[x] = (terrain[p+1] - terrain[p])*(x%TREZ) + terrain[p]*TREZ
+        steps[x] = terrain[p]
+    heights[width] = terrain[-1]*TREZ
+    steps[width] = terrain[-1]
+    return heights, steps
+
+def pad_map(mines, nodes):
+    # Per terrain node, a tuple of the indexes of the mines whose landing
+    # pads cover it, in list order. A pad covers nodes pos to pos + len.
+    pads = [()]*nodes
+    for i in range(len(mines)):
+        m = mines[i]
+        for pos in range(max(0, m["pos"]), min(nodes, m["pos"] + m["len"] + 1)):
+            pads[pos] += (i,)
+    return pads
+
+def volcano_map(volcanos, nodes):
+    # Per terrain node, a tuple of the indexes of the volcanos at that
+    # node, so lava checks only look at volcanos under the lander.
+    columns = [()]*nodes
+    for v in range(len(volcanos)):
+        pos = volcanos[v]["pos"]
+        if 0 <= pos < nodes:
+            columns[pos] += (v,)
+    return columns
+
+class LanderMasks:
+    # Occupied pixels of each lander sprite tile, one per rotation step.
+    #   rows: per tile row, two 16 bit words for the left and right half,
+    #         bit 0 the leftmost column, so tests stay in small ints
+    #   bottom: per tile column, the lowest occupied row, -1 for none
+    #   left, right: first and last occupied column of a tile
+
+    def __init__(self, tiles, path=None):
+        self.tiles = tiles
+        self.path = path # sprite sheet, None for the plain box
+        self.rows = array('H', [0]*(tiles*LANDER_HEIGHT*2))
+        self.bottom = array('b', [-1]*(tiles*LANDER_WIDTH))
+        self.left = bytearray(tiles)
+        self.right = bytearray(tiles)
+
+    def set(self, tile, x, y):
+        # mark pixel x, y of a tile occupied
+        self.rows[(tile*LANDER_HEIGHT + y)*2 + x//16] |= 1 << x%16
+        i = tile*LANDER_WIDTH + x
+        if y > self.bottom[i]:
+            self.bottom[i] = y
+
+    def finish(self):
+        # occupied column range of each tile, after the last set()
+        for tile in range(self.tiles):
+            columns = [x for x in range(LANDER_WIDTH) if self.bottom[tile*LANDER_WIDTH + x] >= 0]
+            if columns:
+                self.left[tile] = columns[0]
+                self.right[tile] = columns[-1]
+
+    def overlap(self, tile, x, y, size):
+        # True if a size pixel square at x, y in tile coordinates covers
+        # an occupied pixel of the tile
+        x1 = max(0, x)
+        x2 = min(LANDER_WIDTH, x + size)
+        if x1 >= x2:
+            return False
+        left = 0
+        right = 0
+        if x1 < 16:
+            left = ((1 << (min(16, x2) - x1)) - 1) << x1
+        if x2 > 16:
+            right = ((1 << (x2 - max(16, x1))) - 1) << (max(16, x1) - 16)
+        rows = self.rows
+        base = tile*LANDER_HEIGHT
+        for r in range(max(0, y), min(LANDER_HEIGHT, y + size)):
+            i = (base + r)*2
+            if rows[i] & left or rows[i+1] & right:
+                return True
+        return False
+
+def box_masks(tiles=25):
+    # the lander as a plain box, for when the sprite sheet is not at hand:
+    # columns 4 to 28, rows down to 4 pixels above the tile bottom
+    masks = LanderMasks(tiles)
+    for tile in range(tiles):
+        for x in range(4, LANDER_WIDTH - 3):
+            for y in range(LANDER_HEIGHT - 4):
+                masks.set(tile, x, y)
+    masks.finish()
+    return masks
+
+def sheet_masks(path=rocketsheet, fpr=None):
+    # LanderMasks from a sprite sheet BMP of lander tiles in a row. Pixels
+    # not the color of the top left pixel are occupied, the same pixel the
+    # game makes transparent. Uncompressed 1, 4 and 8 bit BMPs only.
+    # fpr: the sheet already open, from the asset pack say, or None to
+    # open path
+    if fpr is None:
+        with open(path, "rb") as fpr:
+            return sheet_masks(path, fpr)
+    header = fpr.read(54)
+    if header[0:2] != b"BM":
+        raise ValueError(f"{path}: not a BMP")
+    offset = struct.unpack_from("<I", header, 10)[0]
+    width, height, planes, bpp, compression = struct.unpack_from("<iiHHI", header, 18)
+    if bpp not in (1, 4, 8) or compression != 0:
+        raise ValueError(f"{path}: {bpp} bit or compressed BMP")
+    rowsize = (width*bpp + 31)//32*4
+    per_byte = 8//bpp
+    mask = (1 << bpp) - 1
+    masks = LanderMasks(width//LANDER_WIDTH, path)
+    row = bytearray(rowsize)
+    background = -1
+    for y in range(LANDER_HEIGHT):
+        # rows are stored bottom up unless the height is negative
+        fpr.seek(offset + (y if height < 0 else abs(height) - 1 - y)*rowsize)
+        fpr.readinto(row)
+        for x in range(masks.tiles*LANDER_WIDTH):
+            color = row[x//per_byte] >> (8 - bpp*(x%per_byte + 1)) & mask
+            if background < 0:
+                background = color
+            elif color != background:
+                masks.set(x//LANDER_WIDTH, x%LANDER_WIDTH, y)
+    masks.finish()
+    return masks
+
+class Kinematics:
+    # Per-mission lookup tables built once at load time, so a physics step
+    # is table lookups instead of trig and rescaling. Thrust tables are
+    # indexed by rotation step (0-23, 15 degrees each).
+
+    def __init__(self, data, volcanos):
+        thrust = data['thrust']
+        scale = data['scale']
+        self.px_per_m = scale # pixels per meter
+        self.m_per_px = 1 / scale
+        # float velocity change per thrusting step
+        self.thrust_x = array(FLOAT_CODE, [0]*24)
+        self.thrust_y = array(FLOAT_CODE, [0]*24)
+        # same in fixed point, m/s << FP_SHIFT
+        self.thrust_xi = array('l', [0]*24)
+        self.thrust_yi = array('l', [0]*24)
+        for r in range(24):
+            dx = thrust*math.sin(math.radians(r*15))
+            dy = thrust*math.cos(math.radians(r*15))
+            self.thrust_x[r] = dx
+            self.thrust_y[r] = dy
+            self.thrust_xi[r] = round(dx*FP_ONE)
+            self.thrust_yi[r] = round(dy*FP_ONE)
+        # per step gravity and fuel
+        self.gravity_step = data['gravity']*PHYSICS_STEP
+        self.gravity_step_i = round(self.gravity_step*FP_ONE)
+        self.fuel_burn = data['fuelfactor']
+        self.fuel_burn_i = round(self.fuel_burn*FP_ONE)
+        self.fuel_leak = data['fuelleak'] / 20
+        self.fuel_leak_i = round(self.fuel_leak*FP_ONE)
+        # meters per second to pixels per step, << PX_SHIFT
+        self.pixel_step_i = round(scale*PHYSICS_STEP*(1 << PX_SHIFT))
+        # speed limit, m/s << FP_SHIFT, that keeps velocity*pixel_step_i
+        # under 2**30, a CircuitPython small int; the float rules share it
+        self.max_speed_i = ((1 << 30) - 1)//self.pixel_step_i
+        self.max_speed = self.max_speed_i/FP_ONE
+        # lava per page and volcano: rise in pixels per step, first
+        # particle height, pattern and random chance (-1 for none)
+        self.lava_step = []
+        self.lava_start = []
+        self.lava_pattern = []
+        self.lava_chance = []
+        for page in volcanos:
+            self.lava_step.append(array('h', [int(v["speed"]*PHYSICS_STEP*scale+.5) for v in page]))
+            self.lava_start.append(array('h', [LAVA_SPACING*v["ppos"] for v in page]))
+            self.lava_pattern.append([bytes(v["pattern"]) for v in page])
+            self.lava_chance.append(array('h', [v.get("random", -1) for v in page]))
+
+class Simulation:
+
+    def __init__(self):
+        self.fixed_step = FIXED_STEP
+        self.gravity = 1.62 # m/s/s
+        self.scale = 2.4 # pixels to meter
+        self.thrust = 1.5
+        self.fuelfactor = 3
+        self.fuelleak = 0
+        self.stabilizer = 1
+        self.pages = []
+        self.mines = []
+        self.volcanos = []
+        self.heights = [] # per page terrain_map() columns
+        self.steps = []
+        self.peaks = [] # per page highest terrain node
+        self.pads = [] # per page pad_map()
+        self.lava_columns = [] # per page volcano_map()
+        self.minerals = 0 # mineral mines collected
+        self.minetotal = 0
+        self.data = None
+        self.seed = 1 # lava randomizer seed, set before load() or reset()
+        self.lava_ticks = array('l') # per page lava clock, steps
+        self.lava_time = [] # same in seconds, for variable steps
+        self.masks = box_masks() # lander collision shape, see sheet_masks()
+
+    def load(self, data):
+        # mission constants from data.json, then start the mission
+        self.data = data
+        self.gravity = data['gravity']
+        self.scale = data['scale']
+        self.thrust = data['thrust']
+        self.fuelfactor = data['fuelfactor']
+        self.fuelleak = data['fuelleak']
+        self.stabilizer = data['stabilizer']
+        self.startpage = data['startpage']
+        self.pages = data["pages"]
+        self.mines = []
+        self.volcanos = []
+        self.heights = []
+        self.steps = []
+        self.peaks = []
+        self.pads = []
+        self.lava_columns = []
+        self.minerals = 0
+        self.minetotal = 0
+        for page in self.pages:
+            self.mines.append(page["mines"])
+            self.pads.append(pad_map(page["mines"], len(page["terrain"])))
+            for m in page["mines"]:
+                if m["type"] == "m":
+                    self.minetotal += 1
+                    if m["count"] == 0:
+                        self.minerals += 1
+            self.volcanos.append(page.get("volcanos", []))
+            self.lava_columns.append(volcano_map(self.volcanos[-1], len(page["terrain"])))
+            heights, steps = terrain_map(page["terrain"])
+            self.heights.append(heights)
+            self.steps.append(steps)
+            self.peaks.append(max(page["terrain"]))
+        self.kinematics = Kinematics(data, self.volcanos)
+        self.reset()
+
+    def reset(self):
+        # initial lander and lava state for the loaded mission
+        data = self.data
+        self.xvelocity = data['xvelocity']
+        self.yvelocity = data['yvelocity']
+        self.xdistance = data['xdistance']
+        self.ydistance = data['ydistance']
+        self.prev_xdistance = self.xdistance
+        self.prev_ydistance = self.ydistance
+        self.rotate = data['rotate']
+        self.frotate = (self.rotate*15+360)%360
+        self.rotaterpm = data['rotaterpm']
+        self.fuel = data['fuel']
+        self.startfuel = self.fuel
+        self.tpage = self.startpage
+        self.scount = 0 # physics step count
+        self.accumulator = 0 # unsimulated time for fixed step physics
+        self.impact = -1 # time into the last frame of a contact, see advance()
+        self.thruster = False
+        self.rotating = 0
+        self.rotatingnow = False
+        self.onground = False
+        self.crashed = False
+        self.result = NO_CONTACT
+        self.touchdown = False # first frame of a ground contact
+        self.rotate_changed = False
+        self.engine_out = False # ran out of fuel while thrusting
+        self.reset_lava()
+
+    def reset_lava(self):
+        # Lava is a function of each page's lava clock, which only runs
+        # while the lander is on that page or the next one over, when the
+        # page can be on screen. Particle slot i of a volcano starts
+        # LAVA_SPACING*(i + ppos) down the screen, rises with the clock and
+        # wraps to the bottom, taking the next pattern entry each time it
+        # wraps.
+        self.lava_ticks = array('l', [0]*len(self.volcanos))
+        self.lava_time = [0.0]*len(self.volcanos)
+
+    def lava_rise(self, page, v):
+        # pixels the lava of volcano v has risen on its page's clock
+        if self.fixed_step:
+            return self.kinematics.lava_step[page][v]*self.lava_ticks[page]
+        return int(self.volcanos[page][v]["speed"]*self.lava_time[page]*self.scale+.5)
+
+    def lava_slot_y(self, page, v, i, rise):
+        # screen y of particle slot i, rise from lava_rise()
+        y = self.kinematics.lava_start[page][v] + LAVA_SPACING*i - rise
+        if y <= 0 - LAVA_SPACING:
+            y += ((0 - LAVA_SPACING - y)//DISPLAY_HEIGHT + 1)*DISPLAY_HEIGHT
+        return y
+
+    def lava_shown(self, page, v, i, rise):
+        # True if particle slot i is visible in its current trip up the
+        # screen. Trip n of slot i uses pattern entry i + LAVA_COUNT*n.
+        y = self.kinematics.lava_start[page][v] + LAVA_SPACING*i - rise
+        n = i
+        if y <= 0 - LAVA_SPACING:
+            n += ((0 - LAVA_SPACING - y)//DISPLAY_HEIGHT + 1)*LAVA_COUNT
+        pattern = self.kinematics.lava_pattern[page][v]
+        if pattern[n % len(pattern)] != 1:
+            return False
+        chance = self.kinematics.lava_chance[page][v]
+        return chance < 0 or self.random(page, v, n, 101) > chance
+
+    def random(self, page, v, n, d):
+        # 0 to d-1 for trip n of a volcano's particles, from the seed alone
+        # so the lava can be sampled in any order. Two ZX81 steps with an
+        # xor fold between them, small ints only.
+        r = (self.seed + page*7919 + v*613 + n*2731) % 65536 + 1
+        r = r*75 % 65537
+        r ^= r >> 7
+        r = r*75 % 65537
+        return r % d
+
+    def lander_x(self):
+        # lander position in pixels on the current page
+        return int(self.xdistance*self.kinematics.px_per_m +.5) - self.tpage*DISPLAY_WIDTH
+
+    def lander_y(self):
+        return int(self.ydistance*self.kinematics.px_per_m +.5)
+
+    def render_x(self):
+        # lander position drawn between the last two physics steps
+        if not self.fixed_step:
+            return self.lander_x()
+        alpha = self.accumulator / PHYSICS_STEP
+        xdistance = self.prev_xdistance + (self.xdistance - self.prev_xdistance)*alpha
+        return int(xdistance*self.kinematics.px_per_m +.5) - self.tpage*DISPLAY_WIDTH
+
+    def render_y(self):
+        if not self.fixed_step:
+            return self.lander_y()
+        alpha = self.accumulator / PHYSICS_STEP
+        ydistance = self.prev_ydistance + (self.ydistance - self.prev_ydistance)*alpha
+        return int(ydistance*self.kinematics.px_per_m +.5)
+
+    def advance(self, elapsed):
+        # run the physics for elapsed seconds of wall time, returns step count
+        # A frame of several steps tests for contact between them and stops
+        # at the first step that touches terrain or lava, so a long frame
+        # cannot carry the lander through either. impact is the time into
+        # the frame of that step, -1 if the frame ran to the end. Contact
+        # after the last step is left to the frame's own checks.
+        self.impact = -1
+        if not self.fixed_step:
+            # variable steps, split into steps of at most PHYSICS_STEP
+            steps = 0
+            done = 0
+            while done < elapsed:
+                if steps and self.touching():
+                    self.impact = done
+                    break
+                dt = min(elapsed - done, PHYSICS_STEP)
+                self.step(dt)
+                done += dt
+                steps += 1
+            return steps
+        # run whole physics steps for the elapsed time, at most MAX_SUBSTEPS
+        # per frame, render_x/render_y draw between the last two steps
+        self.accumulator += elapsed
+        steps = 0
+        while self.accumulator >= PHYSICS_STEP and steps < MAX_SUBSTEPS:
+            if steps and self.touching():
+                # draw the lander where it hit, the rest of the frame is dropped
+                self.impact = steps*PHYSICS_STEP
+                self.accumulator = 0
+                break
+            self.step(PHYSICS_STEP)
+            self.accumulator -= PHYSICS_STEP
+            steps += 1
+        if self.accumulator >= PHYSICS_STEP:
+            # stalled frame, drop the backlog instead of catching up
+            self.accumulator = self.accumulator % PHYSICS_STEP
+        return steps
+
+    def step(self, dt):
+        # advance lander physics by dt seconds
+        # in fixed step mode dt is always PHYSICS_STEP, so thrust, fuel burn
+        # and rotation are applied at the same rate regardless of frame rate
+        k = self.kinematics
+        self.scount += 1
+        self.prev_xdistance = self.xdistance
+        self.prev_ydistance = self.ydistance
+        if self.fuelleak > 0:
+            self.fuel -= k.fuel_leak
+        if self.fuel <= 0 and self.thruster:
+            self.thruster = False
+            self.engine_out = True
+
+        if not self.onground:
+            if self.fixed_step:
+                self.yvelocity += k.gravity_step
+            else:
+                self.yvelocity = (self.gravity * dt) + self.yvelocity
+            if self.thruster:
+                self.yvelocity -= k.thrust_y[self.rotate]
+                self.xvelocity += k.thrust_x[self.rotate]
+                self.fuel -= k.fuel_burn
+                if self.fuel <= 0:
+                    self.fuel = 0
+                    self.thruster = False
+                    self.engine_out = True
+            if self.stabilizer != 1 and self.rotaterpm != 0: # stabilizer is off
+                self.frotate += self.rotaterpm / dt / 60
+                self.frotate = self.frotate%360
+                self.rotate = int(self.frotate)%360//15 # nearest 15 degree
+                self.rotate_changed = True
+
+            self.xvelocity = max(-k.max_speed, min(self.xvelocity, k.max_speed))
+            self.yvelocity = max(-k.max_speed, min(self.yvelocity, k.max_speed))
+            self.xdistance += self.xvelocity * dt
+            self.ydistance += self.yvelocity * dt
+
+            if not self.rotatingnow and self.scount%2 == 0:
+                self.rotating = 0
+            else:
+                if self.rotating < 0 and self.scount%2 == 0: # rotate left
+                    self.rotate = (self.rotate-1)%24
+                    self.rotaterpm -= 10
+                    self.rotate_changed = True
+                elif self.rotating > 0 and self.scount%2 == 0: # rotate right
+                    self.rotate = (self.rotate+1)%24
+                    self.rotaterpm += 10
+                    self.rotate_changed = True
+
+        self.step_lava(dt)
+
+    def step_lava(self, dt):
+        # run the lava clocks of the lander's page and its neighbours, the
+        # pages that can share the screen with it
+        for page in range(max(self.tpage - 1, 0), min(self.tpage + 2, len(self.volcanos))):
+            self.lava_ticks[page] += 1
+            self.lava_time[page] += dt
+
+    def lava_phase(self):
+        # lava rocks turn one tile every 5 steps
+        return self.scount//5
+
+    def altitude(self):
+        # meters above the terrain under the lander's left edge
+        x = self.lander_x()
+        steps = self.steps[self.tpage]
+        return (DISPLAY_HEIGHT - LANDER_HEIGHT - self.lander_y() - steps[min(max(0, x), len(steps) - 1)] + 4)*self.kinematics.m_per_px
+
+    def page_switch(self):
+        # page the lander has flown onto, tpage if it has not left the page
+        x = self.lander_x()
+        y = self.lander_y()
+        if y > 0 and x > DISPLAY_WIDTH - LANDER_WIDTH//2 and self.tpage + 1 < len(self.pages):
+            return self.tpage + 1
+        elif y > 0 and x < 0 - LANDER_WIDTH//2 and self.tpage > 0:
+            return self.tpage - 1
+        return self.tpage
+
+    def touching(self):
+        # True if a flying lander touches terrain or visible lava, for the
+        # swept test in advance(). Changes no state, the frame's
+        # ground_check() and lava_hit() report the contact.
+        return not self.onground and (self.touching_ground() or self.lava_contact())
+
+    def touching_ground(self):
+        # True if the lander sprite reaches the surface, the contact test
+        # of ground_check() without the landing
+        if self.lander_y() + LANDER_HEIGHT + self.peaks[self.tpage] < DISPLAY_HEIGHT:
+            return False # above the highest node of the page
+        heights = self.heights[self.tpage]
+        lx = self.lander_x()
+        x1 = lx + self.masks.left[self.rotate]
+        x2 = lx + self.masks.right[self.rotate]
+        return x1 >= TREZ and x2 < len(heights) - 1 and self.terrain_contact(heights, lx)
+
+    def out_of_bounds(self):
+        # True once the lander has left the mission, over the top of the
+        # screen or past the first or last page: it returned to base
+        x = self.lander_x() + self.tpage*DISPLAY_WIDTH
+        return (self.lander_y() + LANDER_HEIGHT + 8 < 0 or
+            x < 0 - LANDER_WIDTH - 8 or x > len(self.pages)*DISPLAY_WIDTH + 8)
+
+    def lava_hit(self):
+        # True if the lander overlaps a visible lava particle
+        if self.lava_contact():
+            self.crashed = True
+            return True
+        return False
+
+    def lava_contact(self):
+        # lava of the lander's page, or of a neighbouring page the lander
+        # tile reaches; a page's lava columns run a little past its edge
+        lx = self.lander_x()
+        return (self.page_lava_contact(self.tpage, lx) or
+            self.page_lava_contact(self.tpage - 1, lx + DISPLAY_WIDTH) or
+            self.page_lava_contact(self.tpage + 1, lx - DISPLAY_WIDTH))
+
+    def page_lava_contact(self, page, lx):
+        # lx is the lander's x on page, only the columns it reaches are
+        # tested
+        if page < 0 or page >= len(self.volcanos):
+            return False
+        columns = self.lava_columns[page]
+        # volcano nodes whose LAVA_SIZE wide particles reach the lander tile
+        p1 = max(0, (lx - LAVA_SIZE)//TREZ + 1)
+        p2 = min(len(columns) - 1, (lx + LANDER_WIDTH - 1)//TREZ)
+        for p in range(p1, p2 + 1):
+            for v in columns[p]:
+                if self.lava_stream_hit(page, v, p*TREZ - lx):
+                    return True
+        return False
+
+    def lava_stream_hit(self, page, v, dx):
+        # True if a visible particle of volcano v on page covers a pixel of
+        # the lander sprite, dx is the particles' x in the lander tile. The
+        # particles of a volcano stay LAVA_SPACING apart as they rise and
+        # wrap, so only the two or three of them that can reach the
+        # lander's rows are tested.
+        rise = self.lava_rise(page, v)
+        ly = self.lander_y()
+        top = ly - LAVA_SIZE + 1 # highest particle y touching the lander tile
+        bottom = ly + LANDER_HEIGHT - 1
+        y0 = self.lava_slot_y(page, v, 0, rise)
+        first = -((y0 - top)//LAVA_SPACING)
+        last = (bottom - y0)//LAVA_SPACING
+        for k in range(first, last + 1):
+            i = k % LAVA_COUNT
+            y = self.lava_slot_y(page, v, i, rise)
+            if top <= y <= bottom and self.lava_shown(page, v, i, rise) and (
+                self.masks.overlap(self.rotate, dx, y - ly, LAVA_SIZE)):
+                return True
+        return False
+
+    def ground_check(self):
+        # NO_CONTACT while flying, otherwise the landing result
+        # touchdown is set on the first frame of a contact
+        self.touchdown = False
+        heights = self.heights[self.tpage]
+        lx = self.lander_x()
+        x1 = lx + self.masks.left[self.rotate]
+        x2 = lx + self.masks.right[self.rotate]
+        if x1 >= 0 and x2 < len(heights) - 1:
+            if x1 >= TREZ and self.terrain_contact(heights, lx):
+                if not self.onground:
+                    self.onground = True
+                    self.touchdown = True
+                    steps = self.steps[self.tpage]
+                    self.result = self.landing_result(steps[x1] == steps[x2])
+                    if self.result == LANDED:
+                        self.yvelocity = 0
+                        self.xvelocity = 0
+                        self.rotate = 0
+                    else:
+                        self.crashed = True
+                        if self.result == CRASH_NOT_LEVEL:
+                            self.xvelocity = -self.xvelocity*.6
+                            self.yvelocity = self.yvelocity*.6
+                return self.result
+            self.onground = False
+        return NO_CONTACT
+
+    def terrain_contact(self, heights, lx):
+        # True if any column of the lander sprite reaches the surface,
+        # heights from terrain_map() and lx the lander tile's x
+        masks = self.masks
+        bottom = masks.bottom
+        tile = self.rotate
+        base = tile*LANDER_WIDTH
+        # surface height, scaled by TREZ, at the row under the tile
+        ground = (DISPLAY_HEIGHT - self.lander_y())*TREZ
+        for x in range(masks.left[tile], masks.right[tile] + 1):
+            b = bottom[base + x]
+            if b >= 0 and heights[lx + x] >= ground - (b + 1)*TREZ:
+                return True
+        return False
+
+    def landing_result(self, level):
+        # pass/fail rules for a touchdown, checked in this order
+        if not level:
+            return CRASH_NOT_LEVEL
+        elif self.yvelocity > 10:
+            return CRASH_TOO_FAST
+        elif self.yvelocity > 5:
+            return CRASH_HARD_LANDING
+        elif self.rotate != 0:
+            return CRASH_NOT_VERTICAL
+        elif abs(self.xvelocity) > 3:
+            return CRASH_SLIDING
+        elif self.fuel <= 0:
+            return STRANDED
+        return LANDED
+
+    def landing_pad(self, fillup=False):
+        # first mine in list order whose pad is under the lander on the
+        # current page and that has gems left, or fuel left unless fillup
+        # (refueled on this landing already), None for none. Where pads
+        # overlap, a used up pad lets the next one serve.
+        pads = self.pads[self.tpage]
+        pos = (self.lander_x() + 4)//TREZ
+        if 0 <= pos < len(pads):
+            mines = self.mines[self.tpage]
+            for i in pads[pos]:
+                m = mines[i]
+                if m["count"] > 0 and (m["type"] == "m" or m["type"] == "f" and not fillup):
+                    return m
+        return None
+
+    def collect_mine(self, m):
+        # visit a mineral mine, keeps mine_progress() current
+        if m["count"] > 0:
+            m["count"] = 0
+            self.minerals += 1
+
+    def mine_progress(self):
+        # (collected, total) mineral mines over all pages
+        return self.minerals, self.minetotal
+
+class FixedPointSimulation(Simulation):
+    # Same rules as Simulation, with state kept in small ints so a physics
+    # step allocates nothing while gc is disabled.
+    #   velocity: m/s << FP_SHIFT
+    #   position: pixels << FP_SHIFT
+    #   fuel: units << FP_SHIFT
+    # The float names (xvelocity, fuel, ...) are properties for the HUD
+    # and for Game's occasional adjustments.
+
+    def __init__(self):
+        super().__init__()
+        self.fixed_step = True # needs a constant step
+        self.xv = 0
+        self.yv = 0
+        self.xp = 0
+        self.yp = 0
+        self.fuel_fp = 0
+        self.frotate_fp = 0
+
+    def reset(self):
+        super().reset()
+        self.prev_xp = self.xp
+        self.prev_yp = self.yp
+        self.accumulator = 0 # milliseconds
+
+    @property
+    def xvelocity(self):
+        return self.xv / FP_ONE
+
+    @xvelocity.setter
+    def xvelocity(self, value):
+        self.xv = int(value*FP_ONE)
+
+    @property
+    def yvelocity(self):
+        return self.yv / FP_ONE
+
+    @yvelocity.setter
+    def yvelocity(self, value):
+        self.yv = int(value*FP_ONE)
+
+    @property
+    def xdistance(self):
+        return self.xp / FP_ONE / self.scale
+
+    @xdistance.setter
+    def xdistance(self, value):
+        self.xp = int(value*self.scale*FP_ONE)
+
+    @property
+    def ydistance(self):
+        return self.yp / FP_ONE / self.scale
+
+    @ydistance.setter
+    def ydistance(self, value):
+        self.yp = int(value*self.scale*FP_ONE)
+
+    @property
+    def frotate(self):
+        return self.frotate_fp / FP_ONE
+
+    @frotate.setter
+    def frotate(self, value):
+        self.frotate_fp = int(value*FP_ONE)
+
+    @property
+    def fuel(self):
+        return self.fuel_fp / FP_ONE
+
+    @fuel.setter
+    def fuel(self, value):
+        self.fuel_fp = int(value*FP_ONE)
+
+    def lander_x(self):
+        return ((self.xp + (FP_ONE >> 1)) >> FP_SHIFT) - self.tpage*DISPLAY_WIDTH
+
+    def lander_y(self):
+        return (self.yp + (FP_ONE >> 1)) >> FP_SHIFT
+
+    def render_x(self):
+        xp = self.prev_xp + (self.xp - self.prev_xp)*self.accumulator//STEP_MS
+        return ((xp + (FP_ONE >> 1)) >> FP_SHIFT) - self.tpage*DISPLAY_WIDTH
+
+    def render_y(self):
+        yp = self.prev_yp + (self.yp - self.prev_yp)*self.accumulator//STEP_MS
+        return (yp + (FP_ONE >> 1)) >> FP_SHIFT
+
+    def advance(self, elapsed):
+        # same as Simulation.advance, with the accumulator in milliseconds
+        self.impact = -1
+        self.accumulator += int(elapsed*1000)
+        steps = 0
+        while self.accumulator >= STEP_MS and steps < MAX_SUBSTEPS:
+            if steps and self.touching():
+                self.impact = steps*PHYSICS_STEP
+                self.accumulator = 0
+                break
+            self.step(PHYSICS_STEP)
+            self.accumulator -= STEP_MS
+            steps += 1
+        if self.accumulator >= STEP_MS:
+            # stalled frame, drop the backlog instead of catching up
+            self.accumulator = self.accumulator % STEP_MS
+        return steps
+
+    def step(self, dt):
+        # one PHYSICS_STEP, dt is ignored
+        k = self.kinematics
+        self.scount += 1
+        self.prev_xp = self.xp
+        self.prev_yp = self.yp
+        if k.fuel_leak_i > 0:
+            self.fuel_fp -= k.fuel_leak_i
+        if self.fuel_fp <= 0 and self.thruster:
+            self.thruster = False
+            self.engine_out = True
+
+        if not self.onground:
+            self.yv += k.gravity_step_i
+            if self.thruster:
+                self.yv -= k.thrust_yi[self.rotate]
+                self.xv += k.thrust_xi[self.rotate]
+                self.fuel_fp -= k.fuel_burn_i
+                if self.fuel_fp <= 0:
+                    self.fuel_fp = 0
+                    self.thruster = False
+                    self.engine_out = True
+            if self.stabilizer != 1 and self.rotaterpm != 0: # stabilizer is off
+                # rpm / dt / 60 degrees per step
+                self.frotate_fp = (self.frotate_fp + self.rotaterpm*STEPS_PER_SECOND*FP_ONE//60) % (360*FP_ONE)
+                self.rotate = (self.frotate_fp >> FP_SHIFT)//15 # nearest 15 degree
+                self.rotate_changed = True
+
+            # clamped so the products below stay small ints
+            if self.xv > k.max_speed_i:
+                self.xv = k.max_speed_i
+            elif self.xv < -k.max_speed_i:
+                self.xv = -k.max_speed_i
+            if self.yv > k.max_speed_i:
+                self.yv = k.max_speed_i
+            elif self.yv < -k.max_speed_i:
+                self.yv = -k.max_speed_i
+            self.xp += (self.xv*k.pixel_step_i) >> PX_SHIFT
+            self.yp += (self.yv*k.pixel_step_i) >> PX_SHIFT
+
+            if not self.rotatingnow and self.scount%2 == 0:
+                self.rotating = 0
+            else:
+                if self.rotating < 0 and self.scount%2 == 0: # rotate left
+                    self.rotate = (self.rotate-1)%24
+                    self.rotaterpm -= 10
+                    self.rotate_changed = True
+                elif self.rotating > 0 and self.scount%2 == 0: # rotate right
+                    self.rotate = (self.rotate+1)%24
+                    self.rotaterpm += 10
+                    self.rotate_changed = True
+
+        self.step_lava(dt)
+
+    def step_lava(self, dt):
+        for page in range(max(self.tpage - 1, 0), min(self.tpage + 2, len(self.volcanos))):
+            self.lava_ticks[page] += 1
+
+    def landing_result(self, level):
+        if not level:
+            return CRASH_NOT_LEVEL
+        elif self.yv > 10*FP_ONE:
+            return CRASH_TOO_FAST
+        elif self.yv > 5*FP_ONE:
+            return CRASH_HARD_LANDING
+        elif self.rotate != 0:
+            return CRASH_NOT_VERTICAL
+        elif abs(self.xv) > 3*FP_ONE:
+            return CRASH_SLIDING
+        elif self.fuel_fp <= 0:
+            return STRANDED
+        return LANDED
+
+def new_simulation():
+    # simulation for the game, float or fixed point per FIXED_POINT
+    if FIXED_POINT:
+        return FixedPointSimulation()
+    return Simulation()
+
+def load_data(mission):
+    # data.json for a mission directory name
+    import json
+    with open(f"missions/{mission}/data.json", mode="r") as fpr:
+        return json.load(fpr)
+
+if __name__ == "__main__":
+    # headless run of every mission, prints simulated frames per second
+    # "python simulation.py fixed" runs the fixed point version
+    import os
+    import sys
+    import time
+    fixed = "fixed" in sys.argv[1:]
+    for mission in sorted(os.listdir("missions")):
+        sim = FixedPointSimulation() if fixed else Simulation()
+        sim.load(load_data(mission))
+        frames = 0
+        start = time.monotonic()
+        while frames < 20000:
+            # hover with short burns, drifting right
+            sim.thruster = sim.yvelocity > 2 and sim.fuel > 0
+            sim.advance(PHYSICS_STEP)
+            sim.lava_hit()
+            if sim.ground_check() != NO_CONTACT or sim.lander_y() > DISPLAY_HEIGHT:
+                sim.reset()
+            frames += 1
+        elapsed = time.monotonic() - start
+        print(f"mission {mission}: {frames/elapsed:.0f} frames/s")
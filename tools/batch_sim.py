@@ -0,0 +1,301 @@
+"""
+Moon Miner batch landing simulator
+Host-side tool for level design. Flies thousands of landers at once as
+NumPy arrays with the game's physics and landing rules. Each lander
+starts from the mission start and flies a randomized autopilot toward
+one mine. The report gives, per mine, how often the pad can be reached
+and by how much fuel.
+
+    python tools/batch_sim.py missions/002
+    python tools/batch_sim.py missions/012 -n 10000 --json report.json
+
+Physics follows Simulation.step in fixed step mode, including the speed
+clamp and, with the stabilizer off, the drift of rotaterpm. Touchdown
+follows Simulation.ground_check and landing_result with the rocket sheet
+masks the game uses, or the plain box with --box. Not simulated: lava,
+keyboard thrust kicks and the multi-mine route, so each mine is scored
+from a fresh start. The page is taken from the lander's middle instead
+of the game's page switch.
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+import simulation
+from simulation import (DISPLAY_WIDTH, DISPLAY_HEIGHT, LANDER_WIDTH, LANDER_HEIGHT,
+    TREZ, PHYSICS_STEP, STEPS_PER_SECOND, Kinematics)
+
+FLYING = 0
+OFF_PAD = 100 # landed safely, but not on the target pad
+LOST = 101 # flew off the screen, ends the mission in the game
+TIMEOUT = 102 # still flying at max_time
+
+RESULT_NAMES = {
+    simulation.LANDED: "landed",
+    simulation.CRASH_NOT_LEVEL: "not level",
+    simulation.CRASH_TOO_FAST: "too fast",
+    simulation.CRASH_HARD_LANDING: "hard landing",
+    simulation.CRASH_NOT_VERTICAL: "not vertical",
+    simulation.CRASH_SLIDING: "sliding",
+    simulation.STRANDED: "stranded",
+    OFF_PAD: "off pad",
+    LOST: "lost",
+    TIMEOUT: "timeout",
+}
+
+def load_mission(path):
+    if os.path.isdir(path):
+        path = os.path.join(path, "data.json")
+    with open(path) as fpr:
+        return json.load(fpr)
+
+def terrain_table(data):
+    # pages x pixel columns of simulation.terrain_map(), short pages
+    # padded with their last column
+    maps = [simulation.terrain_map(page["terrain"]) for page in data["pages"]]
+    width = max(len(heights) for heights, steps in maps)
+    heights = np.zeros((len(maps), width), dtype=np.int32)
+    steps = np.zeros((len(maps), width), dtype=np.int32)
+    widths = np.zeros(len(maps), dtype=np.int32)
+    for p, (h, s) in enumerate(maps):
+        heights[p, :len(h)] = h
+        heights[p, len(h):] = h[-1]
+        steps[p, :len(s)] = s
+        steps[p, len(s):] = s[-1]
+        widths[p] = len(h)
+    return heights, steps, widths
+
+def mask_table(masks):
+    # per rotation tile, the lowest occupied row of each column, -1 for
+    # none, and the first and last occupied column, of simulation.LanderMasks
+    bottom = np.array(masks.bottom, dtype=np.int32).reshape(masks.tiles, LANDER_WIDTH)
+    return bottom, np.array(masks.left, dtype=np.int32), np.array(masks.right, dtype=np.int32)
+
+def sample_pilots(n, rng):
+    # randomized autopilot gains, one set per lander
+    return {
+        "kx": rng.uniform(.02, .25, n), # desired x speed per meter to target
+        "vx_max": rng.uniform(5, 60, n), # cruise speed m/s
+        "tilt": rng.integers(2, 7, n), # max tilt in rotation steps
+        "ky": rng.uniform(.03, .3, n), # desired descent speed per meter of altitude
+        "vy_min": rng.uniform(.5, 4.5, n), # final descent speed m/s
+        "vy_max": rng.uniform(5, 25, n), # cruise descent speed m/s
+        "final_alt": rng.uniform(5, 40, n), # meters, stand upright below this
+        "approach": rng.uniform(5, 40, n), # meters from the pad to start descending
+        "clearance": rng.uniform(20, 80, n), # meters above the ground while cruising
+    }
+
+def fly(data, masks, target_page, target_pos, target_len, n, rng, max_time=180):
+    k = Kinematics(data, [[] for _ in data["pages"]])
+    heights, steps, widths = terrain_table(data)
+    bottom, left, right = mask_table(masks)
+    columns = np.arange(LANDER_WIDTH)
+    last = heights.shape[1] - 1
+    npages = len(data["pages"])
+    scale = data["scale"]
+    pilot = sample_pilots(n, rng)
+
+    thrust_x = np.array(k.thrust_x, dtype=np.float64)
+    thrust_y = np.array(k.thrust_y, dtype=np.float64)
+    xv = np.full(n, float(data["xvelocity"]))
+    yv = np.full(n, float(data["yvelocity"]))
+    xd = np.full(n, float(data["xdistance"]))
+    yd = np.full(n, float(data["ydistance"]))
+    rot = np.full(n, data["rotate"] % 24, dtype=np.int64)
+    # stabilizer off: rotation keys spin the lander up, as in Simulation.step
+    drift = data["stabilizer"] != 1
+    rpm = np.full(n, data["rotaterpm"], dtype=np.int64)
+    frotate = rot*15.
+    fuel = np.full(n, float(data["fuel"]))
+    result = np.zeros(n, dtype=np.int64)
+    land_xv = np.zeros(n)
+    land_yv = np.zeros(n)
+    land_fuel = np.zeros(n)
+    land_time = np.zeros(n)
+
+    # lander left edge for the middle of the pad, world pixels
+    target_x = target_page*DISPLAY_WIDTH + (target_pos*2 + target_len)*TREZ//2 - LANDER_WIDTH//2
+    pad_top = steps[target_page, target_pos*TREZ]
+    world_right = npages*DISPLAY_WIDTH
+
+    for step in range(int(max_time/PHYSICS_STEP)):
+        live = result == FLYING
+        if not live.any():
+            break
+        scount = step + 1
+        wx = np.floor(xd*scale + .5).astype(np.int64) # world pixels
+        ly = np.floor(yd*scale + .5).astype(np.int64)
+        page = np.clip((wx + LANDER_WIDTH//2)//DISPLAY_WIDTH, 0, npages - 1)
+        lx = wx - page*DISPLAY_WIDTH
+
+        # autopilot
+        dx = (target_x - wx)/scale
+        alt = (DISPLAY_HEIGHT - LANDER_HEIGHT - ly + 4 - pad_top)/scale
+        want_vx = np.clip(dx*pilot["kx"], -pilot["vx_max"], pilot["vx_max"])
+        tilt = np.clip(np.round((want_vx - xv)/4), -pilot["tilt"], pilot["tilt"]).astype(np.int64)
+        tilt = np.where(alt < pilot["final_alt"], 0, tilt)
+        want_vy = np.clip(alt*pilot["ky"], pilot["vy_min"], pilot["vy_max"])
+        # until over the pad, hold height and stay clear of the ground below
+        ground = steps[page, np.clip(lx, 0, last)]
+        clear = (DISPLAY_HEIGHT - LANDER_HEIGHT - ly + 4 - ground)/scale
+        cruise = np.where(clear < pilot["clearance"], -1., pilot["vy_min"])
+        want_vy = np.where(np.abs(dx) > pilot["approach"], np.minimum(want_vy, cruise), want_vy)
+        # burn to hold the descent speed, or to steer unless already climbing.
+        # the start is just below the top edge, climbing there ends the mission
+        steer = (tilt != 0) & (rot == tilt % 24) & (np.abs(want_vx - xv) > 2) & (
+            yv > np.where(ly < 48, 1.5, -3.))
+        thruster = live & (fuel > 0) & ((yv > want_vy) | steer)
+        # the keys turn one step every other physics step while held
+        signed = (rot + 12) % 24 - 12
+        turn = np.where(live, np.sign(tilt - signed), 0)
+
+        # physics, as Simulation.step
+        fuel = np.where(live, fuel - k.fuel_leak, fuel)
+        thruster &= fuel > 0
+        yv = np.where(live, yv + k.gravity_step, yv)
+        yv = np.where(thruster, yv - thrust_y[rot], yv)
+        xv = np.where(thruster, xv + thrust_x[rot], xv)
+        fuel = np.where(thruster, np.maximum(fuel - k.fuel_burn, 0), fuel)
+        if drift:
+            spin = live & (rpm != 0)
+            frotate = np.where(spin, (frotate + rpm*STEPS_PER_SECOND/60) % 360, frotate)
+            rot = np.where(spin, frotate.astype(np.int64) % 360//15, rot)
+        xv = np.clip(xv, -k.max_speed, k.max_speed)
+        yv = np.clip(yv, -k.max_speed, k.max_speed)
+        xd = np.where(live, xd + xv*PHYSICS_STEP, xd)
+        yd = np.where(live, yd + yv*PHYSICS_STEP, yd)
+        if scount % 2 == 0:
+            rot = (rot + turn) % 24
+            rpm += turn*10
+
+        # ground contact, as Simulation.ground_check and terrain_contact:
+        # any occupied column of the tile reaching the surface
+        wx = np.floor(xd*scale + .5).astype(np.int64)
+        ly = np.floor(yd*scale + .5).astype(np.int64)
+        page = np.clip((wx + LANDER_WIDTH//2)//DISPLAY_WIDTH, 0, npages - 1)
+        lx = wx - page*DISPLAY_WIDTH
+        x1 = lx + left[rot]
+        x2 = lx + right[rot]
+        inside = (x1 >= TREZ) & (x2 < widths[page] - 1)
+        q1 = np.clip(x1, 0, last)
+        q2 = np.clip(x2, 0, last)
+        b = bottom[rot]
+        surface = heights[page[:, None], np.clip(lx[:, None] + columns, 0, last)]
+        ground = (DISPLAY_HEIGHT - ly[:, None])*TREZ
+        reach = (b >= 0) & (surface >= ground - (b + 1)*TREZ)
+        contact = live & inside & reach.any(axis=1)
+
+        outcome = np.full(n, simulation.LANDED)
+        outcome = np.where(np.abs(xv) > 3, simulation.CRASH_SLIDING, outcome)
+        outcome = np.where(rot != 0, simulation.CRASH_NOT_VERTICAL, outcome)
+        outcome = np.where(yv > 5, simulation.CRASH_HARD_LANDING, outcome)
+        outcome = np.where(yv > 10, simulation.CRASH_TOO_FAST, outcome)
+        outcome = np.where(steps[page, q1] != steps[page, q2], simulation.CRASH_NOT_LEVEL, outcome)
+        # stranded only counts when every other rule passed
+        outcome = np.where((outcome == simulation.LANDED) & (fuel <= 0), simulation.STRANDED, outcome)
+        lpos = (lx + 4)//TREZ # as Simulation.landing_pad
+        on_pad = (page == target_page) & (lpos >= target_pos) & (lpos <= target_pos + target_len)
+        outcome = np.where((outcome == simulation.LANDED) & ~on_pad, OFF_PAD, outcome)
+
+        land_xv = np.where(contact, xv, land_xv)
+        land_yv = np.where(contact, yv, land_yv)
+        land_fuel = np.where(contact, fuel, land_fuel)
+        land_time = np.where(contact, scount*PHYSICS_STEP, land_time)
+        result = np.where(contact, outcome, result)
+
+        lost = live & ~contact & ((ly + LANDER_HEIGHT + 8 < 0) & (step > 40) |
+            (wx < -LANDER_WIDTH - 8) | (wx > world_right + 8) | (ly > DISPLAY_HEIGHT))
+        result = np.where(lost, LOST, result)
+
+    result = np.where(result == FLYING, TIMEOUT, result)
+    return {
+        "result": result,
+        "xvelocity": land_xv,
+        "yvelocity": land_yv,
+        "fuel": land_fuel,
+        "time": land_time,
+        "pilot": pilot,
+    }
+
+def percentiles(values):
+    if len(values) == 0:
+        return None
+    p = np.percentile(values, [0, 5, 50, 95, 100])
+    return {"min": float(p[0]), "p5": float(p[1]), "p50": float(p[2]), "p95": float(p[3]), "max": float(p[4])}
+
+def analyze(data, masks, n, seed):
+    rng = np.random.default_rng(seed)
+    report = {"mission": data["mission"], "id": data["id"], "trajectories": n,
+        "fuel": data["fuel"], "gravity": data["gravity"], "thrust": data["thrust"], "mines": []}
+    for p, page in enumerate(data["pages"]):
+        for m in page["mines"]:
+            run = fly(data, masks, p, m["pos"], m["len"], n, rng)
+            result = run["result"]
+            ok = result == simulation.LANDED
+            # touchdowns on level ground, whatever their speed
+            level = (result != LOST) & (result != TIMEOUT) & (result != simulation.CRASH_NOT_LEVEL)
+            outcomes = {}
+            for code, name in RESULT_NAMES.items():
+                count = int(np.count_nonzero(result == code))
+                if count:
+                    outcomes[name] = count
+            report["mines"].append({
+                "page": p,
+                "pos": m["pos"],
+                "len": m["len"],
+                "type": m["type"],
+                "success_rate": float(ok.mean()),
+                "outcomes": outcomes,
+                # fuel left after a good landing, as a fraction of the tank
+                "fuel_margin": percentiles(run["fuel"][ok]/data["fuel"]),
+                "fuel_left": percentiles(run["fuel"][ok]),
+                "time": percentiles(run["time"][ok]),
+                # touchdown speeds over all touchdowns on level ground
+                "touchdown_yvelocity": percentiles(run["yvelocity"][level]),
+                "touchdown_xvelocity": percentiles(np.abs(run["xvelocity"][level])),
+            })
+    return report
+
+def print_report(report):
+    print(f"{report['mission']} ({report['id']}): {report['trajectories']} trajectories per mine,"
+        f" fuel {report['fuel']}, gravity {report['gravity']}, thrust {report['thrust']}")
+    for m in report["mines"]:
+        margin = m["fuel_margin"]
+        if margin:
+            fuel = f"fuel left p50 {margin['p50']*100:5.1f}%  best {margin['max']*100:5.1f}%"
+        else:
+            fuel = "not reached"
+        print(f"  page {m['page']} pos {m['pos']:2d} len {m['len']} ({m['type']}):"
+            f" {m['success_rate']*100:5.1f}% landed, {fuel}")
+        print("    " + ", ".join(f"{k}: {v}" for k, v in m["outcomes"].items()))
+    winnable = all(m["success_rate"] > 0 for m in report["mines"] if m["type"] == "m")
+    print("  winnable" if winnable else "  NOT winnable from a fresh start")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("missions", nargs="+", help="mission directories or data.json files")
+    parser.add_argument("-n", type=int, default=4000, help="trajectories per mine")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="write the report(s) to this file")
+    parser.add_argument("--box", action="store_true", help="collide as a plain box, not the sprite masks")
+    args = parser.parse_args()
+    if args.box:
+        masks = simulation.box_masks()
+    else:
+        masks = simulation.sheet_masks(os.path.join(ROOT, simulation.rocketsheet))
+    reports = []
+    for path in args.missions:
+        report = analyze(load_mission(path), masks, args.n, args.seed)
+        print_report(report)
+        reports.append(report)
+    if args.json:
+        with open(args.json, "w") as fpw:
+            json.dump(reports, fpw, indent=1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Moon Miner hot path benchmarks
+Runs code.py on desktop CPython with the stand-in modules from
+standins.py and times the Game methods that run every frame or on every
+mission load or restart, for every mission in missions/ (or the ones
+named).
+
+    python3.12 tools/bench/bench.py
+    python3.12 tools/bench/bench.py 001 012 -n 2000 --json bench.json
+
+code.py uses Python 3.12 f-strings, so run it with 3.12 or newer. Each
+mission is flown twice by a hovering autopilot: once for timings, and
+once under tracemalloc for allocations, so tracing does not skew the
+timings. Allocations are the peak bytes allocated during a call (freed
+or not) and the net change in allocated blocks. Game prints go to
+/dev/null while measuring, and the game's time.sleep calls are skipped
+so crash animations run at full speed. Before timing, 4 bit images are
+checked to decode to the same pixels through every loader.
+"""
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+import standins
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+def load_game_module():
+    # import code.py under another name so its main() does not run
+    standins.install()
+    os.chdir(REPO) # the game opens assets/ and missions/ relative paths
+    sys.path.insert(0, REPO)
+    spec = importlib.util.spec_from_file_location("moonminer", os.path.join(REPO, "code.py"))
+    code = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(code)
+    code.time = types.SimpleNamespace(monotonic=time.monotonic, sleep=lambda seconds: None)
+    return code
+
+def check_images(code):
+    # 4 bit BMPs read into bitmaps by the page cache and the asset pack,
+    # round tripped against the stand-in adafruit_imageload, so a pixel
+    # order mistake in a bitmaptools.readinto call shows up on desktop
+    path = "missions/002/copernicus_00.bmp"
+    expected = standins.imageload(path)[0]
+    with open(path, "rb") as fpr:
+        slot = code.pagecache.PageCache().read_bmp(fpr, path)
+    if slot.bitmap.data != expected.data:
+        raise SystemExit(f"page cache: {path} pixels differ from the BMP")
+    sys.path.insert(0, os.path.join(REPO, "tools"))
+    import pack_assets
+    with tempfile.TemporaryDirectory() as directory:
+        packpath = os.path.join(directory, "check.pak")
+        pack_assets.pack(REPO, packpath)
+        pack = code.assetpack.Pack(packpath)
+        for name in ("assets/gemsheet.bmp", "assets/help_screen.bmp", "assets/landersheet.bmp"):
+            expected = standins.imageload(name)[0]
+            if pack.load_image(name)[0].data != expected.data:
+                raise SystemExit(f"asset pack: {name} pixels differ from the BMP")
+        pack.file.close()
+
+class Probe:
+    # samples per method name, timed or traced depending on the pass
+
+    def __init__(self):
+        self.tracing = False
+        self.times = {}
+        self.peak_bytes = {}
+        self.net_blocks = {}
+
+    def call(self, name, method, *args):
+        if self.tracing:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            blocks = sys.getallocatedblocks()
+            result = method(*args)
+            peak = tracemalloc.get_traced_memory()[1]
+            self.peak_bytes.setdefault(name, []).append(peak - before)
+            self.net_blocks.setdefault(name, []).append(sys.getallocatedblocks() - blocks)
+        else:
+            start = time.perf_counter_ns()
+            result = method(*args)
+            self.times.setdefault(name, []).append(time.perf_counter_ns() - start)
+        return result
+
+    def report(self):
+        methods = {}
+        for name, samples in self.times.items():
+            samples = sorted(samples)
+            peaks = self.peak_bytes.get(name, [0])
+            blocks = self.net_blocks.get(name, [0])
+            methods[name] = {
+                "calls": len(samples),
+                "mean_us": sum(samples)/len(samples)/1000,
+                "p99_us": samples[int(.99*(len(samples) - 1))]/1000,
+                "max_us": samples[-1]/1000,
+                "alloc_peak_bytes": sum(peaks)/len(peaks),
+                "alloc_peak_bytes_max": max(peaks),
+                "alloc_net_blocks": sum(blocks)/len(blocks),
+            }
+        return methods
+
+def fly(code, mission, frames, probe):
+    # one pass over a mission: loads, a hovering flight, page switches
+    game = code.Game()
+    if not game.init_display():
+        raise RuntimeError("init_display failed with the stand-in modules")
+    game.init_soundfx()
+    game.currentmission = mission
+    probe.call("load_mission", game.load_mission, mission, False)
+    for i in range(5):
+        probe.call("load_mission_repeat", game.load_mission, mission, True)
+    for i in range(5):
+        game.missions = []
+        probe.call("load_mission_list", game.load_mission_list)
+    game.new_game(True)
+    sim = game.sim
+    # timers play_game sets before its loop
+    game.gtimer = time.monotonic()
+    game.btimer = 0
+    game.fcount = 0
+    for frame in range(frames):
+        # short burns to hover while the start velocity carries it across
+        sim.thruster = sim.yvelocity > 2 and sim.fuel > 0
+        game.dtime = time.monotonic() - code.FRAME_RATE # one physics step
+        probe.call("tick", game.tick)
+        probe.call("update_panel", game.update_panel, True)
+        if probe.call("collision_detected", game.collision_detected):
+            game.new_game(True)
+        elif probe.call("ground_detected", game.ground_detected):
+            game.new_game(True)
+        elif sim.out_of_bounds():
+            game.new_game(True)
+        else:
+            game.switch_page()
+    pages = len(sim.pages)
+    for i in range(20):
+        probe.call("set_page", game.set_page, i % pages, True)
+    # back to the mission menu and into the mission again, on the warm
+    # restart path that keeps the scene graph
+    probe.call("restart", game.restart)
+    probe.call("load_mission_warm", game.load_mission, mission, False)
+    game.new_game(True)
+
+def bench_mission(code, mission, frames):
+    probe = Probe()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        fly(code, mission, frames, probe)
+        probe.tracing = True
+        tracemalloc.start()
+        try:
+            fly(code, mission, frames, probe)
+        finally:
+            tracemalloc.stop()
+    return probe.report()
+
+def print_report(mission, methods):
+    print(f"mission {mission}")
+    print(f"  {'method':<20} {'calls':>6} {'mean us':>9} {'p99 us':>9} {'max us':>10} {'alloc B':>9} {'blocks':>7}")
+    for name, m in methods.items():
+        print(f"  {name:<20} {m['calls']:6d} {m['mean_us']:9.1f} {m['p99_us']:9.1f} {m['max_us']:10.1f}"
+            f" {m['alloc_peak_bytes']:9.0f} {m['alloc_net_blocks']:7.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("missions", nargs="*", help="mission directory names, default all")
+    parser.add_argument("-n", type=int, default=1000, help="frames flown per mission")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+    code = load_game_module()
+    check_images(code)
+    missions = args.missions or sorted(os.listdir(os.path.join(REPO, "missions")))
+    results = {
+        "python": sys.version.split()[0],
+        "fixed_point": code.simulation.FIXED_POINT,
+        "frames": args.n,
+        "missions": {},
+    }
+    for mission in missions:
+        methods = bench_mission(code, mission, args.n)
+        print_report(mission, methods)
+        results["missions"][mission] = methods
+    if args.json:
+        with open(args.json, "w") as fpw:
+            json.dump(results, fpw, indent=1)
+
+if __name__ == "__main__":
+    main()
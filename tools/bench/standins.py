@@ -0,0 +1,523 @@
+"""
+Stand-in CircuitPython modules for running code.py on desktop CPython
+install() puts displayio, bitmaptools, usb, audiomixer and the other
+hardware and Adafruit library modules code.py imports into sys.modules.
+They keep real state (bitmaps hold their pixels, BMPs are decoded,
+labels build a new bitmap when their text changes) so timings and
+allocations stay close to what the game does on the device, but nothing
+is drawn and no USB devices are found.
+"""
+import struct
+import sys
+import time
+import types
+from array import array
+
+# displayio
+
+class Bitmap:
+
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self.value_count = value_count
+        if value_count <= 256:
+            self.data = bytearray(width*height)
+        else:
+            self.data = array('H', bytes(2*width*height))
+
+    def _index(self, index):
+        if isinstance(index, tuple):
+            x, y = index
+            if not (0 <= x < self.width and 0 <= y < self.height):
+                raise IndexError("pixel out of bounds")
+            return y*self.width + x
+        return index
+
+    def __getitem__(self, index):
+        return self.data[self._index(index)]
+
+    def __setitem__(self, index, value):
+        self.data[self._index(index)] = value
+
+    def fill(self, value):
+        for i in range(len(self.data)):
+            self.data[i] = value
+
+class Palette:
+
+    def __init__(self, color_count, *, dither=False):
+        self.colors = [0]*color_count
+        self.transparent = set()
+
+    def __len__(self):
+        return len(self.colors)
+
+    def __getitem__(self, index):
+        return self.colors[index]
+
+    def __setitem__(self, index, color):
+        self.colors[index] = color
+
+    def make_transparent(self, index):
+        self.transparent.add(index)
+
+    def make_opaque(self, index):
+        self.transparent.discard(index)
+
+    def is_transparent(self, index):
+        return index in self.transparent
+
+class ColorConverter:
+
+    def __init__(self, *, input_colorspace=None, dither=False):
+        self.transparent_color = None
+
+    def make_transparent(self, color):
+        self.transparent_color = color
+
+    def make_opaque(self, color):
+        self.transparent_color = None
+
+class _Layer:
+    # shared by TileGrid and Group, a layer may only be in one group
+
+    def __init__(self, x=0, y=0):
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self.parent = None
+
+class TileGrid(_Layer):
+
+    def __init__(self, bitmap, *, pixel_shader, width=1, height=1,
+            tile_width=None, tile_height=None, default_tile=0, x=0, y=0):
+        super().__init__(x, y)
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width or bitmap.width
+        self.tile_height = tile_height or bitmap.height
+        self.tile_count = (bitmap.width//self.tile_width)*(bitmap.height//self.tile_height)
+        self.tiles = bytearray([default_tile])*(width*height)
+        self.flip_x = False
+        self.flip_y = False
+        self.transpose_xy = False
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            index = index[1]*self.width + index[0]
+        return self.tiles[index]
+
+    def __setitem__(self, index, tile):
+        if isinstance(index, tuple):
+            index = index[1]*self.width + index[0]
+        if not 0 <= tile < self.tile_count:
+            raise ValueError("Tile index out of bounds")
+        self.tiles[index] = tile
+
+class Group(_Layer):
+
+    def __init__(self, *, scale=1, x=0, y=0):
+        super().__init__(x, y)
+        self.scale = scale
+        self.layers = []
+
+    def _adopt(self, layer):
+        if layer.parent is not None:
+            raise ValueError("Layer already in a group")
+        layer.parent = self
+
+    def append(self, layer):
+        self._adopt(layer)
+        self.layers.append(layer)
+
+    def insert(self, index, layer):
+        self._adopt(layer)
+        self.layers.insert(index, layer)
+
+    def remove(self, layer):
+        self.layers.remove(layer)
+        layer.parent = None
+
+    def pop(self, index=-1):
+        layer = self.layers.pop(index)
+        layer.parent = None
+        return layer
+
+    def index(self, layer):
+        return self.layers.index(layer)
+
+    def __len__(self):
+        return len(self.layers)
+
+    def __getitem__(self, index):
+        return self.layers[index]
+
+    def __contains__(self, layer):
+        return layer in self.layers
+
+def release_displays():
+    pass
+
+# framebufferio, picodvi, board
+
+class Framebuffer:
+
+    def __init__(self, width, height, **pins):
+        self.width = width
+        self.height = height
+
+class FramebufferDisplay:
+
+    def __init__(self, framebuffer, *, auto_refresh=True):
+        self.width = framebuffer.width
+        self.height = framebuffer.height
+        self.auto_refresh = auto_refresh
+        self.root_group = None
+        self.refreshes = 0
+
+    def refresh(self, *, target_frames_per_second=None, minimum_frames_per_second=0):
+        self.refreshes += 1
+        return True
+
+# bitmaptools
+
+def fill_region(dest_bitmap, x1, y1, x2, y2, value):
+    row = bytes([value])*(x2 - x1) if dest_bitmap.value_count <= 256 else array('H', [value]*(x2 - x1))
+    for y in range(y1, y2):
+        start = y*dest_bitmap.width + x1
+        dest_bitmap.data[start:start + x2 - x1] = row
+
+def blit(dest_bitmap, source_bitmap, x, y, *, x1=0, y1=0, x2=None, y2=None,
+        skip_source_index=None, skip_dest_index=None):
+    x2 = source_bitmap.width if x2 is None else x2
+    y2 = source_bitmap.height if y2 is None else y2
+    if skip_source_index is None and skip_dest_index is None:
+        # plain copy a row at a time, clipped to the destination
+        left = max(x1, x1 - x)
+        right = min(x2, x1 - x + dest_bitmap.width)
+        if left >= right:
+            return
+        for sy in range(max(y1, y1 - y), min(y2, y1 - y + dest_bitmap.height)):
+            start = (y + sy - y1)*dest_bitmap.width + x + left - x1
+            row = sy*source_bitmap.width
+            dest_bitmap.data[start:start + right - left] = source_bitmap.data[row + left:row + right]
+        return
+    for sy in range(y1, y2):
+        dy = y + sy - y1
+        if not 0 <= dy < dest_bitmap.height:
+            continue
+        for sx in range(x1, x2):
+            dx = x + sx - x1
+            if not 0 <= dx < dest_bitmap.width:
+                continue
+            value = source_bitmap.data[sy*source_bitmap.width + sx]
+            if value == skip_source_index:
+                continue
+            if skip_dest_index is not None and dest_bitmap.data[dy*dest_bitmap.width + dx] == skip_dest_index:
+                continue
+            dest_bitmap.data[dy*dest_bitmap.width + dx] = value
+
+def arrayblit(bitmap, data, x1=0, y1=0, x2=None, y2=None, skip_index=None):
+    x2 = bitmap.width if x2 is None else x2
+    y2 = bitmap.height if y2 is None else y2
+    width = x2 - x1
+    i = 0
+    for y in range(y1, y2):
+        start = y*bitmap.width + x1
+        if skip_index is None:
+            bitmap.data[start:start + width] = bytes(data[i:i + width])
+        else:
+            for x in range(width):
+                if data[i + x] != skip_index:
+                    bitmap.data[start + x] = data[i + x]
+        i += width
+
+def readinto(bitmap, file, bits_per_pixel, element_size=1, reverse_pixels_in_element=False,
+        swap_bytes_in_element=False, reverse_rows=False):
+    # 8 bit and packed 4 and 1 bit rows of byte elements, what the game's
+    # asset formats use. As on the device, the first pixel of a byte is
+    # in its low bits unless reverse_pixels_in_element is set.
+    if element_size != 1:
+        raise NotImplementedError(f"{element_size} byte elements")
+    stride = (bitmap.width*bits_per_pixel + 8*element_size - 1)//(8*element_size)*element_size
+    for row in range(bitmap.height):
+        y = bitmap.height - 1 - row if reverse_rows else row
+        line = file.read(stride)
+        _unpack_row(bitmap, y, line, bits_per_pixel, reverse_pixels_in_element)
+
+def _unpack_row(bitmap, y, line, bits_per_pixel, high_first):
+    # high_first: the first pixel of a byte is in its high bits, BMP order
+    start = y*bitmap.width
+    width = bitmap.width
+    if bits_per_pixel == 8:
+        bitmap.data[start:start + width] = line[:width]
+    elif bits_per_pixel == 4:
+        pixels = bytearray(2*len(line))
+        pixels[0::2] = line.translate(_HIGH_NIBBLE if high_first else _LOW_NIBBLE)
+        pixels[1::2] = line.translate(_LOW_NIBBLE if high_first else _HIGH_NIBBLE)
+        bitmap.data[start:start + width] = pixels[:width]
+    elif bits_per_pixel == 1:
+        for x in range(width):
+            shift = 7 - (x & 7) if high_first else x & 7
+            bitmap.data[start + x] = (line[x >> 3] >> shift) & 1
+    else:
+        raise NotImplementedError(f"{bits_per_pixel} bits per pixel")
+
+_HIGH_NIBBLE = bytes(b >> 4 for b in range(256))
+_LOW_NIBBLE = bytes(b & 15 for b in range(256))
+
+# adafruit_imageload, BMP only
+
+def imageload(file_or_filename, *, bitmap=None, palette=None):
+    bitmap = bitmap or Bitmap
+    palette = palette or Palette
+    if isinstance(file_or_filename, str):
+        with open(file_or_filename, "rb") as fpr:
+            data = fpr.read()
+    else:
+        file_or_filename.seek(0)
+        data = file_or_filename.read()
+    if data[:2] != b"BM":
+        raise NotImplementedError("stand-in imageload only reads BMP files")
+    offset, = struct.unpack_from("<I", data, 10)
+    header_size, width, height, planes, bits, compression = struct.unpack_from("<IiiHHI", data, 14)
+    colors, = struct.unpack_from("<I", data, 46)
+    bottom_up = height > 0
+    height = abs(height)
+    stride = (width*bits + 31)//32*4
+    if bits == 24:
+        bmp = bitmap(width, height, 65535)
+        shader = ColorConverter()
+        for row in range(height):
+            y = height - 1 - row if bottom_up else row
+            line = data[offset + row*stride:offset + row*stride + 3*width]
+            for x in range(width):
+                b, g, r = line[3*x], line[3*x + 1], line[3*x + 2]
+                bmp.data[y*width + x] = (r & 0xF8) << 8 | (g & 0xFC) << 3 | b >> 3
+        return bmp, shader
+    colors = colors or 1 << bits
+    shader = palette(colors)
+    table = 14 + header_size
+    for i in range(colors):
+        b, g, r = data[table + 4*i:table + 4*i + 3]
+        shader[i] = r << 16 | g << 8 | b
+    bmp = bitmap(width, height, colors)
+    for row in range(height):
+        y = height - 1 - row if bottom_up else row
+        _unpack_row(bmp, y, data[offset + row*stride:offset + (row + 1)*stride], bits, True)
+    return bmp, shader
+
+# fonts and labels
+
+class Font:
+    # fonts/ter16b.pcf is Terminus 16 bold, 8x16 cells
+
+    def __init__(self, path):
+        with open(path, "rb") as fpr:
+            self.data = fpr.read()
+
+    def get_bounding_box(self):
+        return (8, 16, 0, -4)
+
+    def load_glyphs(self, code_points):
+        pass
+
+    def get_glyph(self, code):
+        # every glyph is a solid 6x10 block on the baseline, like an
+        # adafruit_bitmap_font Glyph with its own bitmap
+        bitmap = Bitmap(6, 10, 2)
+        bitmap.fill(1)
+        return Glyph(bitmap, 0, 6, 10, 1, 0, 8, 0)
+
+class Glyph:
+
+    def __init__(self, bitmap, tile_index, width, height, dx, dy, shift_x, shift_y):
+        self.bitmap = bitmap
+        self.tile_index = tile_index
+        self.width = width
+        self.height = height
+        self.dx = dx
+        self.dy = dy
+        self.shift_x = shift_x
+        self.shift_y = shift_y
+
+def load_font(path):
+    return Font(path)
+
+def PCF(file, bitmap):
+    # adafruit_bitmap_font.pcf.PCF, a font from an open file
+    font = Font.__new__(Font)
+    font.data = file.read()
+    return font
+
+class Label(Group):
+    # like bitmap_label, a text change renders into a new bitmap
+
+    def __init__(self, font, *, text="", color=0xFFFFFF, background_color=None,
+            outline_color=None, scale=1, x=0, y=0, **kwargs):
+        super().__init__(scale=scale, x=x, y=y)
+        self.font = font
+        self.color = color
+        self.background_color = background_color
+        self.outline_color = outline_color
+        self.bitmap = None
+        self._text = None
+        self.text = text
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, text):
+        if text == self._text:
+            return
+        self._text = text
+        w, h = self.font.get_bounding_box()[:2]
+        if text:
+            self.bitmap = Bitmap(w*len(text), h, 2)
+        else:
+            self.bitmap = None
+
+def wrap_text_to_lines(string, max_chars):
+    lines = []
+    line = ""
+    for word in string.split(" "):
+        while len(word) > max_chars:
+            if line:
+                lines.append(line)
+                line = ""
+            lines.append(word[:max_chars - 1] + "-")
+            word = word[max_chars - 1:]
+        if not line:
+            line = word
+        elif len(line) + 1 + len(word) <= max_chars:
+            line += " " + word
+        else:
+            lines.append(line)
+            line = word
+    if line:
+        lines.append(line)
+    return lines
+
+class Shape(_Layer):
+    # Rect, Triangle and FilledPolygon
+
+    def __init__(self, x=0, y=0, *args, **kwargs):
+        if not isinstance(x, int): # FilledPolygon takes a point list
+            x = y = 0
+        super().__init__(x, y)
+
+# audio
+
+class MixerVoice:
+
+    def __init__(self):
+        self.level = 1.0
+        self.sample = None
+        self.loop = False
+
+    def play(self, sample, *, loop=False):
+        self.sample = sample
+        self.loop = loop
+
+    def stop(self):
+        self.sample = None
+
+    @property
+    def playing(self):
+        return self.sample is not None
+
+class Mixer:
+
+    def __init__(self, *, voice_count=2, buffer_size=1024, channel_count=2,
+            bits_per_sample=16, samples_signed=True, sample_rate=8000):
+        self.sample_rate = sample_rate
+        self.voice = tuple(MixerVoice() for _ in range(voice_count))
+
+    @property
+    def playing(self):
+        return any(v.playing for v in self.voice)
+
+class WaveFile:
+
+    def __init__(self, file, buffer=None):
+        header = file.read(44)
+        self.channel_count, self.sample_rate = struct.unpack_from("<HI", header, 22)
+        self.bits_per_sample, = struct.unpack_from("<H", header, 34)
+
+class _AudioOut:
+
+    def __init__(self):
+        self.sample = None
+
+    def play(self, sample, *, loop=False):
+        self.sample = sample
+
+    def stop(self):
+        self.sample = None
+
+class Peripherals:
+
+    def __init__(self, *args, **kwargs):
+        self.audio = _AudioOut()
+        self.dac = types.SimpleNamespace()
+
+# usb
+
+class USBError(OSError):
+    pass
+
+class USBTimeoutError(USBError):
+    pass
+
+def find(find_all=False, **kwargs):
+    # no devices attached
+    return iter(()) if find_all else None
+
+def find_boot_keyboard_endpoint(device):
+    return None, None
+
+# supervisor
+
+def ticks_ms():
+    return time.monotonic_ns()//1000000 & ((1 << 29) - 1)
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+def install():
+    # register the stand-ins, call before importing code.py
+    _module("displayio", Bitmap=Bitmap, Palette=Palette, ColorConverter=ColorConverter,
+        TileGrid=TileGrid, Group=Group, release_displays=release_displays)
+    _module("bitmaptools", fill_region=fill_region, blit=blit, arrayblit=arrayblit,
+        readinto=readinto)
+    _module("framebufferio", FramebufferDisplay=FramebufferDisplay)
+    _module("picodvi", Framebuffer=Framebuffer)
+    board = _module("board")
+    board.__getattr__ = lambda name: name # pin names
+    _module("supervisor", runtime=types.SimpleNamespace(autoreload=False), ticks_ms=ticks_ms)
+    _module("storage", remount=lambda *args, **kwargs: None)
+    _module("terminalio", FONT=Font.__new__(Font))
+    _module("audiomixer", Mixer=Mixer)
+    _module("audiocore", WaveFile=WaveFile)
+    usb_core = _module("usb.core", find=find, USBError=USBError, USBTimeoutError=USBTimeoutError)
+    _module("usb", core=usb_core)
+    _module("adafruit_usb_host_descriptors", find_boot_keyboard_endpoint=find_boot_keyboard_endpoint)
+    _module("adafruit_imageload", load=imageload)
+    peripherals = _module("adafruit_fruitjam.peripherals", Peripherals=Peripherals)
+    _module("adafruit_fruitjam", peripherals=peripherals)
+    bitmap_font = _module("adafruit_bitmap_font.bitmap_font", load_font=load_font)
+    pcf = _module("adafruit_bitmap_font.pcf", PCF=PCF)
+    _module("adafruit_bitmap_font", bitmap_font=bitmap_font, pcf=pcf)
+    bitmap_label = _module("adafruit_display_text.bitmap_label", Label=Label)
+    _module("adafruit_display_text", bitmap_label=bitmap_label, wrap_text_to_lines=wrap_text_to_lines)
+    shapes = {name: _module(f"adafruit_display_shapes.{name}", **{cls: Shape})
+        for name, cls in (("rect", "Rect"), ("triangle", "Triangle"), ("filled_polygon", "FilledPolygon"))}
+    _module("adafruit_display_shapes", **shapes)
@@ -0,0 +1,230 @@
+"""
+Moon Miner page converter
+Host-side tool. Converts the terrain and background BMPs of missions to
+.mmp pages (see pagecodec.py) next to them, and points the mission's
+data.json at the new files. The rest of data.json is left as written.
+With --tiles the terrain pages become tiled .mmt pages instead, all of a
+mission's with the tile capacity of its busiest page. A page with more
+distinct tiles than a byte can index stays an .mmp page.
+
+    python tools/convert_pages.py missions/002
+    python tools/convert_pages.py missions/* --check
+    python tools/convert_pages.py missions/* --tiles
+
+Uncompressed 1, 4 and 8 bit BMPs only, like the game's own assets.
+"""
+import argparse
+import os
+import re
+import struct
+
+# the .mmp and .mmt formats of pagecodec.py, which needs displayio to import
+EXTENSION = ".mmp"
+MMP_MAGIC = b"MMPG"
+MMP_VERSION = 1
+MMP_HEADER = "<4sBBHHH"
+TILE_EXTENSION = ".mmt"
+MMT_MAGIC = b"MMTL"
+MMT_VERSION = 1
+MMT_HEADER = "<4sBBHHBBHHH"
+MIN_RUN = 3 # shorter runs cost less as literal pixels
+TILE_SIZE = 16 # pixels, tiled pages are cut into TILE_SIZE squares
+MAX_TILES = 256 # tile indexes are a byte
+
+def read_bmp(path):
+    # width, height, bits per pixel, palette as (r, g, b) and the pixel
+    # indexes top row first
+    with open(path, "rb") as fpr:
+        data = fpr.read()
+    if data[0:2] != b"BM":
+        raise ValueError(f"{path}: not a BMP")
+    offset = struct.unpack_from("<I", data, 10)[0]
+    size, width, height, planes, bpp, compression = struct.unpack_from("<IiiHHI", data, 14)
+    colors = struct.unpack_from("<I", data, 46)[0] or 1 << bpp
+    if bpp not in (1, 4, 8) or compression != 0:
+        raise ValueError(f"{path}: {bpp} bit or compressed BMP")
+    palette = []
+    for i in range(colors):
+        b, g, r = data[14 + size + 4*i:14 + size + 4*i + 3]
+        palette.append((r, g, b))
+    rowsize = (width*bpp + 31)//32*4
+    per_byte = 8//bpp
+    mask = (1 << bpp) - 1
+    pixels = bytearray()
+    for y in range(abs(height)):
+        # rows are stored bottom up unless the height is negative
+        start = offset + (y if height < 0 else abs(height) - 1 - y)*rowsize
+        row = data[start:start + rowsize]
+        pixels.extend(row[x//per_byte] >> (8 - bpp*(x%per_byte + 1)) & mask for x in range(width))
+    return width, abs(height), bpp, palette, pixels
+
+def varint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return out
+
+def encode(width, height, bpp, palette, pixels):
+    # the .mmp file for a page
+    out = bytearray(struct.pack(MMP_HEADER, MMP_MAGIC, MMP_VERSION, bpp, width, height, len(palette)))
+    for r, g, b in palette:
+        out.extend((r, g, b))
+    out.extend(packets(pixels, width))
+    return out
+
+def cut_tiles(width, height, pixels, size=TILE_SIZE):
+    # the distinct tiles of a page, top row first, and the tile map
+    tiles = {}
+    tilemap = bytearray()
+    for ty in range(height//size):
+        for tx in range(width//size):
+            tile = b"".join(pixels[(ty*size + y)*width + tx*size:(ty*size + y)*width + (tx + 1)*size]
+                for y in range(size))
+            if tile not in tiles:
+                tiles[tile] = len(tiles)
+            tilemap.append(tiles[tile] & 0xFF)
+    return list(tiles), tilemap
+
+def encode_tiles(width, height, bpp, palette, tiles, tilemap, capacity, size=TILE_SIZE):
+    # the .mmt file for a page cut by cut_tiles
+    out = bytearray(struct.pack(MMT_HEADER, MMT_MAGIC, MMT_VERSION, bpp, width, height,
+        size, size, capacity, len(tiles), len(palette)))
+    for r, g, b in palette:
+        out.extend((r, g, b))
+    out.extend(tilemap)
+    out.extend(packets(b"".join(tiles), size))
+    return out
+
+def packets(pixels, width):
+    # run and literal packets of pixels in rows of width
+    out = bytearray()
+    literal = bytearray()
+    def flush():
+        if literal:
+            out.extend(varint(len(literal) << 1))
+            out.extend(literal)
+            literal.clear()
+    i = 0
+    total = len(pixels)
+    while i < total:
+        n = 1
+        while i + n < total and pixels[i + n] == pixels[i]:
+            n += 1
+        if n >= MIN_RUN:
+            flush()
+            out.extend(varint(n << 1 | 1))
+            out.append(pixels[i])
+            i += n
+            continue
+        for k in range(n):
+            literal.append(pixels[i + k])
+            if (i + k + 1)%width == 0:
+                flush() # literals end with their row
+        i += n
+    flush()
+    return out
+
+def decode(data):
+    # the pixels of an .mmp or .mmt page, to check the encoder against
+    if data[0:4] == MMT_MAGIC:
+        width, height, size, _, capacity, count, colors = struct.unpack_from(MMT_HEADER, data)[3:]
+        pos = struct.calcsize(MMT_HEADER) + 3*colors
+        tilemap = data[pos:pos + (width//size)*(height//size)]
+        strip = decode_packets(data, pos + len(tilemap), size*size*count)
+        pixels = bytearray(width*height)
+        for i, t in enumerate(tilemap):
+            x = i%(width//size)*size
+            y = i//(width//size)*size
+            for row in range(size):
+                pixels[(y + row)*width + x:(y + row)*width + x + size] = strip[(t*size + row)*size:(t*size + row + 1)*size]
+        return pixels
+    width, height = struct.unpack_from(MMP_HEADER, data)[3:5]
+    colors = struct.unpack_from(MMP_HEADER, data)[5]
+    return decode_packets(data, struct.calcsize(MMP_HEADER) + 3*colors, width*height)
+
+def decode_packets(data, pos, total):
+    pixels = bytearray()
+    while len(pixels) < total:
+        v = shift = 0
+        while True:
+            c = data[pos]
+            pos += 1
+            v |= (c & 0x7F) << shift
+            shift += 7
+            if c < 0x80:
+                break
+        if v & 1:
+            pixels.extend(bytes([data[pos]])*(v >> 1))
+            pos += 1
+        else:
+            pixels.extend(data[pos:pos + (v >> 1)])
+            pos += v >> 1
+    return pixels
+
+def convert(bmp, check=False, capacity=0):
+    # write the .mmp page of a BMP, or its .mmt page with a tile capacity,
+    # returns its path and both sizes
+    width, height, bpp, palette, pixels = read_bmp(bmp)
+    if capacity:
+        tiles, tilemap = cut_tiles(width, height, pixels)
+        data = encode_tiles(width, height, bpp, palette, tiles, tilemap, capacity)
+        page = os.path.splitext(bmp)[0] + TILE_EXTENSION
+    else:
+        data = encode(width, height, bpp, palette, pixels)
+        page = os.path.splitext(bmp)[0] + EXTENSION
+    if check and decode(data) != pixels:
+        raise ValueError(f"{bmp}: page does not decode to the BMP's pixels")
+    with open(page, "wb") as fpw:
+        fpw.write(data)
+    return page, os.path.getsize(bmp), len(data)
+
+def tile_capacity(directory, names):
+    # tiles of the mission's busiest terrain page, 0 if one has too many
+    capacity = 0
+    for name in names:
+        width, height, bpp, palette, pixels = read_bmp(os.path.join(directory, name))
+        if width%TILE_SIZE or height%TILE_SIZE:
+            return 0
+        capacity = max(capacity, len(cut_tiles(width, height, pixels)[0]))
+    return capacity if capacity <= MAX_TILES else 0
+
+def convert_mission(directory, check=False, tiles=False):
+    path = os.path.join(directory, "data.json")
+    with open(path) as fpr:
+        text = fpr.read()
+    names = re.findall(r'"(?:background|image)"\s*:\s*"([^"]+\.bmp)"', text)
+    images = re.findall(r'"image"\s*:\s*"([^"]+\.bmp)"', text)
+    capacity = tile_capacity(directory, images) if tiles else 0
+    if tiles and not capacity:
+        print(f"{directory}: too many distinct tiles, pages stay {EXTENSION}")
+    before = after = 0
+    for name in dict.fromkeys(names):
+        mmp, bmp_size, mmp_size = convert(os.path.join(directory, name), check,
+            capacity if name in images else 0)
+        before += bmp_size
+        after += mmp_size
+        text = re.sub(r'("(?:background|image)"\s*:\s*")' + re.escape(name) + '"',
+            lambda m: m.group(1) + os.path.basename(mmp) + '"', text)
+        print(f"{directory}/{name}: {bmp_size} -> {mmp_size} bytes")
+    with open(path, "w") as fpw:
+        fpw.write(text)
+    return before, after
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert mission BMP pages to .mmp pages.")
+    parser.add_argument("missions", nargs="+", help="mission directories")
+    parser.add_argument("--check", action="store_true", help="decode each page to check it")
+    parser.add_argument("--tiles", action="store_true", help="tiled terrain pages")
+    args = parser.parse_args()
+    before = after = 0
+    for directory in args.missions:
+        b, a = convert_mission(directory, args.check, args.tiles)
+        before += b
+        after += a
+    if before:
+        print(f"total: {before} -> {after} bytes, {before/max(after, 1):.1f}x smaller")
+
+if __name__ == "__main__":
+    main()
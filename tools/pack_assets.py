@@ -0,0 +1,102 @@
+"""
+Moon Miner asset packer
+Host-side build step. Packs assets/ and fonts/ into moonminer.pak (see
+assetpack.py), which the game loads its images and font from at start
+up. Run it from the repo directory after changing an asset and copy the
+pack to the board with the game:
+
+    python tools/pack_assets.py
+    python tools/pack_assets.py --list
+
+WAVs are left out: audiocore.WaveFile plays from a file of its own. So
+are the thrust sheets, the game draws them from the lander atlas. The
+rocket sheet is kept as a BMP file, the game only reads collision masks
+from it.
+"""
+import argparse
+import os
+import struct
+
+# the pack format of assetpack.py, which needs displayio to import
+packfile = "moonminer.pak"
+PACK_MAGIC = b"MMPK"
+PACK_VERSION = 1
+PACK_HEADER = "<4sBH"
+PACK_ENTRY = "<32sIIBHHBH"
+FORMAT_FILE = 0
+FORMAT_ROWS = 1
+
+PACK_DIRECTORIES = ("assets", "fonts")
+SKIP_EXTENSIONS = (".wav",)
+# sheets tools/pack_sprites.py merges into assets/landersheet.bmp
+SKIP_NAMES = ("assets/thrust1sheet.bmp", "assets/thrust2sheet.bmp", "assets/thrust3sheet.bmp")
+# BMPs read as files, not drawn: simulation.sheet_masks parses the rocket sheet
+FILE_NAMES = ("assets/rocketsheet.bmp",)
+
+def bmp_rows(data):
+    # width, height, bits per pixel, RGB palette and top down rows of an
+    # uncompressed 1, 4 or 8 bit BMP, None for any other file
+    if data[0:2] != b"BM":
+        return None
+    offset = struct.unpack_from("<I", data, 10)[0]
+    size, width, height, planes, bpp, compression = struct.unpack_from("<IiiHHI", data, 14)
+    if bpp not in (1, 4, 8) or compression != 0:
+        return None
+    colors = struct.unpack_from("<I", data, 46)[0] or 1 << bpp
+    palette = bytearray()
+    for i in range(colors):
+        b, g, r = data[14 + size + 4*i:14 + size + 4*i + 3]
+        palette.extend((r, g, b))
+    stride = (width*bpp + 31)//32*4
+    packed = (width*bpp + 7)//8 # what bitmaptools.readinto reads a row
+    rows = bytearray()
+    for y in range(abs(height)):
+        # rows are stored bottom up unless the height is negative
+        start = offset + (y if height < 0 else abs(height) - 1 - y)*stride
+        rows.extend(data[start:start + packed])
+    return width, abs(height), bpp, colors, palette + rows
+
+def pack(root, path):
+    # write the pack, returns its entries as (name, size, format)
+    names = []
+    for directory in PACK_DIRECTORIES:
+        for name in sorted(os.listdir(os.path.join(root, directory))):
+            if not name.lower().endswith(SKIP_EXTENSIONS) and f"{directory}/{name}" not in SKIP_NAMES:
+                names.append(f"{directory}/{name}")
+    offset = struct.calcsize(PACK_HEADER) + len(names)*struct.calcsize(PACK_ENTRY)
+    index = bytearray(struct.pack(PACK_HEADER, PACK_MAGIC, PACK_VERSION, len(names)))
+    body = bytearray()
+    listing = []
+    for name in names:
+        if len(name.encode()) > 32:
+            raise ValueError(f"{name}: names are 32 bytes at most")
+        with open(os.path.join(root, name), "rb") as fpr:
+            data = fpr.read()
+        rows = bmp_rows(data) if name.lower().endswith(".bmp") and name not in FILE_NAMES else None
+        if rows:
+            width, height, bpp, colors, data = rows
+            entry = (FORMAT_ROWS, width, height, bpp, colors)
+        else:
+            entry = (FORMAT_FILE, 0, 0, 0, 0)
+        index.extend(struct.pack(PACK_ENTRY, name.encode(), offset + len(body), len(data), *entry))
+        body.extend(data)
+        listing.append((name, len(data), entry[0]))
+    with open(path, "wb") as fpw:
+        fpw.write(index)
+        fpw.write(body)
+    return listing
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack assets/ and fonts/ into one file.")
+    parser.add_argument("--root", default=".", help="repo directory")
+    parser.add_argument("--output", default=packfile, help="pack file")
+    parser.add_argument("--list", action="store_true", help="list the packed assets")
+    args = parser.parse_args()
+    listing = pack(args.root, args.output)
+    if args.list:
+        for name, size, form in listing:
+            print(f"{name:32} {size:8} {'rows' if form == FORMAT_ROWS else 'file'}")
+    print(f"{args.output}: {len(listing)} assets, {os.path.getsize(args.output)} bytes")
+
+if __name__ == "__main__":
+    main()
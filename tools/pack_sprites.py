@@ -0,0 +1,178 @@
+"""
+Moon Miner sprite atlas packer
+Host-side build step. Merges the lander and thrust sheets into one
+sprite atlas with one palette, assets/landersheet.bmp, that the game
+draws the lander and its exhaust from with a single TileGrid. Each frame
+is a rotation of the lander composed with one exhaust, trimmed to what
+it draws, so the cells are smaller than the 48 pixel exhaust tiles and
+the atlas smaller than the sheets it replaces:
+
+    frames 0-23:  body only, rotations 0-23
+    frames 24-47: body and thrust1 (ignition)
+    frames 48-71: body and thrust2
+    frames 72-95: body and thrust3
+    frame 96:     the hard landing body
+
+assets/landersheet.json holds the cell size and, per frame, the cell's
+offset from the body's top left corner, which the game adds to the
+lander's position. Palette index 0 is transparent. The explosion sheet
+keeps its own 8 bit palette, it has more colors than an atlas palette
+can share. Run it from the repo directory after changing a sheet:
+
+    python tools/pack_sprites.py
+"""
+import argparse
+import json
+import struct
+
+ROTATIONS = 24
+LANDER_CELL = 48 # frames are composed in cells of the big exhaust tiles
+LANDER_PAD = 8 # body offset in a composing cell
+LANDER_SIZE = 32
+HARD_LANDING = 24 # rocket sheet tile
+SHEETS = ( # sheet, tile size, offset in a cell
+    ("assets/thrust1sheet.bmp", LANDER_SIZE, LANDER_PAD),
+    ("assets/thrust2sheet.bmp", LANDER_CELL, 0),
+    ("assets/thrust3sheet.bmp", LANDER_CELL, 0),
+)
+FRAMES = (len(SHEETS) + 1)*ROTATIONS + 1 # body only, with each exhaust, hard landing
+COLUMNS = ROTATIONS + 1 # the hard landing frame fills out the first row
+atlasfile = "assets/landersheet.bmp"
+offsetfile = "assets/landersheet.json"
+
+def read_bmp(path):
+    # (r, g, b) palette and rows of palette indexes, top row first, of an
+    # uncompressed 4 or 8 bit BMP; the top left pixel is the background
+    with open(path, "rb") as fpr:
+        data = fpr.read()
+    offset = struct.unpack_from("<I", data, 10)[0]
+    size, width, height, planes, bpp, compression = struct.unpack_from("<IiiHHI", data, 14)
+    if bpp not in (4, 8) or compression != 0:
+        raise ValueError(f"{path}: {bpp} bit or compressed BMP")
+    colors = struct.unpack_from("<I", data, 46)[0] or 1 << bpp
+    palette = [tuple(data[14 + size + 4*i:14 + size + 4*i + 3][::-1]) for i in range(colors)]
+    stride = (width*bpp + 31)//32*4
+    rows = []
+    for y in range(abs(height)):
+        start = offset + (y if height < 0 else abs(height) - 1 - y)*stride
+        line = data[start:start + stride]
+        if bpp == 8:
+            rows.append(list(line[:width]))
+        else:
+            rows.append([line[x >> 1] >> (4 if x & 1 == 0 else 0) & 15 for x in range(width)])
+    return palette, rows
+
+def write_bmp(path, width, height, palette, pixels):
+    # a 4 bit bottom up BMP of 16 colors
+    stride = (width*4 + 31)//32*4
+    body = bytearray()
+    for y in range(height - 1, -1, -1):
+        row = bytearray(stride)
+        for x in range(width):
+            row[x >> 1] |= pixels[y*width + x] << (4 if x & 1 == 0 else 0)
+        body.extend(row)
+    table = bytearray()
+    for r, g, b in palette + [(0, 0, 0)]*(16 - len(palette)):
+        table.extend((b, g, r, 0))
+    offset = 14 + 40 + len(table)
+    with open(path, "wb") as fpw:
+        fpw.write(b"BM" + struct.pack("<IHHI", offset + len(body), 0, 0, offset))
+        fpw.write(struct.pack("<IiiHHIIiiII", 40, width, height, 1, 4, 0, len(body), 2835, 2835, 16, 16))
+        fpw.write(table)
+        fpw.write(body)
+
+class Atlas:
+    # frames of palette indexes, index 0 transparent, composed in
+    # LANDER_CELL cells then trimmed
+
+    def __init__(self, columns, rows):
+        self.width = columns*LANDER_CELL
+        self.height = rows*LANDER_CELL
+        self.columns = columns
+        self.pixels = bytearray(self.width*self.height)
+        self.palette = [(0, 0, 0)] # transparent
+
+    def color(self, rgb):
+        if rgb not in self.palette[1:]:
+            if len(self.palette) == 16:
+                raise ValueError("the sheets have more than 15 colors")
+            self.palette.append(rgb)
+        return self.palette.index(rgb, 1)
+
+    def draw(self, cell, sheet, tile, size, offset):
+        # a sheet tile over a cell, the sheet's background left out
+        palette, rows = sheet
+        background = rows[0][0]
+        cx = cell%self.columns*LANDER_CELL + offset
+        cy = cell//self.columns*LANDER_CELL + offset
+        for y in range(size):
+            for x in range(size):
+                index = rows[y][tile*size + x]
+                if index != background:
+                    self.pixels[(cy + y)*self.width + cx + x] = self.color(palette[index])
+
+    def bounds(self, cell):
+        # left, top, right and bottom of what a cell draws, past the end
+        cx = cell%self.columns*LANDER_CELL
+        cy = cell//self.columns*LANDER_CELL
+        left = top = LANDER_CELL
+        right = bottom = 0
+        for y in range(LANDER_CELL):
+            for x in range(LANDER_CELL):
+                if self.pixels[(cy + y)*self.width + cx + x]:
+                    left = min(left, x)
+                    top = min(top, y)
+                    right = max(right, x + 1)
+                    bottom = max(bottom, y + 1)
+        return left, top, right, bottom
+
+    def trim(self, count, columns):
+        # the first count cells cut to their bounds into cells of the
+        # biggest bounds, columns of them a row; returns the cell width,
+        # height, pixels and per cell offsets from the body
+        bounds = [self.bounds(cell) for cell in range(count)]
+        width = max(right - left for left, top, right, bottom in bounds)
+        height = max(bottom - top for left, top, right, bottom in bounds)
+        rows = (count + columns - 1)//columns
+        pixels = bytearray(columns*width*rows*height)
+        offsets = []
+        for cell, (left, top, right, bottom) in enumerate(bounds):
+            sx = cell%self.columns*LANDER_CELL + left
+            sy = cell//self.columns*LANDER_CELL + top
+            dx = cell%columns*width
+            dy = cell//columns*height
+            for y in range(bottom - top):
+                start = (sy + y)*self.width + sx
+                end = (dy + y)*columns*width + dx
+                pixels[end:end + right - left] = self.pixels[start:start + right - left]
+            offsets.extend((left - LANDER_PAD, top - LANDER_PAD))
+        return width, height, pixels, offsets
+
+def pack(rocketsheet="assets/rocketsheet.bmp", path=atlasfile, offsetpath=offsetfile):
+    atlas = Atlas(ROTATIONS, len(SHEETS) + 2)
+    rocket = read_bmp(rocketsheet)
+    exhausts = [(read_bmp(sheet), size, offset) for sheet, size, offset in SHEETS]
+    for r in range(ROTATIONS):
+        for row in range(len(SHEETS) + 1):
+            atlas.draw(row*ROTATIONS + r, rocket, r, LANDER_SIZE, LANDER_PAD)
+            if row:
+                sheet, size, offset = exhausts[row - 1]
+                atlas.draw(row*ROTATIONS + r, sheet, r, size, offset)
+    atlas.draw((len(SHEETS) + 1)*ROTATIONS, rocket, HARD_LANDING, LANDER_SIZE, LANDER_PAD)
+    width, height, pixels, offsets = atlas.trim(FRAMES, COLUMNS)
+    rows = len(pixels)//(COLUMNS*width*height)
+    write_bmp(path, COLUMNS*width, rows*height, atlas.palette, pixels)
+    with open(offsetpath, "w") as fpw:
+        json.dump({"tile_width": width, "tile_height": height, "offsets": offsets}, fpw)
+    return COLUMNS*width, rows*height, len(atlas.palette)
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the lander and thrust sheets into one atlas.")
+    parser.add_argument("--output", default=atlasfile, help="atlas BMP")
+    parser.add_argument("--offsets", default=offsetfile, help="cell size and frame offsets JSON")
+    args = parser.parse_args()
+    width, height, colors = pack(path=args.output, offsetpath=args.offsets)
+    print(f"{args.output}: {width}x{height}, {colors} colors, {(width*4 + 31)//32*4*height} bytes")
+
+if __name__ == "__main__":
+    main()